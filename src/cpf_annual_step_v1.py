@@ -0,0 +1,295 @@
+## cpf_annual_step_v1.py
+"""
+Annual-resolution engine: year-end balances without a month loop.
+
+Each calendar year of the simulation is advanced in one step. The year's loan instalments,
+allocations and payouts are laid out as a (months x accounts) cents array and summed, the
+December interest is computed once from the December balances, and monthly accrual (if
+configured) is evaluated for the twelve months in one vectorised call. Balances are integer
+cents exactly as in the month loop, so every December row equals the monthly engine's.
+
+A year falls back to stepping its months one by one when something in it depends on the running
+balances in a way the sums cannot express: the age-55 transfer, a loan instalment larger than the
+remaining loan, a payout larger than the RA, or the RA running out (which stops the simulation).
+
+    result = simulate_annual(ConfigLoader('cpf_config.json'), allocation)
+    result.final_row()
+"""
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from cpf_date_generator_v3 import DateGenerator
+from cpf_interest_v1 import ACCOUNTS as INTEREST_ACCOUNTS, InterestPolicy, monthly_interest
+from cpf_loan_v1 import LoanSchedule
+from cpf_money_v1 import MONEY_DTYPE, to_cents, to_cents_array, to_dollars
+from cpf_policy_registry_v1 import PolicyRegistry, SPLIT_ACCOUNTS
+from cpf_program_v11 import CPFAccount
+from cpf_renderers_v1 import SimulationResult
+from cpf_retirement_transfer_v1 import form_retirement_account, TRANSFER_AGE
+from cpf_salary_schedule_v1 import ContributionSchedule
+from cpf_scheduler_v1 import allocation_postings
+
+ACCOUNTS = ('oa', 'sa', 'ma', 'ra', 'loan', 'excess')
+COLUMN = {account: i for i, account in enumerate(ACCOUNTS)}
+OA, SA, MA, RA, LOAN, EXCESS = range(len(ACCOUNTS))
+
+
+def _posting_cents(amount) -> int:
+    # record_inflow / record_outflow ignore non-numbers and amounts below 1e-9
+    if not isinstance(amount, (int, float)) or abs(amount) < 1e-9:
+        return 0
+    return to_cents(amount)
+
+
+class AnnualEngine:
+    """One member's simulation, advanced a calendar year at a time."""
+
+    def __init__(self, config, allocation: dict, contributions=None):
+        self.config = config
+        self.allocation = allocation
+        dategen = DateGenerator(config.getdata('start_date'), config.getdata('end_date'), config.getdata('birth_date'))
+        self.start_date, self.end_date, self.birth_date = dategen.start_date, dategen.end_date, dategen.birth_date
+        self.calendar = dategen.generate_calendar()
+        self.months = self.calendar.months
+        self.ages = self.calendar.ages
+        self.calendar_months = self.months % 12 + 1
+
+        # the month loop adds the above-55 allocation amounts to the config before it starts
+        with CPFAccount(config, log_to_file=False) as cpf:
+            cpf.age = relativedelta(self.start_date, self.birth_date).years
+            cpf.compute_and_add_allocation()
+
+        self.payout_type = config.getdata('payout_type', {})
+        self.retirement_amount = config.getdata(['retirement_sums', self.payout_type, 'amount'], 0)
+        self.policies = PolicyRegistry.from_config(config)
+        self.versions = self.policies.index(self.months)
+        self.payouts = self.policies.payouts(self.months, self.ages, self.payout_type)
+        # salary path allocations (cpf_salary_schedule_v1) as cents rows, instead of the config amounts
+        if contributions is None:
+            contributions = ContributionSchedule.from_config(config, self.calendar, self.policies, self.birth_date)
+        self.contribution_cents = None
+        if contributions is not None:
+            self.contribution_cents = np.zeros((len(self.months), len(ACCOUNTS)), dtype=MONEY_DTYPE)
+            for j, account in enumerate(SPLIT_ACCOUNTS):
+                self.contribution_cents[:, COLUMN[account]] = to_cents_array(contributions.allocation[:, j])
+
+        self.cents = np.array([_posting_cents(float(config.getdata(f'{account}_balance', 0.0))) for account in ACCOUNTS],
+                              dtype=MONEY_DTYPE)
+        self.loan_schedule = LoanSchedule.from_config(config, principal=to_dollars(int(self.cents[LOAN])))
+        self.policy = InterestPolicy.from_config(config)
+        self.accrual = self.policy.convention == 'monthly_accrual'
+        self.stepped_years = 0  # years that needed month steps
+        self.payout_start_ra = None  # RA (cents) just before the first payout
+        self.depleted_at = None  # index of the month the RA ran out
+        self._allocations = {}
+
+    # -- inputs of one month -------------------------------------------------------------------
+
+    def allocation_cents(self, i: int) -> np.ndarray:
+        """Allocation inflows of month i as a cents vector over ACCOUNTS (cached per policy version, age and month)."""
+        if self.contribution_cents is not None:
+            return self.contribution_cents[i]
+        key = (int(self.versions[i]), int(self.ages[i]), int(self.calendar_months[i]))
+        vector = self._allocations.get(key)
+        if vector is None:
+            version, age, calendar_month = key
+            vector = np.zeros(len(ACCOUNTS), dtype=MONEY_DTYPE)
+            for account, amount, _ in allocation_postings(self.policies.versions[version], self.allocation, age,
+                                                          calendar_month, self.birth_date.month):
+                vector[COLUMN[account]] += _posting_cents(amount)
+            self._allocations[key] = vector
+        return vector
+
+    def _interest(self, balances: np.ndarray, ages):
+        """Base and extra interest dicts for balance rows (cents) at the given ages."""
+        dollars = balances / 100
+        return monthly_interest(dollars[..., OA], dollars[..., SA], dollars[..., MA], dollars[..., RA], ages, self.policy)
+
+    def _interest_cents(self, base: dict, extra: dict) -> np.ndarray:
+        """The December interest postings (last element of each array) as a cents vector."""
+        vector = np.zeros(len(ACCOUNTS), dtype=MONEY_DTYPE)
+        for account in INTEREST_ACCOUNTS:
+            vector[COLUMN[account]] += _posting_cents(float(base[account][-1]))
+        for account in INTEREST_ACCOUNTS:
+            vector[COLUMN[account]] += _posting_cents(float(extra[account][-1]))
+        return vector
+
+    # -- a whole year in one step --------------------------------------------------------------
+
+    def step_year(self, start: int, stop: int):
+        """
+        Advance months start..stop-1 (one calendar year, or part of one) in one step.
+        Returns the payout of the last month, or None if the year needs month steps.
+        """
+        n = stop - start
+        ages = self.ages[start:stop]
+        calendar_months = self.calendar_months[start:stop]
+        if np.any((ages == TRANSFER_AGE) & (calendar_months == self.birth_date.month)):
+            return None
+
+        flows = np.zeros((n, len(ACCOUNTS)), dtype=MONEY_DTYPE)
+        for m in range(n):
+            flows[m] += self.allocation_cents(start + m)
+
+        # Loan instalments; the loan only moves through its own principal in these months
+        payments = self.loan_schedule.payment[start:stop]
+        principal = self.loan_schedule.principal[start:stop]
+        due = np.zeros(n, dtype=bool)
+        due[:len(payments)] = payments > 0
+        if self.cents[LOAN] > 0 and due.any():
+            paid = np.zeros(n, dtype=MONEY_DTYPE)
+            paid[:len(principal)] = np.where(due[:len(principal)], principal, 0)
+            loan_before = self.cents[LOAN] - np.concatenate(([0], np.cumsum(paid)[:-1]))
+            if np.any(due & ((loan_before <= 0) | (paid > loan_before))):
+                return None
+            flows[:len(payments), OA] -= np.where(due[:len(payments)], payments, 0)
+            flows[:, LOAN] -= paid
+
+        # Balances after each month's instalment and allocation, before interest and payout
+        payout_due = self.payouts[start:stop]
+        payout_cents = np.array([_posting_cents(due) if due > 0 else 0 for due in payout_due], dtype=MONEY_DTYPE)
+        paid_before = np.concatenate(([0], np.cumsum(payout_cents)[:-1]))
+        pre_payout = self.cents + np.cumsum(flows, axis=0)
+        pre_payout[:, RA] -= paid_before
+        pre_payout[:, EXCESS] += paid_before
+
+        # December interest, from the December balances or from twelve months of accrual.
+        # An accrual still open when the run ends is never credited, so it is not computed.
+        if calendar_months[-1] == 12:
+            if self.accrual:
+                base, extra = self._interest(pre_payout, ages)
+                base = {account: np.cumsum(values) for account, values in base.items()}
+                extra = {account: np.cumsum(values) for account, values in extra.items()}
+            else:
+                base, extra = self._interest(pre_payout[-1], ages[-1:])
+            pre_payout[-1] += self._interest_cents(base, extra)
+
+        # Payouts must not be clamped by the RA, and the RA must not run out (that stops the run)
+        ra_before = pre_payout[:, RA]
+        paying = payout_cents > 0
+        if np.any(paying & ((ra_before <= 0) | (ra_before < payout_cents))):
+            return None
+        if np.any((ra_before - payout_cents == 0) & (ages > TRANSFER_AGE)):
+            return None
+
+        if self.payout_start_ra is None and paying.any():
+            self.payout_start_ra = int(ra_before[np.argmax(paying)])
+        self.cents = pre_payout[-1]
+        self.cents[RA] -= payout_cents[-1]
+        self.cents[EXCESS] += payout_cents[-1]
+        return payout_due[-1] if payout_due[-1] > 0 else 0.0
+
+    # -- one month at a time -------------------------------------------------------------------
+
+    def step_month(self, i: int):
+        """
+        Advance month i exactly as the month loop does.
+        Returns (payout, balances before any age-55 transfer), or None when the RA runs out.
+        """
+        c = self.cents
+        age = int(self.ages[i])
+        calendar_month = int(self.calendar_months[i])
+        loan_payment = self.loan_schedule.payment_at(i)
+        if loan_payment > 0 and c[LOAN] > 0:
+            loan_principal = min(self.loan_schedule.principal_at(i), to_dollars(int(c[LOAN])))
+            c[OA] -= _posting_cents(loan_payment)
+            c[LOAN] -= _posting_cents(loan_principal)
+        c += self.allocation_cents(i)
+        if self.accrual:
+            base, extra = self._interest(c, [age])
+            for account in INTEREST_ACCOUNTS:
+                self._base[account] += base[account]
+                self._extra[account] += extra[account]
+        if calendar_month == 12:
+            if self.accrual:
+                base, extra = self._base, self._extra
+                self._reset_accrual()
+            else:
+                base, extra = self._interest(c, [age])
+            c += self._interest_cents(base, extra)
+
+        if self.payout_start_ra is None and self.payouts[i] > 0:
+            self.payout_start_ra = int(c[RA])
+        payout = max(min(self.payouts[i], to_dollars(int(c[RA]))), 0.0)
+        if c[RA] > 0:
+            c[RA] -= _posting_cents(payout)
+            c[EXCESS] += _posting_cents(payout)
+        else:
+            payout = 0.0
+        if c[RA] == 0 and age > TRANSFER_AGE:
+            return None
+        row = c.copy()
+        if age == TRANSFER_AGE and calendar_month == self.birth_date.month:
+            transfer = form_retirement_account(oa=to_dollars(int(c[OA])), sa=to_dollars(int(c[SA])),
+                                               loan=to_dollars(int(c[LOAN])), retirement_sum=self.policies.versions[self.versions[i]].retirement_sum(self.payout_type))
+            for account, amount in transfer.items():
+                c[COLUMN[account]] += _posting_cents(amount)
+        return payout, row
+
+    def _reset_accrual(self):
+        self._base = {account: np.zeros(1) for account in INTEREST_ACCOUNTS}
+        self._extra = {account: np.zeros(1) for account in INTEREST_ACCOUNTS}
+
+    # -- the whole run -------------------------------------------------------------------------
+
+    def years(self):
+        """(start, stop) month ranges of each calendar year in the calendar."""
+        ends = (np.flatnonzero(self.calendar_months == 12) + 1).tolist()
+        bounds = [0] + [end for end in ends if end < len(self.months)] + [len(self.months)]
+        return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+    def run(self) -> SimulationResult:
+        result = SimulationResult(header={
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'birth_date': self.birth_date,
+            'age': relativedelta(self.start_date, self.birth_date).years,
+            'retirement_amount': self.retirement_amount,
+            'oa_balance': 0.0, 'sa_balance': 0.0, 'ma_balance': 0.0, 'loan_balance': 0.0,
+        })
+        result.loaded_initial_balances = True
+        self._reset_accrual()
+        self.stepped_years = 0
+        self.payout_start_ra = None
+        self.depleted_at = None
+
+        for start, stop in self.years():
+            payout = self.step_year(start, stop)
+            if payout is not None:
+                self._add_row(result, stop - 1, self.cents, payout)
+                continue
+            self.stepped_years += 1
+            self._reset_accrual()
+            for i in range(start, stop):
+                stepped = self.step_month(i)
+                if stepped is None:
+                    if i > start:  # the month before the stop is the last row, as in the month loop
+                        self._add_row(result, i - 1, last_row, last_payout)
+                    result.stop_message = f"Stopping simulation at age {int(self.ages[i])} as RA balance is zero."
+                    self.depleted_at = i
+                    return result
+                last_payout, last_row = stepped
+            self._add_row(result, stop - 1, last_row, last_payout)
+        return result
+
+    def _add_row(self, result: SimulationResult, i: int, cents: np.ndarray, payout) -> None:
+        dollars = [to_dollars(int(value)) for value in cents]
+        result.add_row(int(self.months[i]), int(self.ages[i]), dollars[OA], dollars[SA], dollars[MA], dollars[RA],
+                       dollars[LOAN], dollars[EXCESS], payout)
+
+
+def simulate_annual(config, allocation: dict, contributions=None) -> SimulationResult:
+    """Year-end rows of one member (plus the final month if the run does not end in December)."""
+    return AnnualEngine(config, allocation, contributions).run()
+
+
+if __name__ == "__main__":
+    # Example usage
+    from cpf_config_loader_v10 import ConfigLoader
+    from cpf_renderers_v1 import get_renderer
+
+    zero = {'allocation_below_55': {account: {'allocation': 0.0, 'amount': 0.0} for account in ('oa', 'sa', 'ma')}}
+    engine = AnnualEngine(ConfigLoader('cpf_config.json'), zero)
+    result = engine.run()
+    get_renderer('table').render(result)
+    print(f"{len(result)} year-end rows, {engine.stepped_years} years stepped month by month")
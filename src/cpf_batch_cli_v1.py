@@ -0,0 +1,235 @@
+## cpf_batch_cli_v1.py
+"""
+Batch simulation from a file of member profiles.
+
+Members are read one at a time from a CSV or JSONL file, applied over the base cpf_config.json
+and simulated headless in parallel chunks. Results are written as each chunk completes:
+
+    <out>/cpf_batch_summary.csv           one row per member (final balances, months, stop reason)
+    <out>/monthly/part-00000.csv ...      month rows per chunk, written by the worker itself (--monthly)
+
+Only a bounded window of chunks is in flight, so memory stays flat however large the input is;
+the summary rows are written in the order the chunks complete.
+Member n of the file posts its references inside block n of the run (cpf_reference_allocator_v1);
+the summary records each member's reference_start. A member's salary drives their contributions:
+a profile that sets salary without a salary_schedule gets a flat one (cpf_salary_schedule_v1).
+
+    python cpf_batch_cli_v1.py members.csv --out batch_out --processes 4 --chunk-size 50 --monthly
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from multiprocessing import Pool
+
+from cpf_data_saver_v4 import CSVBackend
+from cpf_fixtures_v1 import allocation_data
+from cpf_progress_v1 import ProgressReporter, StreamSink
+from cpf_reference_allocator_v1 import ReferenceAllocator
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+CONFIG_FILENAME = os.path.join(SRC_DIR, 'cpf_config.json')  # Full path to the config file
+SUMMARY_FILENAME = 'cpf_batch_summary.csv'
+MONTHLY_DIR = 'monthly'
+
+DEFAULT_CHUNK_SIZE = 25
+WINDOW_PER_PROCESS = 2  # chunks in flight per worker process
+MEMBER_FIELDS = ('birth_date', 'salary', 'oa_balance', 'sa_balance', 'ma_balance', 'ra_balance',
+                 'excess_balance', 'loan_balance', 'payout_type')
+SUMMARY_FIELDS = ['member_id', 'reference_start', 'status', 'months', 'final_date', 'final_age',
+                  'oa', 'sa', 'ma', 'ra', 'loan', 'excess', 'payout', 'stop_message', 'seconds']
+MONTHLY_FIELDS = ['member_id', 'date_key', 'age', 'transfer', 'oa', 'sa', 'ma', 'ra', 'loan', 'excess', 'payout']
+
+
+def _coerce(value, reference):
+    """Convert a CSV string to the type of the base config value it overrides."""
+    if not isinstance(value, str):
+        return value
+    if isinstance(reference, bool):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    if isinstance(reference, (int, float)):
+        return float(value) if value.strip() else reference
+    return value
+
+
+def iter_members(filename: str, base: dict):
+    """
+    Yield (member_id, overrides) pairs from a CSV or JSONL file, one line at a time.
+    Empty CSV cells keep the base config value; member_id defaults to the line number.
+    """
+    jsonl = filename.endswith(('.jsonl', '.ndjson'))
+    with open(filename, 'r', newline='') as f:
+        records = (json.loads(line) for line in f if line.strip()) if jsonl else csv.DictReader(f)
+        for number, record in enumerate(records):
+            member_id = str(record.pop('member_id', '') or number)
+            overrides = {key: _coerce(value, base.get(key)) for key, value in record.items()
+                         if value not in (None, '')}
+            yield member_id, overrides
+
+
+def member_config(base: dict, overrides: dict) -> dict:
+    """
+    The member's config: the overrides applied over the base config. A salary without a
+    salary_schedule becomes a flat salary schedule, so the contributions follow the salary.
+    """
+    config = {**base, **overrides}
+    if 'salary' in overrides and config.get('salary_schedule') is None:
+        config['salary_schedule'] = {}
+    return config
+
+
+def count_members(filename: str) -> int:
+    """Number of member records, counted without parsing them (for the progress ETA)."""
+    with open(filename, 'rb') as f:
+        lines = sum(1 for line in f if line.strip())
+    return lines if filename.endswith(('.jsonl', '.ndjson')) else max(lines - 1, 0)
+
+
+def simulate_chunk(task) -> tuple[list[dict], int]:
+    """
+    Worker: simulate one chunk of members headless.
+    Month rows go straight to this chunk's part file; only the summary rows are returned.
+    """
+    from cpf_config_loader_v10 import ConfigLoader
+    from cpf_salary_schedule_v1 import contribution_schedules
+    import cpf_run_simulation_v8
+
+    chunk_id, first_member, run_id, base, members, monthly_dir = task
+    allocator = ReferenceAllocator(run_id)
+    monthly = None
+    if monthly_dir is not None:
+        monthly = CSVBackend(os.path.join(monthly_dir, f"part-{chunk_id:05d}.csv"), fieldnames=MONTHLY_FIELDS)
+    summaries = []
+    months = 0
+    configs = [ConfigLoader.from_dict(member_config(base, overrides)) for _, overrides in members]
+    try:
+        # salary path contributions of the whole chunk in one pass (None for members without one)
+        schedules = contribution_schedules(configs)
+    except Exception:
+        schedules = [None] * len(configs)  # a bad profile fails on its own below
+    try:
+        for member, (member_id, _), config, contributions in zip(itertools.count(first_member), members, configs, schedules):
+            started = time.perf_counter()
+            block = allocator.block(member)
+            try:
+                result = cpf_run_simulation_v8.main(
+                    allocation_data(), output='quiet',
+                    config=config, headless=True, reference_block=block, contributions=contributions,
+                )
+            except Exception as e:
+                summaries.append({'member_id': member_id, 'reference_start': block.start, 'status': f"failed: {e}",
+                                  'seconds': round(time.perf_counter() - started, 4)})
+                continue
+            final = result.final_row() or {}
+            months += len(result)
+            summaries.append({
+                'member_id': member_id,
+                'reference_start': block.start,
+                'status': 'ok',
+                'months': len(result),
+                'final_date': final.get('date_key'),
+                'final_age': final.get('age'),
+                **{name: round(final.get(name, 0.0), 2) for name in ('oa', 'sa', 'ma', 'ra', 'loan', 'excess', 'payout')},
+                'stop_message': result.stop_message or '',
+                'seconds': round(time.perf_counter() - started, 4),
+            })
+            if monthly is not None:
+                c = result.columns
+                for i, date_key in enumerate(result.date_keys):
+                    monthly.append({
+                        'member_id': member_id, 'date_key': date_key, 'age': result.ages[i],
+                        'transfer': int(result.transfer[i]),
+                        **{name: round(c[name][i], 2) for name in ('oa', 'sa', 'ma', 'ra', 'loan', 'excess', 'payout')},
+                    })
+    finally:
+        if monthly is not None:
+            monthly.close()
+    return summaries, months
+
+
+def iter_chunks(members, chunk_size: int):
+    """Group the member stream into lists of at most chunk_size members."""
+    members = iter(members)
+    while chunk := list(itertools.islice(members, chunk_size)):
+        yield chunk
+
+
+def run_batch(input_file: str, out_dir: str, base_config: str = CONFIG_FILENAME, processes: int = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, write_monthly: bool = False, progress: ProgressReporter = None,
+              run_id: int = None) -> dict:
+    """Simulate every member in input_file and write the outputs to out_dir. Returns run totals."""
+    with open(base_config, 'r') as f:
+        base = json.load(f)
+    os.makedirs(out_dir, exist_ok=True)
+    monthly_dir = None
+    if write_monthly:
+        monthly_dir = os.path.join(out_dir, MONTHLY_DIR)
+        os.makedirs(monthly_dir, exist_ok=True)
+
+    processes = processes or os.cpu_count() or 1
+    window = processes * WINDOW_PER_PROCESS
+    run_id = ReferenceAllocator(run_id).run_id
+    tasks = ((chunk_id, chunk_id * chunk_size, run_id, base, chunk, monthly_dir)
+             for chunk_id, chunk in enumerate(iter_chunks(iter_members(input_file, base), chunk_size)))
+    totals = {'run_id': run_id, 'members': 0, 'failed': 0, 'months': 0}
+    started = time.perf_counter()
+    # Pool.imap_unordered would read the whole input ahead of the workers. The feeder hands it a new
+    # chunk only when one finishes, so `window` chunks stay in flight and no worker waits on a slow one.
+    slots = threading.Semaphore(window)
+    stopped = threading.Event()
+
+    def feed():
+        for task in tasks:
+            slots.acquire()
+            if stopped.is_set():
+                return
+            yield task
+
+    with CSVBackend(os.path.join(out_dir, SUMMARY_FILENAME), fieldnames=SUMMARY_FIELDS) as summary, \
+            Pool(processes=processes) as pool:
+        try:
+            for summaries, months in pool.imap_unordered(simulate_chunk, feed()):
+                slots.release()
+                summary.extend(summaries)
+                failed = sum(1 for row in summaries if row['status'] != 'ok')
+                totals['members'] += len(summaries)
+                totals['failed'] += failed
+                totals['months'] += months
+                if progress is not None:
+                    progress.merge(members=len(summaries), months=months)
+        finally:
+            stopped.set()
+            slots.release()  # wake the feeder if it is waiting for a slot
+    if progress is not None:
+        progress.finish()
+    totals['seconds'] = round(time.perf_counter() - started, 3)
+    totals['storage'] = summary.stats()
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate a batch of CPF members from a CSV or JSONL file.")
+    parser.add_argument('input', help="CSV or JSONL file of member profiles (" + ", ".join(MEMBER_FIELDS) + ")")
+    parser.add_argument('--out', default=os.path.join(SRC_DIR, 'cpf_batch_output'), help="Output directory")
+    parser.add_argument('--base-config', default=CONFIG_FILENAME, help="Config the member profiles are applied over")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Members per worker task")
+    parser.add_argument('--monthly', action='store_true', help="Also write the month rows of every member")
+    parser.add_argument('--run-id', type=int, default=None, help="Run id encoded in the references (default: the next unused id)")
+    parser.add_argument('--quiet', action='store_true', help="No progress output")
+    args = parser.parse_args(argv)
+
+    progress = None if args.quiet else ProgressReporter(total_members=count_members(args.input), sinks=[StreamSink()])
+    totals = run_batch(args.input, args.out, args.base_config, args.processes, args.chunk_size, args.monthly, progress,
+                       args.run_id)
+    print(f"Run {totals['run_id']}: simulated {totals['members']:,} members ({totals['failed']:,} failed), "
+          f"{totals['months']:,} months in {totals['seconds']:.1f}s. Results in {args.out}")
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
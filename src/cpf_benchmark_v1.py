@@ -0,0 +1,262 @@
+## cpf_benchmark_v1.py
+"""
+Benchmark harness for the simulation, report and analysis pipeline.
+
+Every stage is timed for synthetic member populations of 1, 100 and 10k members, recording wall
+time and peak traced memory. Results are written as JSON and compared against a stored baseline
+so regressions are caught. The comparison is part of every run: without a baseline the run fails,
+so the workflow is to store one on the reference machine first and compare against it afterwards:
+
+    python cpf_benchmark_v1.py --save-baseline      # once: run and store the results as the baseline
+    python cpf_benchmark_v1.py                      # run and compare with the baseline (exit 1 on regression)
+    python cpf_benchmark_v1.py --quick              # cap the slow stages (STAGE_LIMITS) for a fast check
+    python cpf_benchmark_v1.py --sizes 1 100 --stages date_generation simulation
+
+The 10k population takes hours in the simulation and report_build stages (about a second per
+member each); --quick opts out of those runs and reports them as skipped, and skipped entries are
+left out of the comparison. A baseline saved with --quick only covers the capped sizes.
+
+The engine modules write their outputs next to their own source files, so the harness runs
+them from a scratch copy of the src directory and never touches the working tree.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cpf_fixtures_v1 import allocation_data, synthetic_members
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+CONFIG_FILENAME = os.path.join(SRC_DIR, 'cpf_config.json')  # Full path to the config file
+RESULTS_FILE_PATH = os.path.join(SRC_DIR, 'cpf_benchmark_results.json')
+BASELINE_FILE_PATH = os.path.join(SRC_DIR, 'cpf_benchmark_baseline.json')
+
+DEFAULT_SIZES = [1, 100, 10_000]
+DEFAULT_TOLERANCE = 0.25  # 25% slower than baseline counts as a regression
+
+# Largest population each stage is run for with --quick; larger populations are reported as skipped.
+# The full simulation and the row-by-row report builder take hours for 10k members.
+STAGE_LIMITS = {
+    'config_load': None,
+    'date_generation': None,
+    'simulation': 100,
+    'report_build': 100,
+    'analysis': 1_000,
+}
+
+def _base_config(workdir: str) -> dict:
+    with open(os.path.join(workdir, 'cpf_config.json'), 'r') as f:
+        return json.load(f)
+
+
+def stage_config_load(members, workdir):
+    """ConfigLoader load + resolve for every member."""
+    from cpf_config_loader_v10 import ConfigLoader
+
+    def run():
+        for _ in members:
+            loader = ConfigLoader('cpf_config.json')
+            loader.resolve_formulas()
+    return run
+
+
+def stage_date_generation(members, workdir):
+    """DateGenerator.generate_calendar (the engine's month calendar) for every member."""
+    from cpf_date_generator_v3 import DateGenerator
+    base = _base_config(workdir)
+
+    def run():
+        for member in members:
+            DateGenerator(base['start_date'], base['end_date'], member['birth_date']).generate_calendar()
+    return run
+
+
+def stage_simulation(members, workdir):
+    """A full cpf_run_simulation_v8.main run for every member."""
+    import cpf_run_simulation_v8
+    base = _base_config(workdir)
+    config_path = os.path.join(workdir, 'cpf_config.json')
+
+    def run():
+        for member in members:
+            with open(config_path, 'w') as f:
+                json.dump({**base, **member}, f, indent=4)
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                cpf_run_simulation_v8.main(allocation_data())
+        with open(config_path, 'w') as f:
+            json.dump(base, f, indent=4)
+    return run
+
+
+def _population_log(members, workdir) -> str:
+    """
+    Build a journal for the whole population by replicating a single-member log
+    with non-overlapping transaction references.
+    """
+    import pandas as pd
+    single = os.path.join(workdir, 'cpf_log_file.csv')
+    population = os.path.join(workdir, f'cpf_log_file_{len(members)}.csv')
+    if not os.path.exists(population):
+        log = pd.read_csv(single)
+        frames = []
+        for member in range(len(members)):
+            frame = log.copy()
+            frame['transaction_reference'] += member * 10_000_000
+            frames.append(frame)
+        pd.concat(frames, ignore_index=True).to_csv(population, index=False)
+    return population
+
+
+def stage_report_build(members, workdir):
+    """CPFLogEntry.build_report over the population journal."""
+    from cpf_build_reports_v1 import CPFLogEntry
+    log_path = _population_log(members, workdir)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            CPFLogEntry(log_path).build_report()
+    return run
+
+
+def stage_analysis(members, workdir):
+    """analyze_cpf_files over the population journal and its report."""
+    from cpf_analysis_v1 import analyze_cpf_files
+    from cpf_build_reports_v1 import CPFLogEntry
+    log_path = _population_log(members, workdir)
+    report_path = os.path.join(workdir, f'cpf_report_{len(members)}.csv')
+    if not os.path.exists(report_path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            CPFLogEntry(log_path).build_report()
+        os.replace(os.path.join(workdir, 'cpf_report.csv'), report_path)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyze_cpf_files(log_path, report_path,
+                              os.path.join(workdir, 'cpf_mismatches.csv'),
+                              os.path.join(workdir, 'cpf_final_balances.csv'))
+    return run
+
+
+STAGES = {
+    'config_load': stage_config_load,
+    'date_generation': stage_date_generation,
+    'simulation': stage_simulation,
+    'report_build': stage_report_build,
+    'analysis': stage_analysis,
+}
+
+
+def measure(run) -> dict:
+    """Time one call of `run` and record its peak traced memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        run()
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'seconds': round(seconds, 6), 'peak_kb': round(peak / 1024, 1)}
+
+
+def run_benchmarks(sizes: list[int], stages: list[str], workdir: str, quick: bool = False) -> dict:
+    """Run every requested stage for every population size (up to STAGE_LIMITS when quick)."""
+    results = {}
+    # The report and analysis stages replay the log of a real single-member run
+    if {'report_build', 'analysis'} & set(stages) and not os.path.exists(os.path.join(workdir, 'cpf_log_file.csv')):
+        stage_simulation(synthetic_members(1), workdir)()
+    for stage in stages:
+        results[stage] = {}
+        for size in sizes:
+            limit = STAGE_LIMITS.get(stage)
+            if quick and limit is not None and size > limit:
+                results[stage][str(size)] = {'skipped': f'population above stage limit of {limit}'}
+                print(f"{stage:<16}{size:>8}  skipped (limit {limit})")
+                continue
+            run = STAGES[stage](synthetic_members(size), workdir)
+            results[stage][str(size)] = measure(run)
+            timing = results[stage][str(size)]
+            print(f"{stage:<16}{size:>8}  {timing['seconds']:>10.3f}s  {timing['peak_kb']:>12,.1f} KB")
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return a description of every stage/size that is slower than baseline by more than tolerance,
+    or that was timed but has no baseline timing to compare with.
+    """
+    regressions = []
+    for stage, sizes in results.items():
+        for size, timing in sizes.items():
+            if 'seconds' not in timing:
+                continue
+            reference = baseline.get(stage, {}).get(size)
+            if not reference or 'seconds' not in reference:
+                regressions.append(f"{stage} [{size} members]: no baseline timing (save a new baseline)")
+                continue
+            if timing['seconds'] > reference['seconds'] * (1 + tolerance):
+                regressions.append(
+                    f"{stage} [{size} members]: {timing['seconds']:.3f}s vs baseline {reference['seconds']:.3f}s"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the CPF simulation, report and analysis pipeline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Member population sizes")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES), help="Stages to run")
+    parser.add_argument('--output', default=RESULTS_FILE_PATH, help="Where to write the results JSON")
+    parser.add_argument('--baseline', default=None, help="Baseline JSON to compare against (default: %s)" % BASELINE_FILE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown ratio")
+    parser.add_argument('--quick', action='store_true',
+                        help="Skip the populations above each stage's limit (the slow 10k simulation and report runs)")
+    args = parser.parse_args(argv)
+    baseline_path = args.baseline or BASELINE_FILE_PATH
+
+    workdir = tempfile.mkdtemp(prefix='cpf_benchmark_')
+    try:
+        # Run the engine from a scratch copy so its output files never land in the source tree
+        shutil.copytree(SRC_DIR, workdir, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns('__pycache__', '*.db'))
+        sys.path.insert(0, workdir)
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results = run_benchmarks(args.sizes, args.stages, workdir, args.quick)
+        finally:
+            os.chdir(cwd)
+            sys.path.remove(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        # A run that cannot be compared is a failure, not a pass
+        print(f"ERROR baseline {baseline_path} not found; run with --save-baseline to create one.")
+        return 1
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,10 @@ from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 from typing import Any
 import os
+import sys
+from cpf_money_v1 import to_cents, to_dollars
+from cpf_messages_v1 import render_message
+import cpf_instrumentation_v1 as instrumentation
 
 CONFIG_FILENAME = 'cpf_config.json'
 SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Dynamically determine the src directory
@@ -23,6 +27,7 @@ class CPFLogEntry:
         self.ra_balance: float = 0.0
         self.loan_balance: float = 0.0
         self.excess_balance: float = 0.0
+        self._cents = {"oa": 0, "sa": 0, "ma": 0, "ra": 0, "loan": 0, "excess": 0}
         self.inflow: float = 0.0
         self.outflow: float = 0.0
         self.flow_type: str = ''
@@ -111,10 +116,11 @@ class CPFLogEntry:
         if self.logs is None or self.logs.empty:
             raise ValueError("Logs data is empty or not loaded.")
 
+        has_codes = "message_code" in self.logs.columns  # journals written before templates carry the text
         for _, log in self.logs.iterrows():
             # Extract log details
+            # The journal date is already the report's DATE_KEY text; it is not parsed per row
             date_str = log["date"]
-            self.xdate = datetime.strptime(date_str, "%Y-%m-%d").date()
             self.reference = log["transaction_reference"]
             #try:
             #    # Parse the date into YYYY-MM format
@@ -131,23 +137,20 @@ class CPFLogEntry:
             self.age =  log["age"]
 
             self.flow_type = log["type"]
-            self.message = log["message"]
-
             account = log["account"]
-            amount = log["amount"].__round__(2)
-            match account:
-                case "oa":
-                    self.oa_balance += amount
-                case "sa":
-                    self.sa_balance += amount
-                case "ma":
-                    self.ma_balance += amount
-                case "ra":
-                    self.ra_balance += amount
-                case "loan":
-                    self.loan_balance += amount
-                case "excess":
-                    self.excess_balance += amount
+            # Messages are journaled as template codes and only rendered here, for the report
+            if has_codes:
+                text = log["message"] if isinstance(log["message"], str) else ''
+                self.message = render_message(log["message_code"], account, self.age, log["param"], log["amount"], text)
+            else:
+                self.message = log["message"]
+
+            # Amounts are accumulated in integer cents so the running balances never drift
+            amount_cents = to_cents(log["amount"])
+            amount = to_dollars(amount_cents)
+            if account in self._cents:
+                self._cents[account] += amount_cents
+                setattr(self, f"{account}_balance", to_dollars(self._cents[account]))
            #if self.flow_type == "inflow":
            #    self.record_inflow(account, amount, self.message)
            #elif self.flow_type == "outflow":
@@ -156,21 +159,21 @@ class CPFLogEntry:
             # Extract year-month for the DATE_KEY
            
 
-            # Append the row to the report data, rounding amounts to 2 decimal places
+            # Append the row to the report data; amounts are already exact to the cent
             report_data.append({
-                "DATE_KEY": self.xdate ,
+                "DATE_KEY": date_str,
                 "REF": self.reference,
                 "AGE": self.age,
                 "ACCOUNT": account,
                 "TYPE": self.flow_type,
-                "INFLOW": amount.__round__(2) if self.flow_type == "inflow" else 0,
-                "OUTFLOW": amount.__round__(2) if self.flow_type == "outflow" else 0,
-                "OA":   self.oa_balance.__round__(2),  
-                "SA":   self.sa_balance.__round__(2),  
-                "MA":   self.ma_balance.__round__(2),  
-                "RA":   self.ra_balance.__round__(2),  
-                "LOANS":  self.loan_balance.__round__(2),   
-                "EXCESS": self.excess_balance.__round__(2), 
+                "INFLOW": amount if self.flow_type == "inflow" else 0,
+                "OUTFLOW": amount if self.flow_type == "outflow" else 0,
+                "OA":   self.oa_balance,
+                "SA":   self.sa_balance,
+                "MA":   self.ma_balance,
+                "RA":   self.ra_balance,
+                "LOANS":  self.loan_balance,
+                "EXCESS": self.excess_balance,
                 "MESSAGE": self.message
             })
 
@@ -191,9 +194,13 @@ class CPFLogEntry:
 
 if __name__ == "__main__":
     # Example usage
+    if '--profile' in sys.argv:
+        instrumentation.enable()
     csv_file_path = "cpf_log_file.csv"
-    cpflogs = CPFLogEntry(csv_file_path)
-    cpflogs.build_report()
+    with instrumentation.span('report_build'):
+        cpflogs = CPFLogEntry(csv_file_path)
+        cpflogs.build_report()
+    instrumentation.write_report(merge=True)
 
 
 
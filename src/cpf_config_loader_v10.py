@@ -3,7 +3,6 @@ from datetime import datetime, date
 import os
 from typing import Any
 import re   
-from pprint import pprint
 import re 
 
 
@@ -35,6 +34,18 @@ class ConfigLoader:
         self._load_config()
         #self._duplicate_config()
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConfigLoader":
+        """
+        Create a loader around an in-memory config, e.g. one member of a batch run.
+        Nothing is read from or written to disk.
+        """
+        loader = cls.__new__(cls)
+        loader.src_dir = SRC_DIR
+        loader.path = None
+        loader.data = data
+        return loader
+
     def _load_config(self):
         """
         Load the configuration file and parse its contents.
@@ -0,0 +1,411 @@
+# data_saver_v4.py
+"""
+Storage backends for journals and results.
+
+Every backend streams records to its file through a write buffer of `buffer_size` bytes and keeps
+throughput statistics, so a journal or result set can be sent to whichever sink is fastest:
+
+    csv       buffered csv.DictWriter
+    ndjson    one JSON object per line
+    pickle    length-prefixed pickle records (4-byte little-endian length + payload)
+    columnar  rows collected column-wise into NumPy chunks, saved as .npz on close
+
+csv, ndjson and pickle can be compressed with compression='gzip' or 'zstd'
+(zstd needs the optional zstandard package); columnar supports gzip (zip deflate) only.
+Use open_backend() to pick one by name and read_records() to stream the records back.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import pickle
+import shelve
+import struct
+import time
+from datetime import datetime
+from typing import Any, List, Union
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+CONFIG_FILENAME = os.path.join(SRC_DIR, 'cpf_config.json')  # Full path to the config file
+LOG_FILE_PATH = os.path.join(SRC_DIR, "cpf_log_file.csv")  # Log file path inside src folder
+
+DEFAULT_BUFFER_SIZE = 1 << 16  # 64 KiB
+COLUMNAR_CHUNK_ROWS = 65_536
+COMPRESSIONS = (None, 'gzip', 'zstd')
+_LENGTH = struct.Struct('<I')
+
+
+def custom_serializer(obj):
+    """Custom serializer for non-serializable objects like datetime."""
+    if isinstance(obj, datetime):
+        return obj.strftime("%Y-%m-%d %H:%M:%S")
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def _open_binary(filename: str, mode: str, compression: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+    """Open a (possibly compressed) binary stream for 'wb' or 'rb'."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}. Use one of {', '.join(str(c) for c in COMPRESSIONS)}.")
+    if compression is None:
+        return open(filename, mode, buffering=buffer_size)
+    if compression == 'gzip':
+        raw = gzip.open(filename, mode, compresslevel=6)
+    else:
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package (pip install zstandard).")
+        fh = open(filename, mode)
+        if 'w' in mode:
+            raw = zstandard.ZstdCompressor().stream_writer(fh, closefd=True)
+        else:
+            raw = zstandard.ZstdDecompressor().stream_reader(fh, closefd=True)
+    if 'w' in mode:
+        return io.BufferedWriter(raw, buffer_size=buffer_size)
+    return io.BufferedReader(raw, buffer_size=buffer_size)
+
+
+class StorageBackend:
+    """Base class: timing and byte counting around the backend-specific writes."""
+    name = None
+
+    def __init__(self, filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE, compression: str = None):
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self.records = 0
+        self.bytes_in = 0
+        self.seconds = 0.0
+        self.closed = False
+
+    def append(self, item: Any) -> None:
+        start = time.perf_counter()
+        self._write(item)
+        self.records += 1
+        self.seconds += time.perf_counter() - start
+
+    def extend(self, items) -> None:
+        start = time.perf_counter()
+        for item in items:
+            self._write(item)
+            self.records += 1
+        self.seconds += time.perf_counter() - start
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        start = time.perf_counter()
+        self._close()
+        self.seconds += time.perf_counter() - start
+        self.closed = True
+
+    def stats(self) -> dict:
+        """Records and bytes written, time spent writing and the resulting throughput."""
+        bytes_out = os.path.getsize(self.filename) if self.closed and os.path.exists(self.filename) else None
+        return {
+            'backend': self.name,
+            'compression': self.compression,
+            'buffer_size': self.buffer_size,
+            'records': self.records,
+            'bytes_in': self.bytes_in,
+            'bytes_out': bytes_out,
+            'seconds': round(self.seconds, 6),
+            'records_per_sec': round(self.records / self.seconds, 1) if self.seconds else None,
+            'mb_per_sec': round(self.bytes_in / self.seconds / 1e6, 2) if self.seconds else None,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _write(self, item):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CSVBackend(StorageBackend):
+    """Dict records to CSV; the header comes from `fieldnames` or the first record."""
+    name = 'csv'
+
+    def __init__(self, filename: str, fieldnames: list = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 compression: str = None):
+        super().__init__(filename, buffer_size, compression)
+        if compression is None:
+            self._file = open(filename, 'w', newline='', buffering=buffer_size)
+        else:
+            self._file = io.TextIOWrapper(_open_binary(filename, 'wb', compression, buffer_size), newline='')
+        self.fieldnames = fieldnames
+        self._writer = None
+        if fieldnames is not None:
+            self._start(fieldnames)
+
+    def _start(self, fieldnames):
+        self._writer = csv.DictWriter(self._file, fieldnames=list(fieldnames))
+        self._writer.writeheader()
+
+    def _write(self, item):
+        if not isinstance(item, dict):
+            raise ValueError("Item must be a dictionary for CSV format.")
+        if self._writer is None:
+            self._start(item.keys())
+        self.bytes_in += self._writer.writerow(item) or 0
+
+    def _close(self):
+        self._file.close()
+
+
+class NDJSONBackend(StorageBackend):
+    """One JSON document per line."""
+    name = 'ndjson'
+
+    def __init__(self, filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE, compression: str = None):
+        super().__init__(filename, buffer_size, compression)
+        self._file = _open_binary(filename, 'wb', compression, buffer_size)
+
+    def _write(self, item):
+        line = (json.dumps(item, default=custom_serializer) + '\n').encode('utf-8')
+        self.bytes_in += len(line)
+        self._file.write(line)
+
+    def _close(self):
+        self._file.close()
+
+
+class PickleBackend(StorageBackend):
+    """Length-prefixed pickle records, so a reader can skip or stream records without unpickling the file."""
+    name = 'pickle'
+
+    def __init__(self, filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE, compression: str = None):
+        super().__init__(filename, buffer_size, compression)
+        self._file = _open_binary(filename, 'wb', compression, buffer_size)
+
+    def _write(self, item):
+        payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        self.bytes_in += _LENGTH.size + len(payload)
+        self._file.write(_LENGTH.pack(len(payload)))
+        self._file.write(payload)
+
+    def _close(self):
+        self._file.close()
+
+
+class ColumnarBackend(StorageBackend):
+    """
+    Dict records stored column-wise. Rows are collected into per-column lists and converted to
+    NumPy chunks every COLUMNAR_CHUNK_ROWS rows; the columns are saved to a .npz file on close
+    (zip-deflated with compression='gzip', stored with None).
+    The first record fixes the columns; every record must have the same keys, and each column
+    must hold numbers, booleans or strings of one kind (no None), so the file loads without pickle.
+    """
+    name = 'columnar'
+    COMPRESSIONS = (None, 'gzip')
+    KINDS = {'b': 'boolean', 'i': 'number', 'u': 'number', 'f': 'number', 'U': 'string'}
+
+    def __init__(self, filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE, compression: str = 'gzip'):
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unsupported compression for columnar: {compression}. "
+                             f"Use one of {', '.join(str(c) for c in self.COMPRESSIONS)}.")
+        super().__init__(filename, buffer_size, compression)
+        self._columns = None
+        self._kinds = {}
+        self._pending = 0
+        self._chunks = {}
+
+    def _write(self, item):
+        if self._columns is None:
+            for key, value in item.items():  # reject unsupported values on the first record, not at close
+                self._kind(key, np.asarray([value]))
+            self._columns = {key: [] for key in item}
+            self._chunks = {key: [] for key in item}
+        elif item.keys() != self._columns.keys():
+            missing = sorted(set(self._columns) - set(item))
+            extra = sorted(set(item) - set(self._columns))
+            raise ValueError(f"Record {self.records + 1} does not match the columns of the first record "
+                             f"(missing {missing}, extra {extra}).")
+        for key, values in self._columns.items():
+            values.append(item[key])
+        self._pending += 1
+        if self._pending >= COLUMNAR_CHUNK_ROWS:
+            self._flush()
+
+    def _kind(self, key, chunk: np.ndarray) -> str:
+        """The column kind of `chunk`; ValueError if it is unsupported or differs from earlier rows."""
+        kind = self.KINDS.get(chunk.dtype.kind)
+        if kind is None:
+            raise ValueError(f"Column {key!r} has unsupported values (dtype {chunk.dtype}); "
+                             f"use numbers, booleans or strings without None.")
+        if self._kinds.setdefault(key, kind) != kind:
+            raise ValueError(f"Column {key!r} mixes {self._kinds[key]} and {kind} values.")
+        return kind
+
+    def _flush(self):
+        for key, values in self._columns.items():
+            chunk = np.asarray(values)
+            self._kind(key, chunk)
+            self.bytes_in += chunk.nbytes
+            self._chunks[key].append(chunk)
+            values.clear()
+        self._pending = 0
+
+    def _close(self):
+        if self._columns is None:
+            np.savez(self.filename)
+            return
+        if self._pending:
+            self._flush()
+        columns = {key: np.concatenate(chunks) for key, chunks in self._chunks.items()}
+        save = np.savez if self.compression is None else np.savez_compressed
+        with open(self.filename, 'wb') as f:
+            save(f, **columns)
+        self._chunks = {}
+
+
+BACKENDS = {
+    'csv': CSVBackend,
+    'ndjson': NDJSONBackend,
+    'pickle': PickleBackend,
+    'columnar': ColumnarBackend,
+}
+
+
+def open_backend(name: str, filename: str, **kwargs) -> StorageBackend:
+    """Open a storage backend by name ('csv', 'ndjson', 'pickle' or 'columnar')."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}. Use one of {', '.join(BACKENDS)}.")
+    return BACKENDS[name](filename, **kwargs)
+
+
+def read_records(name: str, filename: str, compression: str = None):
+    """Stream the records written by a backend back, one at a time."""
+    if name == 'csv':
+        with io.TextIOWrapper(_open_binary(filename, 'rb', compression), newline='') as f:
+            yield from csv.DictReader(f)
+    elif name == 'ndjson':
+        with _open_binary(filename, 'rb', compression) as f:
+            for line in f:
+                yield json.loads(line)
+    elif name == 'pickle':
+        with _open_binary(filename, 'rb', compression) as f:
+            while header := f.read(_LENGTH.size):
+                (length,) = _LENGTH.unpack(header)
+                yield pickle.loads(f.read(length))
+    elif name == 'columnar':
+        with np.load(filename, allow_pickle=False) as data:
+            columns = {key: data[key] for key in data.files}
+        for i in range(len(next(iter(columns.values()))) if columns else 0):
+            yield {key: values[i].item() for key, values in columns.items()}
+    else:
+        raise ValueError(f"Unknown storage backend: {name}. Use one of {', '.join(BACKENDS)}.")
+
+
+class DataSaver:
+    """
+    Streaming data storage with the DataSaver v3 interface, on top of the backends above.
+    Formats: 'csv', 'ndjson', 'json' (a JSON array, streamed), 'pickle', 'columnar' and 'shelve'.
+    """
+    def __init__(self, format: str = None, filename: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 compression: str = None):
+        self.format = format.lower()
+        self.filename = filename
+        self._shelf = None
+        self._backend = None
+        self._json_file = None
+        if self.format == 'shelve':
+            self._shelf = shelve.open(filename, flag='n')
+        elif self.format == 'json':
+            self._json_file = _open_binary(filename, 'wb', compression, buffer_size)
+            self._json_file.write(b'[')
+            self._json_count = 0
+        elif self.format in BACKENDS:
+            kwargs = {'buffer_size': buffer_size}
+            if compression is not None or self.format != 'columnar':
+                kwargs['compression'] = compression
+            self._backend = open_backend(self.format, filename, **kwargs)
+        else:
+            raise ValueError("Unsupported format for DataSaver")
+
+    def append(self, item: Any):
+        """Add an item to storage; it is written through the buffer, never accumulated in memory."""
+        if self._backend is not None:
+            self._backend.append(item)
+        elif self._json_file is not None:
+            if not isinstance(item, dict):
+                raise ValueError("Item must be a dictionary for JSON format.")
+            prefix = b',' if self._json_count else b''
+            self._json_file.write(prefix + json.dumps(item, default=custom_serializer).encode('utf-8'))
+            self._json_count += 1
+        else:
+            self._shelf[str(len(self._shelf))] = item
+
+    def stats(self):
+        """Throughput of the underlying backend, if any."""
+        return self._backend.stats() if self._backend is not None else None
+
+    def save_results(self, data: Union[dict, List], file_path: str, format: str = None):
+        """
+        Save the results data to file in the specified format ('csv', 'ndjson', 'json', 'pickle', 'columnar').
+        Returns the backend statistics.
+        """
+        longfile = os.path.join(SRC_DIR, file_path)
+        format = format.lower()
+        if format == 'json':
+            with open(longfile, 'w') as f:
+                json.dump(data, f, indent=4, default=custom_serializer)
+            return None
+        items = data if isinstance(data, list) else [data]
+        with open_backend(format, longfile) as backend:
+            backend.extend(items)
+        return backend.stats()
+
+    def close(self):
+        """Flush and close the storage."""
+        if self._backend is not None:
+            self._backend.close()
+        elif self._json_file is not None:
+            self._json_file.write(b']')
+            self._json_file.close()
+            self._json_file = None
+        elif self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
+
+
+def benchmark(records: int = 100_000, directory: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE) -> list[dict]:
+    """Write the same synthetic journal to every backend and compression, returning the statistics."""
+    import tempfile
+    directory = directory or tempfile.mkdtemp(prefix='cpf_storage_')
+    rows = [
+        {'date': '2025-05-01', 'transaction_reference': 100000000 + i, 'age': 50 + i % 40, 'account': 'oa',
+         'old_balance': 1000.0 + i, 'new_balance': 1010.5 + i, 'amount': 10.5, 'type': 'inflow',
+         'message': f"oa-Allocation for OA at age {50 + i % 40}-10.50"}
+        for i in range(records)
+    ]
+    results = []
+    for name in BACKENDS:
+        for compression in COMPRESSIONS:
+            if compression == 'zstd' and zstandard is None:
+                continue
+            filename = os.path.join(directory, f"journal_{name}_{compression or 'raw'}")
+            with open_backend(name, filename, buffer_size=buffer_size, compression=compression) as backend:
+                backend.extend(rows)
+            results.append(backend.stats())
+    return results
+
+
+if __name__ == "__main__":
+    # Example usage: compare the backends on a synthetic journal
+    for stats in sorted(benchmark(), key=lambda s: s['seconds']):
+        print(f"{stats['backend']:<10}{str(stats['compression']):<6}{stats['records']:>9,} records "
+              f"{stats['seconds']:>8.3f}s {stats['records_per_sec']:>12,.0f} rec/s "
+              f"{stats['mb_per_sec']:>8.2f} MB/s {stats['bytes_out']:>12,} bytes")
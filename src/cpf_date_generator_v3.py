@@ -2,10 +2,10 @@
 from datetime import date, datetime # Ensure date is imported
 from dateutil.relativedelta import relativedelta
 from calendar import monthrange
-from cpf_data_saver_v3 import DataSaver
 import os
 import json,csv
 from typing import Any
+from cpf_month_index_v1 import MonthCalendar, format_date, month_key
 
 SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
 CONFIG_FILENAME = os.path.join(SRC_DIR, 'cpf_config.json')  # Full path to the config file
@@ -52,6 +52,7 @@ class DateGenerator(object):
         self.data = None
         self.date_dict = {}
         self.date_list = []
+        self.calendar = None
 
     def convert_date_strings(self, key:str, date_str:str):    
         """
@@ -150,6 +151,14 @@ class DateGenerator(object):
             self.data = self.date_dict
         return self.date_dict
     
+    def generate_calendar(self) -> MonthCalendar:
+        """
+        The same months as generate_date_dict, as integer month indices and ages in two arrays.
+        No per-month date objects or 'YYYY-MM' keys are built; see cpf_month_index_v1.
+        """
+        self.calendar = MonthCalendar.from_dates(self.start_date, self.end_date, self.birth_date)
+        return self.calendar
+
 #    def convert_dates_to_datetime(self, date_str):
 #        """
 #        Convert date strings to datetime.date objects.
@@ -168,6 +177,12 @@ class DateGenerator(object):
        
         if format == 'csv':
             with open(DATE_LIST, 'w') as f:
+                if not self.date_dict and self.calendar is not None:
+                    # dates are formatted here, at the file boundary
+                    calendar = self.calendar
+                    for i, (month, age) in enumerate(zip(calendar.months.tolist(), calendar.ages.tolist())):
+                        first_day = calendar.first_day if i == 0 else 1
+                        f.write(f"{month_key(month)},{format_date(month, first_day)},{calendar.period_end(i)},{age}\n")
                 for key, value in self.date_dict.items():
                     f.write(f"{key},{value['period_start']},{value['period_end']},{value['age']}\n")
         elif format == 'json':
@@ -0,0 +1,200 @@
+## cpf_export_v1.py
+"""
+Streaming XML, CSV and JSON export of simulation results.
+
+Rows are taken one at a time from a SimulationResult (the simulation saves its last result to
+RESULT_FILE_PATH) and encoded in chunks by a generator, so an export never holds the whole
+document in memory. Finished exports are cached on disk under the result's hash, and are only
+rebuilt when the result changes; only the latest export per format is kept:
+
+    cache = ExportCache()
+    path = cache.export(load_result(), 'xml')   # builds once, then reuses
+"""
+import json
+import math
+import os
+import re
+from xml.sax.saxutils import escape
+
+from cpf_renderers_v1 import RESULT_FILE_PATH, SimulationResult
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+EXPORT_DIR = os.path.join(SRC_DIR, 'cpf_exports')  # Cached exports inside src folder
+
+CHUNK_ROWS = 1_000  # rows encoded per yielded chunk
+FORMATS = {
+    'xml': {'extension': 'xml', 'mime': 'application/xml'},
+    'csv': {'extension': 'csv', 'mime': 'text/csv'},
+    'json': {'extension': 'json', 'mime': 'application/json'},
+}
+_INVALID_TAG = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def iter_result_rows(result: SimulationResult):
+    """Yield the month rows of a SimulationResult as dicts, one at a time."""
+    columns = result.columns
+    for i, date_key in enumerate(result.date_keys):
+        yield {'date_key': date_key, 'age': result.ages[i], **{name: values[i] for name, values in columns.items()}}
+
+
+def _chunks(rows, encode_row):
+    buffer = []
+    for row in rows:
+        buffer.append(encode_row(row))
+        if len(buffer) >= CHUNK_ROWS:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def _tag(name) -> str:
+    tag = _INVALID_TAG.sub('_', str(name))
+    return tag if tag and not tag[0].isdigit() else f"n{tag}"
+
+
+def iter_xml(rows, root: str = 'CPFReport', item: str = 'item'):
+    """Encode rows as XML (the same layout dicttoxml produced), chunk by chunk."""
+    tags = {}
+
+    def encode(row):
+        parts = [f"<{item}>"]
+        for key, value in row.items():
+            tag = tags.get(key)
+            if tag is None:
+                tag = tags[key] = _tag(key)
+            parts.append(f"<{tag}>{escape(str(value))}</{tag}>")
+        parts.append(f"</{item}>")
+        return ''.join(parts)
+
+    yield f'<?xml version="1.0" encoding="UTF-8" ?><{root}>'.encode('utf-8')
+    yield from _chunks(rows, encode)
+    yield f"</{root}>".encode('utf-8')
+
+
+def iter_csv(rows):
+    """Encode rows as CSV, header taken from the first row."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    fieldnames = list(first)
+
+    def encode(row):
+        return ','.join(_csv_field(row.get(name, '')) for name in fieldnames) + '\r\n'
+
+    yield (','.join(_csv_field(name) for name in fieldnames) + '\r\n').encode('utf-8')
+    yield encode(first).encode('utf-8')
+    yield from _chunks(rows, encode)
+
+
+def _csv_field(value) -> str:
+    text = str(value)
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _json_value(value):
+    """Numeric text as a number; anything else (result rows are already numbers) unchanged."""
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return number if math.isfinite(number) else value
+
+
+def iter_json(rows):
+    """Encode rows as a JSON array of objects, with numeric columns as numbers."""
+    def encode(row):
+        return json.dumps({key: _json_value(value) for key, value in row.items()})
+
+    rows = iter(rows)
+    first = next(rows, None)
+    yield b'['
+    if first is not None:
+        yield encode(first).encode('utf-8')
+        yield from _chunks(rows, lambda row: ',' + encode(row))
+    yield b']'
+
+
+ENCODERS = {'xml': iter_xml, 'csv': iter_csv, 'json': iter_json}
+
+
+def iter_export(rows, fmt: str):
+    """Streaming encoder for `fmt` over `rows`."""
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unknown export format: {fmt}. Use one of {', '.join(ENCODERS)}.")
+    return ENCODERS[fmt](rows)
+
+
+_loaded: dict[tuple, SimulationResult] = {}
+
+
+def load_result(filename: str = RESULT_FILE_PATH) -> SimulationResult:
+    """
+    The SimulationResult saved in `filename`. The file is only re-read when its size or modification
+    time changes, so repeated lookups (e.g. every Streamlit rerun) cost a stat() call.
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    result = _loaded.get(key)
+    if result is None:
+        _loaded.clear()
+        result = _loaded[key] = SimulationResult.load(filename)
+    return result
+
+
+class ExportCache:
+    """
+    Exports written to disk once per (result hash, format) and reused afterwards.
+    Writing a new export removes the older exports of the same format.
+    """
+
+    def __init__(self, directory: str = EXPORT_DIR):
+        self.directory = directory
+
+    def path_for(self, digest: str, fmt: str, stem: str = 'cpf_result') -> str:
+        return os.path.join(self.directory, f"{stem}_{digest[:16]}.{FORMATS[fmt]['extension']}")
+
+    def cached(self, result: SimulationResult, fmt: str):
+        """Path of an existing export of `result` in `fmt`, or None."""
+        path = self.path_for(result.digest(), fmt)
+        return path if os.path.exists(path) else None
+
+    def export(self, result: SimulationResult, fmt: str = 'xml') -> str:
+        """Stream `result` into the cache in `fmt` unless it is already there; return the file path."""
+        path = self.path_for(result.digest(), fmt)
+        if os.path.exists(path):
+            return path
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            for chunk in iter_export(iter_result_rows(result), fmt):
+                f.write(chunk)
+        os.replace(tmp, path)
+        self.prune(path, fmt)
+        return path
+
+    def prune(self, keep: str, fmt: str, stem: str = 'cpf_result'):
+        """Remove the exports in `fmt` other than `keep` (older result hashes)."""
+        stale = re.compile(rf"{re.escape(stem)}_[0-9a-f]{{16}}\.{re.escape(FORMATS[fmt]['extension'])}")
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if stale.fullmatch(name) and path != keep:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    # Example usage
+    cache = ExportCache()
+    result = load_result()
+    for fmt in FORMATS:
+        path = cache.export(result, fmt)
+        print(f"{fmt:<5} {os.path.getsize(path):>12,} bytes  {path}")
@@ -0,0 +1,58 @@
+## cpf_fixtures_v1.py
+"""
+Member fixtures shared by the batch drivers, the benchmark harness and the tests.
+
+ALLOCATION_DATA is the zero allocation the single-member driver passes in (the engine fills in
+the amounts from the config); synthetic_members generates reproducible member profiles that
+override the base cpf_config.json:
+
+    members = synthetic_members(100)
+    config = {**base, **members[0]}
+"""
+import json
+import random
+from datetime import date
+
+SEED = 20250501
+
+ALLOCATION_DATA = {
+    'allocation_below_55': {
+        'oa': {'allocation': 0.0, 'amount': 0.0},
+        'sa': {'allocation': 0.0, 'amount': 0.0},
+        'ma': {'allocation': 0.0, 'amount': 0.0},
+    },
+    'allocation_above_55': {
+        'oa': {'allocation': 0.0, 'amount': 0.0},
+        'sa': {'allocation': 0.0, 'amount': 0.0},
+        'ma': {'allocation': 0.0, 'amount': 0.0},
+        'ra': {'allocation': 0.0, 'amount': 0.0},
+    }
+}
+
+
+def allocation_data() -> dict:
+    """A fresh copy of ALLOCATION_DATA (the engine writes the computed amounts into it)."""
+    return json.loads(json.dumps(ALLOCATION_DATA))
+
+
+def synthetic_members(count: int, seed: int = SEED) -> list[dict]:
+    """Generate reproducible member profiles that override the base config."""
+    rng = random.Random(seed)
+    members = []
+    for _ in range(count):
+        birth = date(rng.randint(1960, 2000), rng.randint(1, 12), rng.randint(1, 28))
+        members.append({
+            'birth_date': birth.strftime('%Y-%m-%d'),
+            'salary': rng.choice([3000, 4500, 6000, 7400]),
+            'oa_balance': round(rng.uniform(0, 200_000), 2),
+            'sa_balance': round(rng.uniform(0, 250_000), 2),
+            'ma_balance': round(rng.uniform(0, 80_000), 2),
+            'loan_balance': round(rng.choice([0.0, rng.uniform(50_000, 300_000)]), 2),
+        })
+    return members
+
+
+if __name__ == "__main__":
+    # Example usage
+    for member in synthetic_members(3):
+        print(member)
@@ -0,0 +1,222 @@
+## cpf_history_import_v1.py
+"""
+Bulk import of a member's actual CPF history, so projections start from real balances.
+
+The history is a CSV of monthly transactions, one row per posting, in chronological order:
+
+    date,account,amount,event,message
+    2019-01-31,oa,1150.00,ALLOCATION,
+    2019-01-31,sa,300.00,ALLOCATION,
+    2019-12-31,oa,410.27,INTEREST,
+    2020-03-31,oa,-1687.39,LOAN_PAYMENT,housing instalment
+
+date is 'YYYY-MM' or 'YYYY-MM-DD', account one of oa/sa/ma/ra/loan/excess, amount a signed
+dollar amount, event an EventType name (cpf_ledger_v1, default ALLOCATION) and message optional
+free text for the reader. Opening balances, if the history does not start from zero, are
+INITIAL_BALANCE rows.
+
+Rows are streamed and validated one at a time and posted to a CPFLedger. Each month's closing
+balances become a result row (SimulationResult), and the SQLite cpf_data table receives the
+month rows in batches of `batch_size` with executemany. Bad rows raise HistoryError, or with
+strict=False are skipped and reported. The projection then continues from the month after the
+last actual month, without re-simulating the history:
+
+    history = import_history('member_history.csv', config, conn=create_connection())
+    main(allocation, history=history)
+"""
+import csv
+import math
+from datetime import date
+
+import numpy as np
+
+from cpf_config_loader_v10 import ConfigLoader
+from cpf_ledger_v1 import ACCOUNTS, ACCOUNT_CODES, CPFLedger, EventType
+from cpf_money_v1 import MONEY_DTYPE, to_cents, to_dollars
+from cpf_month_index_v1 import ages_at_month_end, month_index, month_key, year_month
+from cpf_renderers_v1 import SimulationResult
+
+HISTORY_FIELDS = ('date', 'account', 'amount', 'event', 'message')
+CPF_ACCOUNTS = ('oa', 'sa', 'ma', 'ra')  # may not go negative
+DEFAULT_BATCH_SIZE = 1000
+FIRST_REFERENCE = 100000000
+
+
+class HistoryError(ValueError):
+    """An invalid history row; line is the line number in the CSV file."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def parse_row(line: int, row: dict, previous_month: int = None) -> tuple[int, str, int, EventType]:
+    """Validate one CSV row; returns (month index, account, cents, event) or raises HistoryError."""
+    text = (row.get('date') or '').strip()
+    try:
+        if len(text) < 7 or text[4] != '-' or not 1 <= int(text[5:7]) <= 12 or int(text[0:4]) < 1900:
+            raise ValueError
+        month = month_index(text)
+    except ValueError:
+        raise HistoryError(line, f"invalid date {row.get('date')!r}") from None
+    if previous_month is not None and month < previous_month:
+        raise HistoryError(line, f"{month_key(month)} is before {month_key(previous_month)}; rows must be in date order")
+
+    account = (row.get('account') or '').strip().lower()
+    if account not in ACCOUNT_CODES:
+        raise HistoryError(line, f"invalid account {row.get('account')!r}; use one of {', '.join(ACCOUNTS)}")
+
+    try:
+        amount = float(row.get('amount'))
+    except (TypeError, ValueError):
+        raise HistoryError(line, f"invalid amount {row.get('amount')!r}") from None
+    if not math.isfinite(amount):
+        raise HistoryError(line, f"invalid amount {row.get('amount')!r}")
+
+    name = (row.get('event') or 'ALLOCATION').strip().upper()
+    try:
+        event = EventType(int(name)) if name.isdigit() else EventType[name]
+    except (KeyError, ValueError):
+        raise HistoryError(line, f"invalid event {row.get('event')!r}") from None
+    return month, account, to_cents(amount), event
+
+
+class HistoryImport:
+    """The imported history of one member: ledger, month rows, closing balances and rejected rows."""
+
+    def __init__(self, birth_date: date):
+        self.birth_date = birth_date
+        self.ledger = CPFLedger()
+        self.result = SimulationResult()
+        self.cents = np.zeros(len(ACCOUNTS), dtype=MONEY_DTYPE)
+        self.first_month = None
+        self.last_month = None
+        self.postings = 0
+        self.errors: list[HistoryError] = []
+
+    @property
+    def months(self) -> int:
+        """Number of month rows imported."""
+        return len(self.result)
+
+    def balances(self) -> dict[str, float]:
+        """Closing balances of the last actual month."""
+        return {account: to_dollars(int(cents)) for account, cents in zip(ACCOUNTS, self.cents)}
+
+    def projection_config(self, config) -> ConfigLoader:
+        """
+        In-memory copy of the config that starts the projection the month after the history,
+        from the closing balances.
+        """
+        data = dict(config.getdata())
+        if self.last_month is None:
+            return ConfigLoader.from_dict(data)
+        year, calendar_month = year_month(self.last_month + 1)
+        data['start_date'] = f"{year:04d}-{calendar_month:02d}-01"
+        data.update({f"{account}_balance": balance for account, balance in self.balances().items()})
+        return ConfigLoader.from_dict(data)
+
+
+def import_history(filename: str, config, conn=None, batch_size: int = DEFAULT_BATCH_SIZE, strict: bool = True,
+                   first_reference: int = FIRST_REFERENCE) -> HistoryImport:
+    """
+    Stream `filename` into a HistoryImport; with a database connection the month rows are also
+    written to cpf_data, batch_size rows per transaction.
+    strict=False skips invalid rows (collected in .errors) instead of raising HistoryError.
+    """
+    birth_date = date.fromisoformat(config.getdata('birth_date'))
+    end_month = month_index(config.getdata('end_date'))
+    history = HistoryImport(birth_date)
+    pending = []  # month rows waiting for the next database batch
+
+    if conn is not None:
+        from cpf_run_simulation_v8 import create_table
+        create_table(conn)
+
+    def flush():
+        if conn is not None and pending:
+            conn.executemany("""
+                INSERT OR REPLACE INTO cpf_data (
+                    date_key, dbreference, age, oa_balance, sa_balance, ma_balance, ra_balance, loan_balance, excess_balance, cpf_payout, message
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, pending)
+            conn.commit()
+        pending.clear()
+
+    def close_months(month: int, payout: int, through: int):
+        """Rows for `month` and any months without postings up to `through`, all at the current balances."""
+        months = np.arange(month, through + 1)
+        ages = ages_at_month_end(months, birth_date).tolist()
+        balances = [to_dollars(int(cents)) for cents in history.cents]
+        oa, sa, ma, ra, loan, excess = (balances[ACCOUNT_CODES[account]] for account in ('oa', 'sa', 'ma', 'ra', 'loan', 'excess'))
+        for row_month, age in zip(months.tolist(), ages):
+            paid = to_dollars(payout) if row_month == month else 0.0
+            history.result.add_row(row_month, age, oa, sa, ma, ra, loan, excess, paid)
+            pending.append((month_key(row_month), first_reference + len(history.result), age, oa, sa, ma, ra, loan, excess,
+                            paid, f"Age {age} - Actual CPF history"))
+            if len(pending) >= batch_size:
+                flush()
+
+    with open(filename, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [field for field in ('date', 'account', 'amount') if field not in (reader.fieldnames or [])]
+        if missing:
+            raise HistoryError(1, f"missing column(s) {', '.join(missing)}")
+
+        month_payout = 0
+        for line, row in enumerate(reader, start=2):
+            try:
+                month, account, cents, event = parse_row(line, row, history.last_month)
+                if month > end_month:
+                    raise HistoryError(line, f"{month_key(month)} is after the end date {config.getdata('end_date')}")
+                code = ACCOUNT_CODES[account]
+                if account in CPF_ACCOUNTS and history.cents[code] + cents < 0:
+                    raise HistoryError(line, f"{account.upper()} would go negative ({to_dollars(int(history.cents[code] + cents)):,.2f})")
+            except HistoryError as error:
+                if strict:
+                    raise
+                history.errors.append(error)
+                continue
+
+            if history.last_month is not None and month != history.last_month:
+                close_months(history.last_month, month_payout, month - 1)
+                month_payout = 0
+            if history.first_month is None:
+                history.first_month = month
+            history.last_month = month
+            history.cents[code] += cents
+            history.postings += 1
+            history.ledger.post_cents(month, account, cents, event, first_reference + history.postings)
+            if event == EventType.PAYOUT and account == 'ra':
+                month_payout -= cents
+
+        if history.last_month is not None:
+            close_months(history.last_month, month_payout, history.last_month)
+    flush()
+    return history
+
+
+if __name__ == "__main__":
+    # Example usage: two years of made-up history, then the projection's starting point
+    import os
+    import tempfile
+
+    config = ConfigLoader('cpf_config.json')
+    rows = [{'date': '2023-01-31', 'account': account, 'amount': amount, 'event': 'INITIAL_BALANCE'}
+            for account, amount in (('oa', 150_000.0), ('sa', 220_000.0), ('ma', 60_000.0), ('loan', 270_000.0))]
+    for year in (2023, 2024):
+        for calendar_month in range(1, 13):
+            when = f"{year}-{calendar_month:02d}"
+            rows += [{'date': when, 'account': 'oa', 'amount': 1702.21}, {'date': when, 'account': 'sa', 'amount': 443.83},
+                     {'date': when, 'account': 'ma', 'amount': 591.96},
+                     {'date': when, 'account': 'oa', 'amount': -1687.39, 'event': 'LOAN_PAYMENT'},
+                     {'date': when, 'account': 'loan', 'amount': -1250.00, 'event': 'LOAN_PAYMENT'}]
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    history = import_history(f.name, config)
+    os.unlink(f.name)
+    print(f"{history.postings} postings, {history.months} months ({month_key(history.first_month)} .. {month_key(history.last_month)})")
+    print(f"closing balances {history.balances()}")
+    print(f"projection starts {history.projection_config(config).getdata('start_date')}")
@@ -0,0 +1,150 @@
+## cpf_instrumentation_v1.py
+"""
+Lightweight per-stage profiling for a simulation run.
+
+Enable it with the CPF_PROFILE environment variable (CPF_PROFILE=1) or by calling enable(),
+e.g. from a --profile command line flag. When disabled, span() returns a shared no-op
+context manager and count() returns immediately, so instrumented code costs almost nothing.
+
+    with span('month_loop'):
+        ...
+        count('events_posted')
+
+    write_report()   # per-run timing breakdown as JSON
+"""
+from contextlib import nullcontext
+import json
+import os
+import time
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+TIMINGS_FILE_PATH = os.path.join(SRC_DIR, 'cpf_timings.json')  # Timing report path inside src folder
+ENV_VAR = 'CPF_PROFILE'
+
+_NOOP = nullcontext()
+_enabled = os.environ.get(ENV_VAR, '').lower() in ('1', 'true', 'yes', 'on')
+_spans: dict[str, dict] = {}
+_counters: dict[str, int] = {}
+_gauges: dict[str, int] = {}
+_started = time.perf_counter()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Clear all recorded spans, counters and gauges."""
+    global _started
+    _spans.clear()
+    _counters.clear()
+    _gauges.clear()
+    _started = time.perf_counter()
+
+
+class _Span:
+    """Context manager accumulating wall time under a name."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        entry = _spans.get(self.name)
+        if entry is None:
+            _spans[self.name] = {'seconds': elapsed, 'calls': 1}
+        else:
+            entry['seconds'] += elapsed
+            entry['calls'] += 1
+        return False
+
+
+def span(name: str):
+    """Time a block of code under `name`. Repeated spans with the same name accumulate."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Increment a counter such as events posted or rows inserted."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def gauge(name: str, value: int) -> None:
+    """Record the high-water mark of a value such as queue depth."""
+    if _enabled and value > _gauges.get(name, value - 1):
+        _gauges[name] = value
+
+
+def report() -> dict:
+    """Return the timing breakdown of the run so far."""
+    total = time.perf_counter() - _started
+    return {
+        'total_seconds': round(total, 6),
+        'spans': {
+            name: {
+                'seconds': round(entry['seconds'], 6),
+                'calls': entry['calls'],
+                'share': round(entry['seconds'] / total, 4) if total else 0.0,
+            }
+            for name, entry in _spans.items()
+        },
+        'counters': dict(_counters),
+        'gauges': dict(_gauges),
+    }
+
+
+def write_report(filename: str = TIMINGS_FILE_PATH, merge: bool = False) -> None:
+    """
+    Write the timing breakdown as JSON when profiling is enabled.
+    With merge=True the spans and counters are added to an existing report,
+    so the report and analysis steps can extend the breakdown of the simulation run.
+    """
+    if not _enabled:
+        return
+    data = report()
+    existing = load_report(filename) if merge else None
+    if existing:
+        existing['total_seconds'] = round(existing.get('total_seconds', 0.0) + data['total_seconds'], 6)
+        existing.setdefault('spans', {}).update(data['spans'])
+        for name, value in data['counters'].items():
+            existing.setdefault('counters', {})[name] = existing['counters'].get(name, 0) + value
+        existing.setdefault('gauges', {}).update(data['gauges'])
+        data = existing
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=4)
+    print(f"Timing report saved to {filename}")
+
+
+def load_report(filename: str = TIMINGS_FILE_PATH):
+    """Load a previously written timing report, or None if there is none."""
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    # Example usage
+    enable()
+    with span('example'):
+        for _ in range(1000):
+            count('iterations')
+    print(json.dumps(report(), indent=4))
@@ -0,0 +1,168 @@
+## cpf_interest_v1.py
+"""
+Vectorized base and extra interest for the CPF accounts.
+
+Rates are read from the config once into an InterestPolicy; interest for all four accounts,
+and for any number of members, is then computed with array operations over the capped
+balance tiers used for extra interest.
+
+Two conventions are supported:
+    december        - one month of interest on the December balances, posted in December
+                      (the engine's original behaviour)
+    monthly_accrual - interest accrues every month on the month-end balances and the
+                      accumulated amount is credited in December, as CPF Board does
+"""
+import numpy as np
+
+CONVENTIONS = ('december', 'monthly_accrual')
+ACCOUNTS = ('oa', 'sa', 'ma', 'ra')
+
+# Capped balance tiers for extra interest
+OA_CAP = 20_000
+SA_CAP_BELOW_55 = 40_000
+MA_CAP_BELOW_55 = 40_000
+FIRST_TIER = 30_000
+SECOND_TIER = 30_000
+
+
+class InterestPolicy:
+    """Interest and extra interest rates (annual, in percent) read once from the config."""
+
+    def __init__(self, oa_below_55=2.5, oa_above_55=4.0, sa=4.0, ma=4.0, ra=4.0,
+                 extra_below_55=1.0, extra_first_30k=2.0, extra_next_30k=1.0,
+                 convention='december'):
+        if convention not in CONVENTIONS:
+            raise ValueError(f"Unknown interest convention: {convention}. Use one of {', '.join(CONVENTIONS)}.")
+        self.oa_below_55 = float(oa_below_55)
+        self.oa_above_55 = float(oa_above_55)
+        self.sa = float(sa)
+        self.ma = float(ma)
+        self.ra = float(ra)
+        self.extra_below_55 = float(extra_below_55)
+        self.extra_first_30k = float(extra_first_30k)
+        self.extra_next_30k = float(extra_next_30k)
+        self.convention = convention
+
+    @classmethod
+    def from_config(cls, config) -> "InterestPolicy":
+        return cls(
+            oa_below_55=config.getdata(['interest_rates', 'oa_below_55'], 2.5),
+            oa_above_55=config.getdata(['interest_rates', 'oa_above_55'], 4.0),
+            sa=config.getdata(['interest_rates', 'sa'], 4.0),
+            ma=config.getdata(['interest_rates', 'ma'], 4.0),
+            ra=config.getdata(['interest_rates', 'ra'], 4.0),
+            extra_below_55=config.getdata(['extra_interest', 'below_55'], 1.0),
+            extra_first_30k=config.getdata(['extra_interest', 'first_30k_above_55'], 2.0),
+            extra_next_30k=config.getdata(['extra_interest', 'next_30k_above_55'], 1.0),
+            convention=config.getdata('interest_convention', 'december'),
+        )
+
+
+def _arrays(oa, sa, ma, ra, ages):
+    return (np.atleast_1d(np.asarray(oa, dtype=np.float64)), np.atleast_1d(np.asarray(sa, dtype=np.float64)),
+            np.atleast_1d(np.asarray(ma, dtype=np.float64)), np.atleast_1d(np.asarray(ra, dtype=np.float64)),
+            np.atleast_1d(np.asarray(ages)))
+
+
+def capped_balances(oa, sa, ma, ra, ages):
+    """
+    Balances that earn extra interest, per member (same tiers as CPFAccount.calculate_combined_balance):
+        below 55   - OA up to 20k, SA up to 40k, MA up to 40k unless OA + SA already reach 60k
+        55 and up  - OA up to 20k, MA up to the rest of the first 30k, RA up to 30k unless OA + MA reach 30k
+    """
+    oa, sa, ma, ra, ages = _arrays(oa, sa, ma, ra, ages)
+    below = ages < 55
+    oa_capped = np.minimum(oa, OA_CAP)
+
+    sa_below = np.minimum(sa, SA_CAP_BELOW_55)
+    ma_below = np.where(oa_capped + sa_below == 60_000, 0.0, np.minimum(ma, MA_CAP_BELOW_55))
+
+    ma_above = np.minimum(ma, FIRST_TIER - oa_capped)
+    ra_above = np.where(oa_capped + ma_above == FIRST_TIER, 0.0, np.minimum(ra, FIRST_TIER))
+
+    return (oa_capped,
+            np.where(below, sa_below, 0.0),
+            np.where(below, ma_below, ma_above),
+            np.where(below, 0.0, ra_above))
+
+
+def base_interest(oa, sa, ma, ra, ages, policy: InterestPolicy):
+    """One month of base interest per account; accounts with no positive balance earn nothing."""
+    oa, sa, ma, ra, ages = _arrays(oa, sa, ma, ra, ages)
+    oa_rate = np.where(ages < 55, policy.oa_below_55, policy.oa_above_55) / 100 / 12
+    return {
+        'oa': np.where(oa > 0, oa_rate * oa, 0.0),
+        'sa': np.where(sa > 0, (policy.sa / 100 / 12) * sa, 0.0),
+        'ma': np.where(ma > 0, (policy.ma / 100 / 12) * ma, 0.0),
+        'ra': np.where(ra > 0, (policy.ra / 100 / 12) * ra, 0.0),
+    }
+
+
+def extra_interest(oa, sa, ma, ra, ages, policy: InterestPolicy):
+    """
+    One month of extra interest per account.
+    Below 55 the extra interest on OA is credited to SA. From 55 the extra interest is
+    credited to RA on the first and next 30k of combined balances.
+    """
+    oa, sa, ma, ra, ages = _arrays(oa, sa, ma, ra, ages)
+    below = ages < 55
+    oa_c, sa_c, ma_c, ra_c = capped_balances(oa, sa, ma, ra, ages)
+
+    rate_below = policy.extra_below_55 / 100 / 12
+    total = oa_c + sa_c + ma_c + ra_c
+    first = np.minimum(total, FIRST_TIER)
+    following = np.minimum(total - first, SECOND_TIER)
+    ra_above = np.where(first == FIRST_TIER, FIRST_TIER * (policy.extra_first_30k / 100 / 12),
+                        np.where(following == SECOND_TIER, SECOND_TIER * (policy.extra_next_30k / 100 / 12), 0.0))
+
+    zeros = np.zeros_like(total)
+    return {
+        'oa': zeros,
+        'sa': np.where(below, oa_c * rate_below + sa_c * rate_below, 0.0),
+        'ma': np.where(below, ma_c * rate_below, 0.0),
+        'ra': np.where(below, 0.0, ra_above),
+    }
+
+
+def monthly_interest(oa, sa, ma, ra, ages, policy: InterestPolicy):
+    """Base and extra interest for one month, as two dicts of per-member arrays."""
+    return base_interest(oa, sa, ma, ra, ages, policy), extra_interest(oa, sa, ma, ra, ages, policy)
+
+
+class InterestAccrual:
+    """
+    Month-by-month interest accumulators for one or many members.
+    accrue() is called every month; credit() returns the accumulated base and extra
+    interest per account and starts a new year.
+    """
+
+    def __init__(self, policy: InterestPolicy, members: int = 1):
+        self.policy = policy
+        self.members = members
+        self._base = {account: np.zeros(members) for account in ACCOUNTS}
+        self._extra = {account: np.zeros(members) for account in ACCOUNTS}
+
+    def accrue(self, oa, sa, ma, ra, ages) -> None:
+        base, extra = monthly_interest(oa, sa, ma, ra, ages, self.policy)
+        for account in ACCOUNTS:
+            self._base[account] += base[account]
+            self._extra[account] += extra[account]
+
+    def credit(self):
+        base, extra = self._base, self._extra
+        self._base = {account: np.zeros(self.members) for account in ACCOUNTS}
+        self._extra = {account: np.zeros(self.members) for account in ACCOUNTS}
+        return base, extra
+
+
+if __name__ == "__main__":
+    # Example usage: a batch of members at the December of one year
+    policy = InterestPolicy()
+    oa = np.array([15_000.0, 80_000.0, 5_000.0])
+    sa = np.array([30_000.0, 120_000.0, 0.0])
+    ma = np.array([20_000.0, 70_000.0, 40_000.0])
+    ra = np.array([0.0, 0.0, 200_000.0])
+    ages = np.array([35, 50, 60])
+    base, extra = monthly_interest(oa, sa, ma, ra, ages, policy)
+    for account in ACCOUNTS:
+        print(f"{account.upper()}  base {base[account]}  extra {extra[account]}")
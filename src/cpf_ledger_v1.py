@@ -0,0 +1,172 @@
+## cpf_ledger_v1.py
+from array import array
+from bisect import bisect_right
+from enum import IntEnum
+import os
+
+import numpy as np
+
+from cpf_money_v1 import MONEY_DTYPE, to_cents
+from cpf_month_index_v1 import month_index
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+LEDGER_FILE_PATH = os.path.join(SRC_DIR, 'cpf_ledger.npz')  # Ledger file path inside src folder
+
+ACCOUNTS = ('oa', 'sa', 'ma', 'ra', 'loan', 'excess')
+ACCOUNT_CODES = {account: code for code, account in enumerate(ACCOUNTS)}
+SNAPSHOT_INTERVAL = 256
+
+
+class EventType(IntEnum):
+    """Typed ledger events, stored as a single byte per entry."""
+    INITIAL_BALANCE = 0
+    ALLOCATION = 1
+    INTEREST = 2
+    EXTRA_INTEREST = 3
+    LOAN_PAYMENT = 4
+    PAYOUT = 5
+    AGE_55_TRANSFER = 6
+    ADJUSTMENT = 7
+
+
+class CPFLedger:
+    """
+    Append-only ledger of typed CPF events.
+    Every entry is stored in compact typed arrays:
+        month       - months since year 0 (see month_index)
+        account     - integer account code (see ACCOUNT_CODES)
+        event       - EventType code
+        amount      - signed amount in cents
+        reference   - transaction reference
+    Running balances are snapshotted every `snapshot_interval` events so any
+    point-in-time query costs a binary search plus at most one interval of replay.
+    """
+
+    def __init__(self, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        if snapshot_interval <= 0:
+            raise ValueError("snapshot_interval must be a positive integer")
+        self.snapshot_interval = snapshot_interval
+        self._month = array('l')
+        self._account = array('b')
+        self._event = array('b')
+        self._amount = array('q')
+        self._reference = array('q')
+        self._running = [0] * len(ACCOUNTS)
+        # snapshot i holds the balances after the first _snapshot_positions[i] events
+        self._snapshot_positions = [0]
+        self._snapshot_balances = [tuple(self._running)]
+
+    def __len__(self):
+        return len(self._amount)
+
+    def post(self, month, account: str, amount: float, event: EventType = EventType.ADJUSTMENT, reference: int = 0) -> None:
+        """
+        Append one event to the ledger. Events must be posted in chronological order.
+        """
+        self.post_cents(month, account, to_cents(amount), event, reference)
+
+    def post_cents(self, month, account: str, cents: int, event: EventType = EventType.ADJUSTMENT, reference: int = 0) -> None:
+        """Append one event whose amount is already in integer cents."""
+        code = ACCOUNT_CODES.get(account)
+        if code is None:
+            raise ValueError(f"Invalid account name for ledger: {account}")
+        self._append(month_index(month), code, int(event), int(cents), int(reference))
+
+    def _append(self, month: int, code: int, event: int, cents: int, reference: int) -> None:
+        """Append one already-encoded event and refresh the running balances."""
+        if self._month and month < self._month[-1]:
+            raise ValueError(f"Ledger is append-only: month {month} is before {self._month[-1]}")
+        self._month.append(month)
+        self._account.append(code)
+        self._event.append(event)
+        self._amount.append(cents)
+        self._reference.append(reference)
+        self._running[code] += cents
+
+        if len(self._amount) % self.snapshot_interval == 0:
+            self._snapshot_positions.append(len(self._amount))
+            self._snapshot_balances.append(tuple(self._running))
+
+    def balances(self) -> dict[str, float]:
+        """Return the current balance of every account."""
+        return {account: cents / 100 for account, cents in zip(ACCOUNTS, self._running)}
+
+    def balances_at(self, position: int) -> dict[str, float]:
+        """
+        Return the balances after the first `position` events,
+        replaying forward from the nearest snapshot.
+        """
+        position = max(0, min(position, len(self._amount)))
+        snapshot = bisect_right(self._snapshot_positions, position) - 1
+        start = self._snapshot_positions[snapshot]
+        totals = np.array(self._snapshot_balances[snapshot], dtype=MONEY_DTYPE)
+        if position > start:
+            accounts = np.frombuffer(self._account, dtype=np.int8)[start:position]
+            amounts = np.frombuffer(self._amount, dtype=MONEY_DTYPE)[start:position]
+            np.add.at(totals, accounts, amounts)
+        return {account: int(cents) / 100 for account, cents in zip(ACCOUNTS, totals)}
+
+    def balances_at_month(self, month) -> dict[str, float]:
+        """Return the balances at the end of the given month."""
+        return self.balances_at(bisect_right(self._month, month_index(month)))
+
+    def replay(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rebuild the month-end balances for every month that has events.
+        Returns (months, balances) where balances has one column per account in cents.
+        """
+        if not self._amount:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(ACCOUNTS)), dtype=MONEY_DTYPE)
+        months = np.frombuffer(self._month, dtype=np.dtype(self._month.typecode))
+        accounts = np.frombuffer(self._account, dtype=np.int8)
+        amounts = np.frombuffer(self._amount, dtype=MONEY_DTYPE)
+
+        flows = np.zeros((len(amounts), len(ACCOUNTS)), dtype=MONEY_DTYPE)
+        flows[np.arange(len(amounts)), accounts] = amounts
+        running = np.cumsum(flows, axis=0)
+
+        # Last event of each month carries that month's closing balance
+        last_of_month = np.flatnonzero(np.diff(months, append=months[-1] + 1))
+        return months[last_of_month].astype(np.int64), running[last_of_month]
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Return the ledger columns as NumPy arrays."""
+        return {
+            'month': np.array(self._month, dtype=np.int64),
+            'account': np.array(self._account, dtype=np.int8),
+            'event': np.array(self._event, dtype=np.int8),
+            'amount': np.array(self._amount, dtype=MONEY_DTYPE),
+            'reference': np.array(self._reference, dtype=np.int64),
+        }
+
+    def save(self, filename: str = LEDGER_FILE_PATH) -> None:
+        """Save the ledger columns to a compressed .npz file."""
+        np.savez_compressed(filename, snapshot_interval=self.snapshot_interval, **self.to_arrays())
+
+    @classmethod
+    def load(cls, filename: str = LEDGER_FILE_PATH) -> "CPFLedger":
+        """Load a ledger saved with `save`, rebuilding the snapshots."""
+        with np.load(filename) as data:
+            ledger = cls(snapshot_interval=int(data['snapshot_interval']))
+            for month, account, event, amount, reference in zip(
+                data['month'].tolist(), data['account'].tolist(), data['event'].tolist(),
+                data['amount'].tolist(), data['reference'].tolist()
+            ):
+                ledger._append(month, account, event, amount, reference)
+        return ledger
+
+
+if __name__ == "__main__":
+    # Example usage
+    ledger = CPFLedger(snapshot_interval=4)
+    ledger.post('2025-05', 'oa', 167892.11, EventType.INITIAL_BALANCE, 100000001)
+    ledger.post('2025-05', 'sa', 253163.35, EventType.INITIAL_BALANCE, 100000002)
+    for month in range(1, 13):
+        key = f"2025-{month:02d}"
+        if month < 5:
+            continue
+        ledger.post(key, 'oa', 1702.21, EventType.ALLOCATION)
+        ledger.post(key, 'sa', 443.83, EventType.ALLOCATION)
+    print(f"Events: {len(ledger)}")
+    print(f"Balances at 2025-08: {ledger.balances_at_month('2025-08')}")
+    print(f"Balances now: {ledger.balances()}")
@@ -0,0 +1,208 @@
+## cpf_loan_v1.py
+"""
+Loan amortization schedules, built up front as arrays.
+
+A LoanSchedule holds one entry per month from the start of the simulation:
+payment, principal, interest and closing balance, all in integer cents.
+The month loop only indexes into it.
+
+Config keys (all optional):
+    loan_balance         - outstanding principal at the start date
+    loan_interest_rate   - annual rate in percent, e.g. 2.6 (HDB concessionary rate)
+    loan_tenor_years     - remaining tenor in years
+    loan_rate_resets     - {"<month offset>": <new annual rate>, ...}
+    loan_prepayments     - {"<month offset>": <amount>, ...}
+    loan_payments        - legacy fixed instalments {"year_1_2", "year_3", "year_4_beyond"},
+                           used when no loan_interest_rate is configured
+"""
+import numpy as np
+
+from cpf_money_v1 import MONEY_DTYPE, to_cents, to_cents_array, to_dollars
+
+
+def annuity_payment(principal, monthly_rate, months):
+    """
+    Level monthly payment that clears `principal` in `months` at `monthly_rate`.
+    Works element-wise on NumPy arrays.
+    """
+    principal = np.asarray(principal, dtype=np.float64)
+    monthly_rate = np.asarray(monthly_rate, dtype=np.float64)
+    months = np.asarray(months, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + monthly_rate) ** months
+        payment = np.where(monthly_rate > 0, principal * monthly_rate * growth / (growth - 1), principal / months)
+    return np.where(months > 0, payment, principal)
+
+
+def _balance_path(principal, monthly_rate, payment, months):
+    """
+    Closed-form balance after k = 1..months level payments:
+        B_k = B_0 (1+i)^k - P ((1+i)^k - 1) / i
+    """
+    k = np.arange(1, months + 1, dtype=np.float64)
+    if monthly_rate > 0:
+        growth = (1 + monthly_rate) ** k
+        return principal * growth - payment * (growth - 1) / monthly_rate
+    return principal - payment * k
+
+
+class LoanSchedule:
+    """Month-by-month amortization schedule in integer cents."""
+
+    def __init__(self, payment, principal, interest, balance):
+        self.payment = np.asarray(payment, dtype=MONEY_DTYPE)
+        self.principal = np.asarray(principal, dtype=MONEY_DTYPE)
+        self.interest = np.asarray(interest, dtype=MONEY_DTYPE)
+        self.balance = np.asarray(balance, dtype=MONEY_DTYPE)
+
+    def __len__(self):
+        return len(self.payment)
+
+    def payment_at(self, month: int) -> float:
+        """Payment due in month offset `month` (0 = first simulated month), in dollars."""
+        return to_dollars(int(self.payment[month])) if 0 <= month < len(self.payment) else 0.0
+
+    def principal_at(self, month: int) -> float:
+        """Principal repaid in month offset `month`, in dollars."""
+        return to_dollars(int(self.principal[month])) if 0 <= month < len(self.principal) else 0.0
+
+    def payoff_month(self):
+        """Month offset of the last payment, or None if the loan is never cleared."""
+        cleared = np.flatnonzero(self.balance <= 0)
+        return int(cleared[0]) if len(cleared) else None
+
+    @classmethod
+    def empty(cls) -> "LoanSchedule":
+        return cls([], [], [], [])
+
+    @classmethod
+    def fixed_payments(cls, principal: float, payments) -> "LoanSchedule":
+        """
+        Interest-free schedule from a list of monthly instalments;
+        the last instalment is capped at the remaining balance.
+        """
+        start = to_cents(principal)
+        wanted = to_cents_array(payments)
+        paid_before = np.concatenate(([0], np.cumsum(wanted)[:-1]))
+        pay = np.clip(start - paid_before, 0, wanted)
+        # Cut after the instalment that clears the balance (earlier tiers may be zero)
+        cleared = np.flatnonzero(np.cumsum(pay) >= start)
+        if start <= 0:
+            pay = pay[:0]
+        elif len(cleared):
+            pay = pay[:cleared[0] + 1]
+        balance = start - np.cumsum(pay)
+        return cls(pay, pay, np.zeros_like(pay), balance)
+
+    @classmethod
+    def amortizing(cls, principal: float, annual_rate: float, tenor_months: int,
+                   rate_resets: dict = None, prepayments: dict = None) -> "LoanSchedule":
+        """
+        Level-payment schedule at `annual_rate` percent over `tenor_months`.
+        The payment is recomputed over the remaining tenor at every rate reset and after every
+        partial prepayment; each segment between those events is evaluated in closed form.
+        """
+        rate_resets = {int(k): float(v) for k, v in (rate_resets or {}).items()}
+        prepayments = {int(k): float(v) for k, v in (prepayments or {}).items()}
+        tenor_months = int(tenor_months)
+        if principal <= 0 or tenor_months <= 0:
+            return cls.empty()
+
+        breaks = sorted({0, tenor_months} | {m for m in list(rate_resets) + list(prepayments) if 0 < m < tenor_months})
+        balances = np.empty(tenor_months, dtype=np.float64)
+        prepaid = np.zeros(tenor_months, dtype=np.float64)
+        opening = float(principal)
+        rate = float(annual_rate)
+        for start, end in zip(breaks[:-1], breaks[1:]):
+            rate = rate_resets.get(start, rate)
+            if start in prepayments and start > 0:
+                prepaid[start] = min(prepayments[start], opening)
+                opening -= prepaid[start]
+            monthly_rate = rate / 100 / 12
+            payment = float(annuity_payment(opening, monthly_rate, tenor_months - start))
+            path = _balance_path(opening, monthly_rate, payment, end - start)
+            balances[start:end] = np.maximum(path, 0.0)
+            opening = balances[end - 1]
+
+        balance = to_cents_array(balances)
+        balance[-1] = 0  # the final payment clears any rounding residue
+        opening_cents = np.concatenate(([to_cents(principal)], balance[:-1]))
+        principal_paid = opening_cents - balance
+        # Interest accrues on the opening balance net of any prepayment made that month
+        monthly_rates = np.empty(tenor_months, dtype=np.float64)
+        current = float(annual_rate)
+        for month in range(tenor_months):
+            current = rate_resets.get(month, current)
+            monthly_rates[month] = current / 100 / 12
+        interest = to_cents_array((opening_cents - to_cents_array(prepaid)) / 100 * monthly_rates)
+        payment = principal_paid + interest
+        return cls(payment, principal_paid, interest, balance)
+
+    @classmethod
+    def from_config(cls, config, principal: float = None) -> "LoanSchedule":
+        """Build the schedule described by the config, falling back to the legacy instalments."""
+        if principal is None:
+            principal = float(config.getdata('loan_balance', 0.0))
+        if principal <= 0:
+            return cls.empty()
+        rate = config.getdata('loan_interest_rate', None)
+        tenor_years = config.getdata('loan_tenor_years', None)
+        if rate is not None and tenor_years is not None:
+            return cls.amortizing(principal, float(rate), int(round(float(tenor_years) * 12)),
+                                  rate_resets=config.getdata('loan_rate_resets', None),
+                                  prepayments=config.getdata('loan_prepayments', None))
+
+        # Legacy plan: months 1-2 pay year_1_2, month 3 pays year_3, then year_4_beyond until cleared
+        first = float(config.getdata(['loan_payments', 'year_1_2'], 0.0))
+        third = float(config.getdata(['loan_payments', 'year_3'], 0.0))
+        later = float(config.getdata(['loan_payments', 'year_4_beyond'], 0.0))
+        if later <= 0:
+            return cls.fixed_payments(principal, [first, first, third])
+        remaining = max(principal - 2 * first - third, 0.0)
+        months = 3 + int(np.ceil(remaining / later))
+        return cls.fixed_payments(principal, [first, first, third] + [later] * (months - 3))
+
+
+def build_schedules(principals, annual_rates, tenor_months):
+    """
+    Vectorized level-payment schedules for a batch of members in one pass.
+    Returns (payment, principal, interest, balance) as int64 cents arrays of shape
+    (members, max tenor); months past a member's tenor are zero.
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64) / 100 / 12
+    tenor_months = np.asarray(tenor_months, dtype=np.int64)
+    horizon = int(tenor_months.max()) if len(tenor_months) else 0
+
+    payments = annuity_payment(principals, monthly_rates, tenor_months)[:, None]
+    k = np.arange(1, horizon + 1, dtype=np.float64)[None, :]
+    rates = monthly_rates[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + rates) ** k
+        balances = np.where(rates > 0,
+                            principals[:, None] * growth - payments * (growth - 1) / rates,
+                            principals[:, None] - payments * k)
+    active = k <= tenor_months[:, None]
+    balance = np.where(active, to_cents_array(np.maximum(balances, 0.0)), 0)
+    balance[np.arange(len(tenor_months)), np.maximum(tenor_months - 1, 0)] = 0
+    opening = np.concatenate((to_cents_array(principals)[:, None], balance[:, :-1]), axis=1)
+    opening = np.where(active, opening, 0)
+    principal_paid = opening - balance
+    interest = np.where(active, to_cents_array(opening / 100 * rates), 0)
+    return principal_paid + interest, principal_paid, interest, balance
+
+
+if __name__ == "__main__":
+    # Example usage
+    schedule = LoanSchedule.amortizing(251_101, 2.6, 25 * 12, rate_resets={60: 3.0}, prepayments={24: 20_000})
+    print(f"Months: {len(schedule)}, first payment: {schedule.payment_at(0):,.2f}, payoff month: {schedule.payoff_month()}")
+    print(f"Total interest: {schedule.interest.sum() / 100:,.2f}")
+    payment, principal, interest, balance = build_schedules([251_101, 150_000], [2.6, 3.5], [300, 240])
+    print(f"Batch first payments: {payment[:, 0] / 100}")
+
+    # Regression check: a zero first tier must not shorten the legacy schedule
+    from cpf_config_loader_v10 import ConfigLoader
+    legacy = LoanSchedule.from_config(ConfigLoader.from_dict(
+        {'loan_balance': 10_000, 'loan_payments': {'year_1_2': 0, 'year_3': 1000, 'year_4_beyond': 2000}}))
+    assert legacy.payoff_month() == 7 and legacy.balance[-1] == 0, legacy.balance
+    print(f"Legacy plan with a zero first tier: payoff month {legacy.payoff_month()}")
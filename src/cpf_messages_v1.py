@@ -0,0 +1,72 @@
+## cpf_messages_v1.py
+"""
+Journal message templates.
+
+A journal entry no longer carries a formatted message string. It carries its EventType code
+(cpf_ledger_v1), a Message template code and one integer parameter; the account, age and
+amount are already columns of the entry. The text is rendered only when a report asks for it:
+
+    record_inflow('oa', 100.0, Message.ALLOCATION, EventType.ALLOCATION)
+    render_message(Message.ALLOCATION, 'oa', 51, 0, 100.0)   # 'oa-Allocation for OA at age 51-100.00'
+
+Free-form messages are still accepted; they are journaled as Message.TEXT with the text kept.
+"""
+from enum import IntEnum
+from functools import lru_cache
+
+
+class Message(IntEnum):
+    """Journal message templates, stored as a single small integer per entry."""
+    NONE = 0
+    TEXT = 1  # free-form text, kept in the entry's message column
+    INITIAL_BALANCE = 2
+    ALLOCATION = 3
+    ALLOCATION_ABOVE_55 = 4
+    LOAN_PAYMENT = 5
+    INTEREST = 6
+    EXTRA_INTEREST = 7
+    PAYOUT = 8
+    AGE_55_TRANSFER = 9
+
+
+# Fields: {account}, {ACCOUNT} (upper case), {age}, {param}; Message.TEXT entries render their own text
+TEMPLATES = {
+    Message.NONE: "no message",
+    Message.INITIAL_BALANCE: "Initial Balance of {account}",
+    Message.ALLOCATION: "Allocation for {ACCOUNT} at age {age}",
+    Message.ALLOCATION_ABOVE_55: "Allocation for {account} at age {age}",
+    Message.LOAN_PAYMENT: "Loan payment from OA Account at month {param} age {age}",
+    Message.INTEREST: "Interest for {account} at age {age}",
+    Message.EXTRA_INTEREST: "Extra Interest for {account} at age {age}",
+    Message.PAYOUT: "CPF payout at age {age}",
+    Message.AGE_55_TRANSFER: "transfer_cpf_age={age}",
+}
+
+
+def message_code(message) -> int:
+    """Template code of a message passed to record_inflow / record_outflow."""
+    return int(message) if isinstance(message, Message) else int(Message.TEXT)
+
+
+def message_text(message) -> str:
+    """Text to journal alongside the code: only free-form messages keep theirs."""
+    return '' if isinstance(message, Message) else message
+
+
+@lru_cache(maxsize=8192)
+def render_body(code: int, account: str, age: int, param: int = 0) -> str:
+    """The message itself, e.g. 'Allocation for OA at age 51'. Memoized per distinct entry."""
+    return TEMPLATES[Message(code)].format(account=account, ACCOUNT=account.upper(), age=age, param=param)
+
+
+def render_message(code: int, account: str, age: int, param: int, amount: float, text: str = '') -> str:
+    """Full journal message as written before templates existed: '<account>-<message>-<amount>'."""
+    body = text if code == Message.TEXT else render_body(int(code), account, int(age), int(param))
+    return f"{account}-{body}-{amount:.2f}"
+
+
+if __name__ == "__main__":
+    # Example usage
+    print(render_message(Message.ALLOCATION, 'oa', 51, 0, 100.0))
+    print(render_message(Message.LOAN_PAYMENT, 'loan', 51, 3, -1250.5))
+    print(render_message(Message.TEXT, 'sa', 51, 0, 20.0, text="Medical expenses"))
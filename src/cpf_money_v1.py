@@ -0,0 +1,62 @@
+## cpf_money_v1.py
+"""
+Fixed-point money helpers.
+All balances and postings are held as integer cents (int64 in NumPy arrays).
+Float amounts are rounded exactly once, when they are posted, using round-half-away-from-zero;
+after that every sum, difference and comparison is exact integer arithmetic.
+"""
+import numpy as np
+
+MONEY_DTYPE = np.int64
+CENTS_PER_DOLLAR = 100
+
+
+def to_cents(amount) -> int:
+    """Convert a dollar amount to integer cents. This is the single rounding point."""
+    if isinstance(amount, (int, np.integer)) and not isinstance(amount, bool):
+        return int(amount) * CENTS_PER_DOLLAR
+    cents = int(abs(amount) * CENTS_PER_DOLLAR + 0.5)
+    return cents if amount >= 0 else -cents
+
+
+def to_dollars(cents: int) -> float:
+    """Convert integer cents to a dollar float for display and export."""
+    return cents / CENTS_PER_DOLLAR
+
+
+def round_money(amount) -> float:
+    """Round a dollar amount to the cent, returning a float."""
+    return to_cents(amount) / CENTS_PER_DOLLAR
+
+
+def to_cents_array(values) -> np.ndarray:
+    """Convert an array of dollar amounts to int64 cents with the same rounding as to_cents."""
+    values = np.asarray(values, dtype=np.float64)
+    return (np.sign(values) * np.floor(np.abs(values) * CENTS_PER_DOLLAR + 0.5)).astype(MONEY_DTYPE)
+
+
+def to_dollars_array(cents) -> np.ndarray:
+    """Convert an int64 cents array to float dollars."""
+    return np.asarray(cents, dtype=MONEY_DTYPE) / CENTS_PER_DOLLAR
+
+
+def money_array(shape, fill: int = 0) -> np.ndarray:
+    """Allocate an int64 cents array."""
+    return np.full(shape, fill, dtype=MONEY_DTYPE)
+
+
+def apply_rate(cents, rate: float):
+    """
+    Multiply cents by a rate and round the result to whole cents.
+    Works on scalars and on NumPy arrays.
+    """
+    if isinstance(cents, np.ndarray):
+        return to_cents_array(cents * rate / CENTS_PER_DOLLAR)
+    return to_cents(cents * rate / CENTS_PER_DOLLAR)
+
+
+if __name__ == "__main__":
+    # Example usage
+    print(to_cents(1702.2146), to_cents(-0.005), to_cents(443.8298))
+    print(to_cents_array([1702.2146, -0.005, 443.8298]))
+    print(apply_rate(to_cents(20_000), 0.01 / 12), apply_rate(np.array([2_000_000, 4_000_000]), 0.04 / 12))
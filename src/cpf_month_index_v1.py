@@ -0,0 +1,131 @@
+## cpf_month_index_v1.py
+"""
+Integer month keys for the engine, the journal and the result store.
+
+A month is the number of months since January of year 0 (year * 12 + month - 1), so months
+compare, subtract and index arrays as plain ints. Strings and date objects are only produced at
+the presentation and export boundary (report rows, CSV journal, database), and the formatting
+helpers are memoized, so each distinct month is formatted once per process:
+
+    month = month_index('2025-05')      # 24304
+    month_key(month)                    # '2025-05'
+    month_end(month)                    # date(2025, 5, 31)
+"""
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+
+from dateutil.relativedelta import relativedelta
+
+import numpy as np
+
+MONTH_DTYPE = np.int32
+
+
+def month_index(value) -> int:
+    """
+    Convert a date (or 'YYYY-MM' / 'YYYY-MM-DD' string) to months since year 0.
+    """
+    if isinstance(value, (date, datetime)):
+        return value.year * 12 + value.month - 1
+    if isinstance(value, str):
+        return int(value[0:4]) * 12 + int(value[5:7]) - 1
+    return int(value)
+
+
+def year_month(month: int) -> tuple[int, int]:
+    """(year, calendar month 1-12) of a month index."""
+    year, month0 = divmod(int(month), 12)
+    return year, month0 + 1
+
+
+def calendar_month(month: int) -> int:
+    """Calendar month 1-12 of a month index."""
+    return int(month) % 12 + 1
+
+
+@lru_cache(maxsize=4096)
+def month_key(month: int) -> str:
+    """'YYYY-MM' of a month index."""
+    year, m = year_month(month)
+    return f"{year:04d}-{m:02d}"
+
+
+@lru_cache(maxsize=4096)
+def month_start(month: int) -> date:
+    year, m = year_month(month)
+    return date(year, m, 1)
+
+
+@lru_cache(maxsize=4096)
+def month_end(month: int) -> date:
+    """Last day of the month."""
+    year, m = year_month(month)
+    return date(year, m, monthrange(year, m)[1])
+
+
+@lru_cache(maxsize=8192)
+def format_date(month: int, day: int) -> str:
+    """'YYYY-MM-DD' of a day inside a month index."""
+    year, m = year_month(month)
+    return f"{year:04d}-{m:02d}-{day:02d}"
+
+
+def month_range(start, end) -> np.ndarray:
+    """Month indices from start to end inclusive (dates, strings or indices)."""
+    return np.arange(month_index(start), month_index(end) + 1, dtype=MONTH_DTYPE)
+
+
+def ages_at_month_end(months: np.ndarray, birth_date: date) -> np.ndarray:
+    """
+    Completed years of age on the last day of each month, for a whole array of months.
+    Same result as relativedelta(month_end, birth_date).years.
+    """
+    # By the last day of its month every birthday in that month has passed (29 February counts
+    # on the 28th in other years, as relativedelta does), so only the calendar month matters.
+    months = np.asarray(months, dtype=np.int64)
+    years, month0 = np.divmod(months, 12)
+    ages = years - birth_date.year - (month0 + 1 < birth_date.month)
+    unborn = np.flatnonzero(months < month_index(birth_date))
+    for i in unborn.tolist():  # negative spans, which relativedelta truncates towards zero
+        ages[i] = relativedelta(month_end(int(months[i])), birth_date).years
+    return ages.astype(np.int16)
+
+
+@dataclass
+class MonthCalendar:
+    """
+    The simulated months of one member: month indices and the age at each month end.
+    first_day is the day the first month starts on (the simulation start date).
+    """
+    months: np.ndarray
+    ages: np.ndarray
+    first_day: int = 1
+
+    @classmethod
+    def from_dates(cls, start_date: date, end_date: date, birth_date: date) -> "MonthCalendar":
+        """Every month from the one containing start_date to the one containing end_date."""
+        months = month_range(start_date, end_date)
+        return cls(months, ages_at_month_end(months, birth_date), start_date.day)
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def keys(self) -> list[str]:
+        """'YYYY-MM' keys, formatted on request."""
+        return [month_key(month) for month in self.months.tolist()]
+
+    def period_start(self, i: int) -> date:
+        month = int(self.months[i])
+        return month_start(month).replace(day=self.first_day) if i == 0 else month_start(month)
+
+    def period_end(self, i: int) -> date:
+        return month_end(int(self.months[i]))
+
+
+if __name__ == "__main__":
+    # Example usage
+    calendar = MonthCalendar.from_dates(date(2025, 5, 1), date(2026, 2, 28), date(1974, 7, 6))
+    for key, month, age in zip(calendar.keys(), calendar.months.tolist(), calendar.ages.tolist()):
+        print(f"{key}  month {month}  ends {month_end(month)}  age {age}")
@@ -0,0 +1,214 @@
+## cpf_payout_v1.py
+"""
+Retirement payout projection without a monthly loop.
+
+Between two Decembers the RA balance only falls by the monthly payout, so a whole year can be
+written in closed form. With k payouts in the year, payout P and monthly rate r:
+
+    december        B_end = B (1 + r)     - P (k + r (k - 1))          one month of interest in December
+    monthly_accrual B_end = B (1 + r k)   - P (k + r k (k - 1) / 2)    interest accrued monthly, credited in December
+
+Both are B_end = g B - c P, so the balance at the start of every year follows from the
+geometric series, also for escalating payouts (P grows by a fixed ratio every year).
+The depletion month and the month-by-month trajectory follow directly from the year-start balances.
+All functions accept NumPy arrays and work across a batch of members at once.
+
+PayoutPlan covers the RA on its own: base interest and a fixed payout, no extra interest and no
+above-55 allocations. A member's own depletion dates come from compare_retirement_sums, which
+runs the engine (cpf_annual_step_v1) for each retirement sum.
+"""
+import json
+
+import numpy as np
+
+from cpf_money_v1 import to_dollars
+
+RETIREMENT_SUMS = ('brs', 'frs', 'ers')
+CONVENTIONS = ('december', 'monthly_accrual')
+HORIZON_YEARS = 100
+
+
+def _year_coefficients(monthly_rate, payouts_in_year, convention: str):
+    """Return (g, c) with B_end = g * B_start - c * payout for a year with `payouts_in_year` payouts."""
+    k = np.asarray(payouts_in_year, dtype=np.float64)
+    if convention == 'december':
+        return 1 + monthly_rate, k + monthly_rate * (k - 1)
+    if convention == 'monthly_accrual':
+        return 1 + monthly_rate * k, k + monthly_rate * k * (k - 1) / 2
+    raise ValueError(f"Unknown interest convention: {convention}. Use one of {', '.join(CONVENTIONS)}.")
+
+
+def year_start_balances(ra_balance, monthly_payout, annual_rate=4.0, escalation=0.0, start_month=1,
+                        convention: str = 'december', years: int = HORIZON_YEARS):
+    """
+    RA balance at the start of each payout year, shape (members, years + 1).
+    Year 0 starts at the first payout (calendar month `start_month`) and ends in December;
+    every later year is a full calendar year. Balances are not floored at zero.
+    """
+    ra = np.atleast_1d(np.asarray(ra_balance, dtype=np.float64))[:, None]
+    payout = np.atleast_1d(np.asarray(monthly_payout, dtype=np.float64))[:, None]
+    rate = np.atleast_1d(np.asarray(annual_rate, dtype=np.float64))[:, None] / 100 / 12
+    growth = 1 + np.atleast_1d(np.asarray(escalation, dtype=np.float64))[:, None]
+    first_year = 13 - np.atleast_1d(np.asarray(start_month, dtype=np.int64))[:, None]
+
+    g0, c0 = _year_coefficients(rate, first_year, convention)
+    g, c = _year_coefficients(rate, 12, convention)
+    after_first = g0 * ra - c0 * payout
+
+    # B_{1+n} = g^n B_1 - c P_1 (g^n - h^n) / (g - h), with P_1 = P_0 h for escalating payouts
+    n = np.arange(years, dtype=np.float64)[None, :]
+    g_n = g ** n
+    h_n = growth ** n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series = np.where(np.isclose(g, growth), n * g ** np.maximum(n - 1, 0), (g_n - h_n) / (g - growth))
+    later = g_n * after_first - c * payout * growth * series
+    return np.concatenate((ra, later), axis=1)
+
+
+def depletion(ra_balance, monthly_payout, annual_rate=4.0, escalation=0.0, start_month=1,
+              convention: str = 'december', years: int = HORIZON_YEARS):
+    """
+    Number of payouts until the RA is exhausted (the last one possibly partial), per member.
+    Members whose RA outlasts the horizon get -1.
+    """
+    starts = year_start_balances(ra_balance, monthly_payout, annual_rate, escalation, start_month, convention, years)
+    members = starts.shape[0]
+    payout = np.broadcast_to(np.asarray(monthly_payout, dtype=np.float64), (members,))
+    growth = np.broadcast_to(1 + np.asarray(escalation, dtype=np.float64), (members,))
+    first_year = np.broadcast_to(13 - np.asarray(start_month, dtype=np.int64), (members,))
+
+    exhausted = starts[:, 1:] <= 1e-9
+    found = exhausted.any(axis=1)
+    year = np.where(found, exhausted.argmax(axis=1), 0)
+    balance = starts[np.arange(members), year]
+    year_payout = payout * growth ** year
+    in_year = np.where(year == 0, first_year, 12)
+
+    # Before December the balance only falls by the payout; the December payout comes after interest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        month = np.ceil(balance / year_payout - 1e-12)
+    month = np.clip(month, 1, in_year)
+    months_before = np.where(year == 0, 0, first_year + (year - 1) * 12)
+    result = (months_before + month).astype(np.int64)
+    return np.where(found & (payout > 0), result, -1)
+
+
+class PayoutPlan:
+    """One member's decumulation phase: RA at payout start, payout amount, rate and plan shape."""
+
+    def __init__(self, ra_balance: float, monthly_payout: float, annual_rate: float = 4.0,
+                 escalation: float = 0.0, start_month: int = 1, start_age: int = 67,
+                 convention: str = 'december'):
+        self.ra_balance = float(ra_balance)
+        self.monthly_payout = float(monthly_payout)
+        self.annual_rate = float(annual_rate)
+        self.escalation = float(escalation)
+        self.start_month = int(start_month)
+        self.start_age = start_age
+        self.convention = convention
+
+    @classmethod
+    def from_config(cls, config, payout_type: str = None, ra_balance: float = None,
+                    start_month: int = 1) -> "PayoutPlan":
+        """
+        Build the plan for a retirement sum (brs/frs/ers) from the config.
+        The RA defaults to the bare retirement sum (an illustration, not the member's projected RA);
+        payout_escalation (e.g. 0.02) selects an escalating plan.
+        """
+        payout_type = payout_type or config.getdata('payout_type', 'brs')
+        amount = float(config.getdata(['retirement_sums', payout_type, 'amount'], 0.0))
+        return cls(
+            ra_balance=amount if ra_balance is None else ra_balance,
+            monthly_payout=float(config.getdata(['retirement_sums', payout_type, 'payout'], 0.0)),
+            annual_rate=float(config.getdata(['interest_rates', 'ra'], 4.0)),
+            escalation=float(config.getdata('payout_escalation', 0.0)),
+            start_month=start_month,
+            start_age=int(config.getdata('cpf_payout_age', 67)),
+            convention=config.getdata('interest_convention', 'december'),
+        )
+
+    def depletion_month(self) -> int:
+        """Number of payouts until the RA runs out, or -1 if it outlasts the horizon."""
+        return int(depletion(self.ra_balance, self.monthly_payout, self.annual_rate, self.escalation,
+                             self.start_month, self.convention)[0])
+
+    def depletion_age(self):
+        """Age at the last payout, or None if the RA outlasts the horizon."""
+        months = self.depletion_month()
+        if months < 0:
+            return None
+        return self.start_age + (months - 1) // 12
+
+    def trajectory(self, years: int = HORIZON_YEARS):
+        """
+        Month-by-month (payouts, RA balance after payout) arrays from the first payout until depletion.
+        Built from the year-start balances, no per-month loop.
+        """
+        starts = year_start_balances(self.ra_balance, self.monthly_payout, self.annual_rate, self.escalation,
+                                     self.start_month, self.convention, years)[0]
+        rate = self.annual_rate / 100 / 12
+        # Calendar grid: row = payout year, column = month; months before the first payout are masked
+        month_of_year = np.arange(1, 13)[None, :]
+        year = np.arange(years + 1)[:, None]
+        active = (year > 0) | (month_of_year >= self.start_month)
+        payout = self.monthly_payout * (1 + self.escalation) ** year * active
+        first = np.where(year == 0, self.start_month, 1)
+        paid_before = payout * np.maximum(month_of_year - first, 0)
+        balance_before = starts[:, None] - paid_before
+        if self.convention == 'december':
+            interest = np.where(month_of_year == 12, rate * balance_before, 0.0)
+        else:
+            accrued = rate * (np.cumsum(np.where(active, balance_before, 0.0), axis=1))
+            interest = np.where(month_of_year == 12, accrued, 0.0)
+        balance = balance_before + interest - payout
+
+        payouts = payout[active]
+        balances = balance[active]
+        months = self.depletion_month()
+        if months > 0:
+            payouts = payouts[:months].copy()
+            balances = balances[:months].copy()
+            payouts[-1] += balances[-1]  # the last payout is capped at what is left
+            balances[-1] = 0.0
+        return payouts, balances
+
+
+def compare_retirement_sums(config, allocation: dict = None) -> dict:
+    """
+    RA at payout start, payouts until depletion and depletion age for BRS, FRS and ERS.
+    Each retirement sum is one annual-resolution engine run, so the RA carries the member's
+    allocations and the base and extra interest of cpf_interest_v1, as in the month loop.
+    A depletion month of -1 means the RA outlasts the simulation.
+    """
+    from cpf_annual_step_v1 import AnnualEngine, RA
+    from cpf_config_loader_v10 import ConfigLoader
+
+    if allocation is None:
+        allocation = {'allocation_below_55': {account: {'allocation': 0.0, 'amount': 0.0} for account in ('oa', 'sa', 'ma')}}
+    data = json.loads(json.dumps(config.getdata()))  # the engine fills in allocation amounts; keep the caller's config
+    projections = {}
+    for payout_type in RETIREMENT_SUMS:
+        engine = AnnualEngine(ConfigLoader.from_dict({**data, 'payout_type': payout_type}), json.loads(json.dumps(allocation)))
+        engine.run()
+        paying = np.flatnonzero(np.asarray(engine.payouts) > 0)
+        depleted = engine.depleted_at
+        projections[payout_type] = {
+            'ra_balance': None if engine.payout_start_ra is None else to_dollars(engine.payout_start_ra),
+            'monthly_payout': float(engine.payouts[paying[0]]) if len(paying) else 0.0,
+            'depletion_month': -1 if depleted is None or not len(paying) else depleted - int(paying[0]) + 1,
+            'depletion_age': None if depleted is None else int(engine.ages[depleted]),
+        }
+    return projections
+
+
+if __name__ == "__main__":
+    # Example usage
+    plan = PayoutPlan(ra_balance=106_500, monthly_payout=930, annual_rate=4.0, start_month=7)
+    payouts, balances = plan.trajectory()
+    print(f"Depletion after {plan.depletion_month()} payouts, at age {plan.depletion_age()}")
+    print(f"Total paid out: {payouts.sum():,.2f}")
+    escalating = PayoutPlan(ra_balance=213_000, monthly_payout=1_400, escalation=0.02)
+    print(f"Escalating plan depletes after {escalating.depletion_month()} payouts")
+    from cpf_config_loader_v10 import ConfigLoader
+    for payout_type, projection in compare_retirement_sums(ConfigLoader('cpf_config.json')).items():
+        print(f"{payout_type.upper()}: {projection}")
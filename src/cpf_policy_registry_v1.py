@@ -0,0 +1,239 @@
+## cpf_policy_registry_v1.py
+"""
+Versioned CPF policy tables: contribution rates, allocation splits, salary cap, retirement sums.
+
+The config's top-level blocks are the policy in force from the start of the simulation. Later
+policy years are listed under "policy_versions", each with an effective date and only the keys
+that change; a version inherits everything else from the one before it:
+
+    "policy_versions": [
+        {"effective_date": "2026-01-01", "salary_cap": 8000,
+         "retirement_sums": {"frs": {"amount": 220400}}}
+    ]
+
+Every version is compiled once into lookup arrays and dicts (PolicyVersion), and compiled
+registries are cached by content, so a batch of members sharing one config compiles it once.
+The engine looks up a month's version by month index; nothing is read from the config per month.
+
+The monthly allocation amounts of the base version are the ones the run is given (below 55) and
+the config's (above 55). A later version that changes the salary cap or contribution rates derives
+all amounts from the member's salary, cap, rates and splits; one that changes an allocation block
+derives that block, with any "amount" it sets explicitly taking precedence:
+
+    registry = PolicyRegistry.from_config(config)
+    policy = registry.version_at(month)
+    policy.retirement_sum('frs'), policy.employee_rate[age]
+"""
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from cpf_config_loader_v10 import ConfigLoader
+from cpf_month_index_v1 import month_index
+
+# The config blocks that make up one policy version
+POLICY_KEYS = ('salary_cap', 'additional_wage_ceiling', 'cpf_contribution_rates', 'allocation_below_55',
+               'allocation_above_55', 'retirement_sums', 'cpf_payout_age')
+CONTRIBUTION_BRACKETS = ('below_55', '55_to_60', '60_to_65', '65_to_70', 'above_70')
+ABOVE_55_BRACKETS = ('56_to_60', '61_to_65', '66_to_70', 'above_70')
+SPLIT_BRACKETS = ('below_55',) + ABOVE_55_BRACKETS
+SPLIT_ACCOUNTS = ('oa', 'sa', 'ma', 'ra')
+MAX_AGE = 130
+# Versions changing these keys get allocation amounts derived from the salary (see derive_amounts)
+RATE_KEYS = ('salary_cap', 'cpf_contribution_rates')
+ADDITIONAL_WAGE_CEILING = 102_000  # yearly, less the ordinary wages subject to CPF
+
+# Allocation splits of the total contribution, as CPF Board publishes them
+DEFAULT_ALLOCATION_SPLITS = {
+    'allocation_below_55': {'oa': 0.6217, 'sa': 0.1621, 'ma': 0.2162},
+    'allocation_above_55': {
+        'oa': {'56_to_60': 0.3694, '61_to_65': 0.149, '66_to_70': 0.0607, 'above_70': 0.08},
+        'sa': 0.00,
+        'ma': {'56_to_60': 0.323, '61_to_65': 0.4468, '66_to_70': 0.6363, 'above_70': 0.84},
+        'ra': {'56_to_60': 0.3076, '61_to_65': 0.4042, '66_to_70': 0.303, 'above_70': 0.08},
+    },
+}
+
+
+def allocation_table(total_contribution: float, splits: dict = DEFAULT_ALLOCATION_SPLITS) -> dict:
+    """The allocation_below_55 / allocation_above_55 config blocks for a monthly total contribution."""
+    def entry(split):
+        return {"allocation": split, "amount": split * total_contribution}
+
+    return {
+        'allocation_below_55': {account: entry(split) for account, split in splits['allocation_below_55'].items()},
+        'allocation_above_55': {
+            account: ({bracket: entry(split) for bracket, split in brackets.items()}
+                      if isinstance(brackets, dict) else entry(brackets))
+            for account, brackets in splits['allocation_above_55'].items()
+        },
+    }
+
+
+def contribution_brackets(ages) -> np.ndarray:
+    """Index into CONTRIBUTION_BRACKETS per age (same brackets as CPFAccount.calculate_cpf_contribution)."""
+    ages = np.asarray(ages)
+    return np.select([ages <= 55, ages <= 60, ages <= 65, ages <= 70], [0, 1, 2, 3], default=4)
+
+
+def _merge(base: dict, changes: dict) -> dict:
+    """base with changes applied; nested dicts are merged key by key."""
+    merged = dict(base)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class PolicyVersion:
+    """One policy version compiled for lookups, effective from month index `effective_month`."""
+
+    def __init__(self, effective_month: int, data: dict):
+        self.effective_month = effective_month
+        config = ConfigLoader.from_dict(data)  # same lookup rules (and defaults) as the month loop used
+        self.salary_cap = config.getdata('salary_cap', 0)
+        self.below_55_amounts = None  # None: the allocation the run is given
+        self.additional_wage_ceiling = config.getdata('additional_wage_ceiling', ADDITIONAL_WAGE_CEILING)
+        self.payout_age = config.getdata('cpf_payout_age', 67)
+
+        # Contribution rates per age 0..MAX_AGE
+        brackets = contribution_brackets(np.arange(MAX_AGE + 1))
+        employee = [config.getdata(['cpf_contribution_rates', bracket, 'employee'], 0.0) for bracket in CONTRIBUTION_BRACKETS]
+        employer = [config.getdata(['cpf_contribution_rates', bracket, 'employer'], 0.0) for bracket in CONTRIBUTION_BRACKETS]
+        self.employee_rate = np.asarray(employee, dtype=np.float64)[brackets]
+        self.employer_rate = np.asarray(employer, dtype=np.float64)[brackets]
+        self.bracket_rates = np.add(employee, employer)  # total rate per CONTRIBUTION_BRACKETS (= SPLIT_BRACKETS)
+
+        # Allocation splits, shape (SPLIT_BRACKETS, SPLIT_ACCOUNTS); the published splits where the config has none
+        self.allocation_splits = np.zeros((len(SPLIT_BRACKETS), len(SPLIT_ACCOUNTS)))
+        below, above = DEFAULT_ALLOCATION_SPLITS['allocation_below_55'], DEFAULT_ALLOCATION_SPLITS['allocation_above_55']
+        for j, account in enumerate(SPLIT_ACCOUNTS):
+            self.allocation_splits[0, j] = config.getdata(['allocation_below_55', account, 'allocation'],
+                                                          below.get(account, 0.0)) or 0.0
+            for i, bracket in enumerate(ABOVE_55_BRACKETS, start=1):
+                default = above[account].get(bracket, 0.0) if isinstance(above.get(account), dict) else 0.0
+                self.allocation_splits[i, j] = config.getdata(['allocation_above_55', account, bracket, 'allocation'],
+                                                              default) or 0.0
+
+        # Above-55 allocation amounts, by (account, bracket)
+        self.above_55_amounts = {(account, bracket): config.getdata(['allocation_above_55', account, bracket, 'amount'], 0)
+                                 for account in SPLIT_ACCOUNTS for bracket in ABOVE_55_BRACKETS}
+        self.retirement_sums = {
+            payout_type: (config.getdata(['retirement_sums', payout_type, 'amount'], 0),
+                          config.getdata(['retirement_sums', payout_type, 'payout'], 0.0))
+            for payout_type in (config.getdata('retirement_sums', {}) or {})
+        }
+
+    def derive_amounts(self, salary: float, change: dict, below: bool = True, above: bool = True):
+        """
+        Monthly allocation amounts from the salary: min(salary, cap) x the bracket's total rate x split.
+        Amounts set explicitly in this version's `change` are kept.
+        """
+        wage = min(float(salary or 0.0), float(self.salary_cap or 0.0))
+        amounts = wage * self.bracket_rates[:, None] * self.allocation_splits
+        if below:
+            explicit = change.get('allocation_below_55') or {}
+            self.below_55_amounts = {account: float((explicit.get(account) or {}).get('amount', amounts[0, j]))
+                                     for j, account in enumerate(SPLIT_ACCOUNTS) if account != 'ra'}
+        if above:
+            explicit = change.get('allocation_above_55') or {}
+            for j, account in enumerate(SPLIT_ACCOUNTS):
+                for i, bracket in enumerate(ABOVE_55_BRACKETS, start=1):
+                    entry = (explicit.get(account) or {}).get(bracket) if isinstance(explicit.get(account), dict) else None
+                    self.above_55_amounts[(account, bracket)] = float((entry or {}).get('amount', amounts[i, j]))
+
+    def below_55_amount(self, account: str, allocation: dict):
+        """The version's below-55 amount, or the run's allocation where the version has none."""
+        if self.below_55_amounts is None:
+            return allocation['allocation_below_55'][account]['amount']
+        return self.below_55_amounts[account]
+
+    def above_55_amount(self, account: str, bracket: str):
+        return self.above_55_amounts.get((account, bracket), 0)
+
+    def retirement_sum(self, payout_type: str):
+        return self.retirement_sums.get(payout_type, (0, 0.0))[0]
+
+    def payout(self, payout_type: str):
+        return self.retirement_sums.get(payout_type, (0, 0.0))[1]
+
+
+class PolicyRegistry:
+    """Policy versions ordered by effective month."""
+
+    def __init__(self, versions: list[PolicyVersion]):
+        self.versions = sorted(versions, key=lambda version: version.effective_month)
+        self.effective = np.asarray([version.effective_month for version in self.versions], dtype=np.int64)
+        self._tables = {}
+
+    @classmethod
+    def from_config(cls, config) -> "PolicyRegistry":
+        """The base policy from the top-level config blocks plus the config's policy_versions (cached)."""
+        base = {key: config.getdata(key) for key in POLICY_KEYS if config.getdata(key) is not None}
+        changes = config.getdata('policy_versions', []) or []
+        salary = config.getdata('salary', 0.0) if changes else None  # only versions derive amounts from it
+        return _compiled(json.dumps([base, changes, salary], sort_keys=True))
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def index(self, months) -> np.ndarray:
+        """Index of the version in force in each month (the base version before the first change)."""
+        return np.maximum(np.searchsorted(self.effective, np.asarray(months), side='right') - 1, 0)
+
+    def version_at(self, month: int) -> PolicyVersion:
+        return self.versions[int(self.index(month))]
+
+    def table(self, name: str) -> np.ndarray:
+        """A PolicyVersion attribute stacked over the versions (first axis), for indexing by self.index(months)."""
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = np.stack([np.asarray(getattr(version, name)) for version in self.versions])
+        return table
+
+    def payouts(self, months, ages, payout_type: str) -> list:
+        """Monthly payout due per month: the version's payout from its payout age, else 0.0."""
+        return [version.payout(payout_type) if age >= version.payout_age else 0.0
+                for version, age in zip((self.versions[i] for i in self.index(months).tolist()), np.asarray(ages).tolist())]
+
+    def payout_ages(self, months) -> np.ndarray:
+        """Payout age in force in each month."""
+        ages = np.asarray([version.payout_age for version in self.versions])
+        return ages[self.index(months)]
+
+
+@lru_cache(maxsize=64)
+def _compiled(key: str) -> PolicyRegistry:
+    base, changes, salary = json.loads(key)
+    versions = [PolicyVersion(0, base)]
+    data = base
+    below = above = False  # once a block is derived, later versions keep deriving it
+    for change in sorted(changes, key=lambda change: month_index(change['effective_date'])):
+        data = _merge(data, {name: value for name, value in change.items() if name != 'effective_date'})
+        version = PolicyVersion(month_index(change['effective_date']), data)
+        rates = any(name in change for name in RATE_KEYS)
+        below = below or rates or 'allocation_below_55' in change
+        above = above or rates or 'allocation_above_55' in change
+        if below or above:
+            version.derive_amounts(salary, change, below, above)
+        versions.append(version)
+    return PolicyRegistry(versions)
+
+
+if __name__ == "__main__":
+    # Example usage: a salary cap and FRS rising from 2026
+    from cpf_month_index_v1 import month_key
+
+    data = json.load(open(ConfigLoader('cpf_config.json').path))
+    data['policy_versions'] = [
+        {'effective_date': '2026-01-01', 'salary_cap': 8000, 'retirement_sums': {'frs': {'amount': 220400}}},
+        {'effective_date': '2027-01-01', 'retirement_sums': {'frs': {'amount': 228200}}},
+    ]
+    registry = PolicyRegistry.from_config(ConfigLoader.from_dict(data))
+    for month in (month_index('2025-05'), month_index('2026-06'), month_index('2030-01')):
+        policy = registry.version_at(month)
+        print(f"{month_key(month)}  salary cap {policy.salary_cap}  FRS {policy.retirement_sum('frs')}  "
+              f"employee rate at 50 {policy.employee_rate[50]}")
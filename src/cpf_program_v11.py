@@ -1,14 +1,19 @@
 import atexit
 from datetime import datetime
-import csv
 import json
 from cpf_config_loader_v9 import ConfigLoader
-from cpf_data_saver_v3 import DataSaver  # Import DataSaver class
 from multiprocessing import Process, Queue
 import sqlite3
 import os
 from datetime import date, datetime
 from itertools import count
+from cpf_ledger_v1 import EventType
+from cpf_money_v1 import to_cents, to_dollars
+from cpf_month_index_v1 import format_date, month_index
+from cpf_messages_v1 import Message, message_code, message_text
+from cpf_loan_v1 import LoanSchedule
+from cpf_policy_registry_v1 import allocation_table
+import cpf_instrumentation_v1 as instrumentation
 
 # Dynamically determine the src directory
 SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
@@ -16,36 +21,34 @@ CONFIG_FILENAME = os.path.join(SRC_DIR, 'cpf_config.json')  # Full path to the c
 LOG_FILE_PATH = os.path.join(SRC_DIR, "cpf_log_file.csv")  # Log file path inside src folder
 DATE_KEYS = ['start_date', 'end_date', 'birth_date']
 DATE_FORMAT = "%Y-%m-%d"
-
-# Load configuration
-config = ConfigLoader(CONFIG_FILENAME)
-
+LOG_FIELDNAMES = [
+    "date",
+    "transaction_reference",
+    "age",
+    "account",
+    "old_balance",
+    "new_balance",
+    "amount",
+    "type",
+    "event",
+    "message_code",
+    "param",
+    "message",
+]
 
 # Define the worker function at the top level (outside the class)
 def _save_log_worker(queue, filename):
     """Worker process to save logs to file."""
-    with open(filename, "w", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "date",
-                "transaction_reference",
-                "age",  # Include 'age' in the fieldnames
-                "account",
-                "old_balance",
-                "new_balance",
-                "amount",
-                "type",
-                "message",
-            ],
-        )
-        writer.writeheader()
+    from cpf_data_saver_v4 import CSVBackend
+
+    with CSVBackend(filename, fieldnames=LOG_FIELDNAMES) as journal:
         while True:
             log_entry = queue.get()
             if log_entry == "STOP":
                 break
+            log_entry["date"] = format_date(log_entry.pop("month"), log_entry.pop("day"))
             try:
-                writer.writerow(log_entry)
+                journal.append(log_entry)
             except ValueError as e:
                 print(f"Error writing log entry: {e}")
                 print(f"Log entry: {log_entry}")
@@ -59,10 +62,10 @@ def custom_serializer(obj):
 
 
 class CPFAccount:
-    def __init__(self, config_loader):  # Accept config_loader
+    def __init__(self, config_loader, log_to_file: bool = True):  # Accept config_loader
         self.config = config_loader  # Store the config_loader instance
-        self.current_date: datetime = datetime.now()
-        self.date_key: str = None
+        self.current_date: datetime = datetime.now()  # also sets self.month and self.day
+        self.date_key: int = None  # month index of the month being simulated
         self.message: str = None
         self.start_date = None
         self.end_date = None
@@ -78,13 +81,64 @@ class CPFAccount:
         self._ra_balance = 0.0
         self._excess_balance = 0.0
         self._loan_balance = 0.0
+        # Balances are held as integer cents; the _<account>_balance floats mirror them
+        self._cents = {"oa": 0, "sa": 0, "ma": 0, "ra": 0, "excess": 0, "loan": 0}
         self.start_reference = 100000000        
         self.counter = count(1)
         self.trandaction_reference = 0
         self.dbcounter = count(1)
         self.dbreference = 0
+        # Event type and message parameter of the entry being posted (see cpf_messages_v1)
+        self.event = int(EventType.ADJUSTMENT)
+        self.message_param = 0
+        self.ledger = None  # Optional CPFLedger receiving every posted event
+        
+        # Log saving setup; the writer process starts with the first log entry,
+        # headless batch runs skip it entirely
+        self.log_to_file = log_to_file
+        self.log_queue = None
+        self.log_process = None
+        
+    @property
+    def current_date(self):
+        return self._current_date
+
+    @current_date.setter
+    def current_date(self, value):
+        # Journal entries carry the integer month and day; the date text is formatted by the log writer
+        self._current_date = value
+        if value is not None:
+            self.month = month_index(value)
+            self.day = value.day
+
+    def use_reference_block(self, block):
+        """Number journal and DB references inside a ReferenceBlock (cpf_reference_allocator_v1) instead of from 100000000."""
+        self.start_reference = block.start
+        self.counter = count(1)
+        self.dbcounter = count(1)
+
+    def resume_references(self, db_references: int, transaction_references: int):
+        """Continue numbering after references already used, e.g. by an imported history (cpf_history_import_v1)."""
+        self.dbcounter = count(db_references + 1)
+        self.counter = count(transaction_references + 1)
+
+    def add_db_reference(self):
+        self.dbreference = self.start_reference + next(self.dbcounter)
+        return self.dbreference
+    
+    def add_db_references(self, months: int) -> range:
+        """DB references of `months` consecutive months at once (quiet months skipped by the scheduler)."""
+        first = self.start_reference + next(self.dbcounter)
+        self.dbcounter = count(first - self.start_reference + months)
+        self.dbreference = first + months - 1
+        return range(first, first + months)
+
+    def add_transaction_reference(self):
+        self.trandaction_reference = self.start_reference + next(self.counter)
+        return self.trandaction_reference
         
-        # Log saving setup
+    def start_log_writer(self):
+        """Start the log writer process."""
         self.log_queue = Queue()
         self.log_process = Process(
             target=_save_log_worker, args=(self.log_queue, LOG_FILE_PATH)
@@ -96,25 +150,27 @@ class CPFAccount:
 
         # Register cleanup function
         atexit.register(self.close_log_writer)
-        
-    def add_db_reference(self):
-        self.dbreference = self.start_reference + next(self.dbcounter)
-        return self.dbreference
-    
-    def add_transaction_reference(self):
-        self.trandaction_reference = self.start_reference + next(self.counter)
-        return self.trandaction_reference
-        
+
     def save_log_to_file(self, log_entry):
         """Send log entry to the worker process."""
+        if not self.log_to_file:
+            return
+        if self.log_process is None:
+            self.start_log_writer()
         if self.log_process.is_alive():
             self.log_queue.put(log_entry)
+            if instrumentation.is_enabled():
+                instrumentation.count("log_entries_queued")
+                try:
+                    instrumentation.gauge("log_queue_depth", self.log_queue.qsize())
+                except NotImplementedError:  # qsize is not available on macOS
+                    pass
         else:
             print("Warning: Log writer process is not running.")
 
     def close_log_writer(self):
         """Stop the log writer process."""
-        if self.log_process.is_alive():
+        if self.log_process is not None and self.log_process.is_alive():
             try:
                 self.log_queue.put("STOP")
                 self.log_process.join(timeout=5)  # Wait for the process to terminate
@@ -130,23 +186,24 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
-        diff = value - self._oa_balance
-        # loglist_entry.append()
+            value, self.message = float(data), Message.NONE
+        old_balance, new_balance, diff = self._set_cents("oa", value)
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "oa",
-            "old_balance": self._oa_balance.__round__(2),
-            "new_balance": value.__round__(2),
-            "amount": diff.__round__(2),
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "amount": diff,
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"oa-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
-        self._oa_balance = value.__round__(2)
         self._oa_message = self.message
-        # self.save_log_to_file(log_entry) 
         self.save_log_to_file(log_entry)  # Send log entry to the worker process
 
     @property
@@ -158,30 +215,25 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            # Ensure value is treated as float if data is not a tuple/list
-            value, message = (
-                float(data),
-                "no message",
-            )  # Assuming data should be numeric
-        diff = value - self._sa_balance
+            value, self.message = float(data), Message.NONE
+        old_balance, new_balance, diff = self._set_cents("sa", value)
         log_entry = {
-            # Ensure current_date is set before logging
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
-            "account": "sa",  # Add account identifier
-            "old_balance": self._sa_balance.__round__(2),
-            "new_balance": value.__round__(2),
-            "amount": diff.__round__(2),
+            "account": "sa",
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "amount": diff,
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"sa-{self.message}-{diff:.2f}",  # Format diff for consistency
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
-        # self._sa_log.append(log_entry) # Optional: Keep in-memory log if needed
-        self._sa_balance = value.__round__(2)
         self._sa_message = self.message
-
-        # Save the log entry using multiprocessing
-        self.save_log_to_file(log_entry) 
+        self.save_log_to_file(log_entry)  # Send log entry to the worker process
 
     @property
     def ma_balance(self):
@@ -192,22 +244,25 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
-        diff = value - self._ma_balance
+            value, self.message = float(data), Message.NONE
+        old_balance, new_balance, diff = self._set_cents("ma", value)
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "ma",
-            "old_balance": self._ma_balance.__round__(2),
-            "new_balance": value.__round__(2),
-            "amount": diff.__round__(2),
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "amount": diff,
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"ma-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
-        self._ma_balance = value.__round__(2)
         self._ma_message = self.message
-        self.save_log_to_file(log_entry) 
+        self.save_log_to_file(log_entry)  # Send log entry to the worker process
 
     @property
     def ra_balance(self):
@@ -218,22 +273,25 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
-        diff = value - self._ra_balance
+            value, self.message = float(data), Message.NONE
+        old_balance, new_balance, diff = self._set_cents("ra", value)
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "ra",
-            "old_balance": self._ra_balance.__round__(2),
-            "new_balance": value.__round__(2),
-            "amount": diff.__round__(2),
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "amount": diff,
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"ra-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
-        self._ra_balance = value
         self._ra_message = self.message
-        self.save_log_to_file(log_entry) 
+        self.save_log_to_file(log_entry)  # Send log entry to the worker process
 
     @property
     def excess_balance(self):
@@ -244,22 +302,25 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
-        diff = value - self._excess_balance
+            value, self.message = float(data), Message.NONE
+        old_balance, new_balance, diff = self._set_cents("excess", value)
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "excess",
-            "old_balance": self._excess_balance.__round__(2),
-            "new_balance": value.__round__(2),
-            "amount": diff.__round__(2),
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "amount": diff,
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"excess-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
-        self._excess_balance = value.__round__(2)
         self._excess_message = self.message
-        self.save_log_to_file(log_entry) 
+        self.save_log_to_file(log_entry)  # Send log entry to the worker process
 
     @property
     def loan_balance(self):
@@ -270,22 +331,36 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
-        diff = value - self._loan_balance
+            value, self.message = float(data), Message.NONE
+        old_balance, new_balance, diff = self._set_cents("loan", value)
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "loan",
-            "old_balance": self._loan_balance.__round__(2),
-            "new_balance": value.__round__(2),
-            "amount": diff.__round__(2),
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "amount": diff,
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"loan-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
-        self._loan_balance = value.__round__(2)
         self._loan_message = self.message
-        self.save_log_to_file(log_entry) 
+        self.save_log_to_file(log_entry)  # Send log entry to the worker process
+
+    def _set_cents(self, account: str, value: float) -> tuple[float, float, float]:
+        """
+        Store the new balance of `account` as integer cents.
+        Returns (old_balance, new_balance, diff) in dollars, all exact to the cent.
+        """
+        old_cents = self._cents[account]
+        new_cents = to_cents(value)
+        self._cents[account] = new_cents
+        setattr(self, f"_{account}_balance", to_dollars(new_cents))
+        return to_dollars(old_cents), to_dollars(new_cents), to_dollars(new_cents - old_cents)
 
     @property
     def combined_balance(self):
@@ -301,10 +376,11 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
+            value, self.message = float(data), Message.NONE
         diff = value - self._combined_balance
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "combined",
@@ -312,7 +388,10 @@ class CPFAccount:
             "new_balance": value.__round__(2),
             "amount": diff.__round__(2),
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"combined-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
         self._combined_balance = value.__round__(2)
         self._combined_message = self.message
@@ -338,10 +417,11 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
+            value, self.message = float(data), Message.NONE
         diff = value - self._combinedbelow55_balance
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "combined_below_55",
@@ -349,7 +429,10 @@ class CPFAccount:
             "new_balance": value.__round__(2),
             "amount": diff.__round__(2),
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"combined_below_55-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
         self._combinedbelow55_balance = value.__round__(2)
         self._combinedbelow55_balance_message = self.message
@@ -375,10 +458,11 @@ class CPFAccount:
         if isinstance(data, (tuple, list)) and len(data) == 2:
             value, self.message = data
         else:
-            value, self.message = float(data), "no message"
+            value, self.message = float(data), Message.NONE
         diff = value - self._combinedabove55_balance
         log_entry = {
-            "date": self.current_date.strftime("%Y-%m-%d"),
+            "month": self.month,
+            "day": self.day,
             "transaction_reference" : self.add_transaction_reference(),
             "age": self.age,
             "account": "combined_above_55",
@@ -386,7 +470,10 @@ class CPFAccount:
             "new_balance": value.__round__(2),
             "amount": diff.__round__(2),
             "type": "inflow" if diff > 0 else ("outflow" if diff < 0 else "no change"),
-            "message": f"combined_above_55-{self.message}-{diff:.2f}",
+            "event": self.event,
+            "message_code": message_code(self.message),
+            "param": self.message_param,
+            "message": message_text(self.message),
         }
         self._combinedabove55_balance = value.__round__(2)
         self._combinedabove55_balance_message = self.message
@@ -440,10 +527,14 @@ class CPFAccount:
             print(f"Error: Invalid account name for update_balance: {account}")
             return  # Or raise ValueError
         # Set the new balance using the provided value
-        setattr(self, f"_{account}_balance", new_balance)
+        self._cents[account] = to_cents(new_balance)
+        setattr(self, f"_{account}_balance", to_dollars(self._cents[account]))
 
-    def record_inflow(self, account: str, amount: float, message: str = "") -> None:
-        """Records an inflow of funds into a specified account."""
+    def record_inflow(self, account: str, amount: float, message="", event: EventType = EventType.ADJUSTMENT,
+                      param: int = 0) -> None:
+        """Records an inflow of funds into a specified account.
+        message is a Message template code (cpf_messages_v1), filled with param when rendered, or free text.
+        """
         valid_accounts = ["oa", "sa", "ma", "ra", "loan", "excess"]
         if account not in valid_accounts:
             print(f"Error: Invalid account name for record_inflow: {account}")
@@ -452,15 +543,22 @@ class CPFAccount:
         if not isinstance(amount, (int, float)) or abs(amount) < 1e-9:
             return  # Skip invalid or zero inflow
 
-        # Get current balance safely
-        current_balance = getattr(self, f"_{account}_balance", 0.0)
-        new_balance = current_balance + amount
+        # Round the posted amount once, then update the balance in exact cents
+        old_cents = self._cents[account]
+        new_balance = to_dollars(old_cents + to_cents(amount))
+        instrumentation.count("events_posted")
 
         # Use the property setter to update balance and trigger logging
-        setattr(self, f"{account}_balance", (new_balance.__round__(2), message))
-
-    def record_outflow(self, account: str, amount: float, message: str = "") -> None:
-        """Records an outflow of funds from a specified account."""
+        self.event, self.message_param = int(event), param
+        setattr(self, f"{account}_balance", (new_balance, message))
+        self.post_to_ledger(account, old_cents, event)
+        self.event, self.message_param = int(EventType.ADJUSTMENT), 0
+
+    def record_outflow(self, account: str, amount: float, message="", event: EventType = EventType.ADJUSTMENT,
+                      param: int = 0) -> None:
+        """Records an outflow of funds from a specified account.
+        message is a Message template code (cpf_messages_v1), filled with param when rendered, or free text.
+        """
         valid_accounts = ["oa", "sa", "ma", "ra", "loan", "excess"]
         if account not in valid_accounts:
             print(f"Error: Invalid account name for record_outflow: {account}")
@@ -469,12 +567,23 @@ class CPFAccount:
         if not isinstance(amount, (int, float)) or abs(amount) < 1e-9:
             return  # Skip invalid or zero outflow
 
-        # Get current balance safely
-        current_balance = getattr(self, f"_{account}_balance", 0.0)
-        new_balance = current_balance - amount
+        # Round the posted amount once, then update the balance in exact cents
+        old_cents = self._cents[account]
+        new_balance = to_dollars(old_cents - to_cents(amount))
+        instrumentation.count("events_posted")
 
         # Use the property setter to update balance and trigger logging
-        setattr(self, f"{account}_balance", (new_balance.__round__(2), message))
+        self.event, self.message_param = int(event), param
+        setattr(self, f"{account}_balance", (new_balance, message))
+        self.post_to_ledger(account, old_cents, event)
+        self.event, self.message_param = int(EventType.ADJUSTMENT), 0
+
+    def post_to_ledger(self, account: str, old_cents: int, event: EventType) -> None:
+        """Append the change just applied to `account` to the attached ledger, if any."""
+        if self.ledger is None:
+            return
+        cents = self._cents[account] - old_cents
+        self.ledger.post_cents(self.month, account, cents, event, self.trandaction_reference)
 
     def insert_data(
         self,
@@ -519,6 +628,18 @@ class CPFAccount:
             print(f"SQL Syntax error: {f}")
             
 
+    def insert_rows(self, conn, rows) -> None:
+        """Insert several month rows (same columns as insert_data) in one transaction."""
+        try:
+            conn.executemany("""
+                INSERT OR REPLACE INTO cpf_data (
+                    date_key, dbreference, age, oa_balance, sa_balance, ma_balance, ra_balance, loan_balance, excess_balance, cpf_payout, message
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, rows)
+            conn.commit()
+        except (sqlite3.Error, sqlite3.DatabaseError) as e:
+            print(f"Database insertion error: {e}")
+
     def calculate_cpf_allocation(self, account: str) -> float:
         """
         Calculates the allocation amount for a specific CPF account based on age and total CPF contribution.
@@ -587,82 +708,16 @@ class CPFAccount:
         self.calculate_total_contributions()
         allocation = {}
         mydict = {}
-        with open(CONFIG_FILENAME, "r") as file:
-            mydict = json.load(file)
-        # Determine the correct age bracket for contribution rates
-        allocation = {
-            "allocation_below_55": {
-                "oa": {
-                    "allocation": 0.6217,
-                    "amount": 0.6217 * self.total_contribution,
-                },
-                "sa": {
-                    "allocation": 0.1621,
-                    "amount": 0.1621 * self.total_contribution,
-                },
-                "ma": {
-                    "allocation": 0.2162,
-                    "amount": 0.2162 * self.total_contribution,
-                },
-            },
-            "allocation_above_55": {
-                "oa": {
-                    "56_to_60": {
-                        "allocation": 0.3694,
-                        "amount": 0.3694 * self.total_contribution,
-                    },
-                    "61_to_65": {
-                        "allocation": 0.149,
-                        "amount": 0.149 * self.total_contribution,
-                    },
-                    "66_to_70": {
-                        "allocation": 0.0607,
-                        "amount": 0.0607 * self.total_contribution,
-                    },
-                    "above_70": {
-                        "allocation": 0.08,
-                        "amount": 0.08 * self.total_contribution,
-                    },
-                },
-                "sa": {"allocation": 0.00, "amount": 0.0},
-                "ma": {
-                    "56_to_60": {
-                        "allocation": 0.323,
-                        "amount": 0.323 * self.total_contribution,
-                    },
-                    "61_to_65": {
-                        "allocation": 0.4468,
-                        "amount": 0.4468 * self.total_contribution,
-                    },
-                    "66_to_70": {
-                        "allocation": 0.6363,
-                        "amount": 0.6363 * self.total_contribution,
-                    },
-                    "above_70": {
-                        "allocation": 0.84,
-                        "amount": 0.84 * self.total_contribution,
-                    },
-                },
-                "ra": {
-                    "56_to_60": {
-                        "allocation": 0.3076,
-                        "amount": self.total_contribution * 0.3076,
-                    },
-                    "61_to_65": {
-                        "allocation": 0.4042,
-                        "amount": self.total_contribution * 0.4042,
-                    },
-                    "66_to_70": {
-                        "allocation": 0.303,
-                        "amount": self.total_contribution * 0.303,
-                    },
-                    "above_70": {
-                        "allocation": 0.08,
-                        "amount": self.total_contribution * 0.08,
-                    },
-                },
-            },
-        }
+        if self.config.path is not None:
+            with open(CONFIG_FILENAME, "r") as file:
+                mydict = json.load(file)
+        # Amounts for every age bracket, from the published allocation splits
+        allocation = allocation_table(self.total_contribution)
+        if self.config.path is None:
+            # In-memory config: add the missing allocation keys without touching the file
+            for key, value in allocation.items():
+                self.config.data.setdefault(key, value)
+            return
         allocation.update(mydict)
         with open(CONFIG_FILENAME, "w") as file:
             json.dump(allocation, file, indent=4)
@@ -720,13 +775,13 @@ class CPFAccount:
 
         # Calculate interest based on the account type
         if account == "oa":
-            return round((oa_rate / 100 / 12) * amount, 2)
+            return (oa_rate / 100 / 12) * amount
         elif account == "sa":
-            return round((sa_rate / 100 / 12) * amount, 2)
+            return (sa_rate / 100 / 12) * amount
         elif account == "ma":
-            return round((ma_rate / 100 / 12) * amount, 2)
+            return (ma_rate / 100 / 12) * amount
         elif account == "ra":
-            return round((ra_rate / 100 / 12) * amount, 2)
+            return (ra_rate / 100 / 12) * amount
         else:
             raise ValueError("Invalid account type. Must be 'oa', 'sa', 'ma', or 'ra'.")
 
@@ -878,20 +933,16 @@ class CPFAccount:
             interest_rate = 0.03
 
     def calculate_the_loan_amortization(self):
-        """Calculates the loan amortization schedule.
-        this is called every month
+        """Calculates the level monthly payment of the loan amortization schedule.
+        Rate and tenor come from the config (loan_interest_rate, loan_tenor_years).
         """
-        # Example logic for calculating loan amortization
         if self._loan_balance > 0:
-            # Assuming a fixed interest rate and term for simplicity
-            interest_rate = 0.03  # should be coming from the config in the future.
-            term_years = 30  # should come from the config in the future
-            monthly_payment = (
-                self._loan_balance
-                * (interest_rate / 12)
-                / (1 - (1 + interest_rate / 12) ** (-term_years * 12))
+            schedule = LoanSchedule.amortizing(
+                self._loan_balance,
+                float(self.config.getdata("loan_interest_rate", 3.0)),
+                int(round(float(self.config.getdata("loan_tenor_years", 30)) * 12)),
             )
-            return monthly_payment
+            return schedule.payment_at(0)
         else:
             return 0.0
 
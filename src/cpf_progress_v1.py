@@ -0,0 +1,171 @@
+## cpf_progress_v1.py
+"""
+Progress and telemetry for single and batch simulation runs.
+
+A ProgressReporter counts months and members and publishes a small status record
+(members done, months done, months/sec, ETA) to a sink at most once per `min_interval`
+seconds. tick() is a counter increment plus an occasional clock read, so it is safe
+to call from the month loop.
+
+Sinks:
+    StatusFileSink - atomically rewrites a JSON status file (readable by the Streamlit UI
+                     or any other process while the run is in progress)
+    QueueSink      - puts status records on a multiprocessing queue (worker -> parent)
+    StreamSink     - writes one status line to a stream such as stderr
+"""
+import json
+import os
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+PROGRESS_FILE_PATH = os.path.join(SRC_DIR, 'cpf_progress.json')  # Status file path inside src folder
+
+MIN_INTERVAL = 0.5  # seconds between published updates
+CHECK_EVERY = 64  # ticks between clock reads
+
+
+class StatusFileSink:
+    """Publish status records to a JSON file, replacing it atomically."""
+
+    def __init__(self, filename: str = PROGRESS_FILE_PATH):
+        self.filename = filename
+
+    def publish(self, status: dict) -> None:
+        tmp = f"{self.filename}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp, self.filename)
+
+
+class QueueSink:
+    """Publish status records on a multiprocessing queue without ever blocking the worker."""
+
+    def __init__(self, queue, worker_id=None):
+        self.queue = queue
+        self.worker_id = worker_id
+
+    def publish(self, status: dict) -> None:
+        try:
+            self.queue.put_nowait({'worker': self.worker_id, **status})
+        except Exception:
+            pass  # a full queue only costs an update, never the run
+
+
+class StreamSink:
+    """Write one status line per update to a stream."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def publish(self, status: dict) -> None:
+        eta = status['eta_seconds']
+        eta_text = f"{eta:,.0f}s" if eta is not None else "?"
+        self.stream.write(
+            f"[{status['state']}] members {status['members_done']}/{status['total_members']}  "
+            f"months {status['months_done']:,}  {status['months_per_sec']:,.0f} months/s  ETA {eta_text}\n"
+        )
+        self.stream.flush()
+
+
+def clear_status(filename: str = PROGRESS_FILE_PATH) -> None:
+    """Remove a previous run's status file, so a reader never mistakes it for the new run's."""
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+def read_status(filename: str = PROGRESS_FILE_PATH):
+    """Read the latest status record written by a StatusFileSink, or None."""
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ProgressReporter:
+    """
+    Rate-limited progress counter for one or many members.
+    total_months is the expected number of months per member, used for the ETA
+    while the first member is still running.
+    """
+
+    def __init__(self, total_members: int = 1, total_months: int = None, sinks: list = None,
+                 min_interval: float = MIN_INTERVAL):
+        self.total_members = total_members
+        self.total_months = total_months
+        self.sinks = sinks if sinks is not None else []
+        self.min_interval = min_interval
+        self.members_done = 0
+        self.months_done = 0
+        self._ticks = 0
+        self._started = time.perf_counter()
+        self._last_publish = 0.0
+
+    def tick(self, months: int = 1) -> None:
+        """Count simulated months. Only every CHECK_EVERY calls read the clock."""
+        self.months_done += months
+        self._ticks += 1
+        if self._ticks >= CHECK_EVERY:
+            self._ticks = 0
+            self._maybe_publish()
+
+    def member_done(self, months: int = 0) -> None:
+        """Count one finished member (plus any months not already ticked)."""
+        self.months_done += months
+        self.members_done += 1
+        self._maybe_publish()
+
+    def merge(self, members: int = 0, months: int = 0) -> None:
+        """Add progress reported by a worker process."""
+        self.members_done += members
+        self.months_done += months
+        self._maybe_publish()
+
+    def status(self, state: str = 'running') -> dict:
+        elapsed = time.perf_counter() - self._started
+        rate = self.months_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if state == 'done':
+            eta = 0.0
+        elif self.members_done and self.total_members:
+            eta = elapsed / self.members_done * (self.total_members - self.members_done)
+        elif self.total_months and self.total_members and rate:
+            eta = (self.total_months * self.total_members - self.months_done) / rate
+        return {
+            'state': state,
+            'members_done': self.members_done,
+            'total_members': self.total_members,
+            'months_done': self.months_done,
+            'total_months': None if self.total_months is None else self.total_months * self.total_members,
+            'months_per_sec': round(rate, 1),
+            'elapsed_seconds': round(elapsed, 3),
+            'eta_seconds': None if eta is None else round(max(eta, 0.0), 1),
+        }
+
+    def _maybe_publish(self) -> None:
+        now = time.perf_counter()
+        if now - self._last_publish >= self.min_interval:
+            self._last_publish = now
+            self.publish()
+
+    def publish(self, state: str = 'running') -> None:
+        status = self.status(state)
+        for sink in self.sinks:
+            sink.publish(status)
+
+    def finish(self) -> None:
+        """Publish the final status regardless of the rate limit."""
+        self.publish('done')
+
+
+if __name__ == "__main__":
+    # Example usage
+    progress = ProgressReporter(total_members=3, total_months=600, sinks=[StreamSink()], min_interval=0.0)
+    for _ in range(3):
+        for _ in range(600):
+            progress.tick()
+        progress.member_done()
+    progress.finish()
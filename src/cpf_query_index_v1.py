@@ -0,0 +1,158 @@
+## cpf_query_index_v1.py
+from bisect import bisect_right
+import os
+import sqlite3
+
+import numpy as np
+
+from cpf_ledger_v1 import ACCOUNTS, ACCOUNT_CODES, CPFLedger, EventType
+from cpf_month_index_v1 import month_index, month_key
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+DATABASE_NAME = os.path.join(SRC_DIR, 'cpf_simulation.db')  # Full path to the database file
+
+MILESTONES = ('age_55_transfer', 'payout_start', 'ra_depletion', 'loan_payoff')
+
+
+def _first_month(months: np.ndarray, mask: np.ndarray):
+    """Return the first month where mask is True, or None."""
+    if not mask.any():
+        return None
+    return int(months[int(np.argmax(mask))])
+
+
+class BalanceIndex:
+    """
+    Point-in-time query index over the month-end balances of one simulation run.
+    Months are kept as a sorted integer array, so "balances at date X" is a binary search,
+    and the milestones (age-55 transfer, payout start, RA depletion, loan payoff)
+    are computed once when the index is built and then answered in constant time.
+    """
+
+    def __init__(self, months, balances, payouts=None, ages=None, milestones: dict = None):
+        self.months = np.asarray(months, dtype=np.int64)
+        self.balances = np.asarray(balances, dtype=np.float64)
+        if self.balances.shape != (len(self.months), len(ACCOUNTS)):
+            raise ValueError(f"balances must have shape ({len(self.months)}, {len(ACCOUNTS)})")
+        if len(self.months) > 1 and np.any(np.diff(self.months) <= 0):
+            raise ValueError("months must be strictly increasing")
+        self.payouts = np.zeros(len(self.months)) if payouts is None else np.asarray(payouts, dtype=np.float64)
+        self.ages = None if ages is None else np.asarray(ages, dtype=np.int64)
+        self._month_list = self.months.tolist()  # plain list for bisect
+        self.milestones = self._compute_milestones()
+        if milestones:
+            self.milestones.update(milestones)
+
+    def _compute_milestones(self) -> dict:
+        """Derive the milestones from the balance columns in one vectorized pass."""
+        ra = self.balances[:, ACCOUNT_CODES['ra']]
+        loan = self.balances[:, ACCOUNT_CODES['loan']]
+        has_ra = ra > 0
+        ra_funded = np.maximum.accumulate(has_ra) if len(ra) else has_ra
+        had_loan = np.maximum.accumulate(loan > 0) if len(loan) else loan > 0
+        return {
+            'age_55_transfer': _first_month(self.months, has_ra),
+            'payout_start': _first_month(self.months, self.payouts > 0),
+            'ra_depletion': _first_month(self.months, ra_funded & ~has_ra),
+            'loan_payoff': _first_month(self.months, had_loan & (loan <= 0)),
+        }
+
+    def __len__(self):
+        return len(self.months)
+
+    def position(self, when) -> int:
+        """Return the row holding the balances in force at `when`, or -1 if before the run."""
+        return bisect_right(self._month_list, month_index(when)) - 1
+
+    def balances_at(self, when) -> dict[str, float]:
+        """Return the month-end balances in force at the given date or 'YYYY-MM' key."""
+        row = self.position(when)
+        if row < 0:
+            return {account: 0.0 for account in ACCOUNTS}
+        return dict(zip(ACCOUNTS, self.balances[row].tolist()))
+
+    def milestone(self, name: str):
+        """Return the month index of a precomputed milestone, or None if it never happens."""
+        if name not in self.milestones:
+            raise KeyError(f"Unknown milestone: {name}. Expected one of {MILESTONES}")
+        return self.milestones[name]
+
+    def milestone_key(self, name: str):
+        """Return a milestone as a 'YYYY-MM' key, or None."""
+        value = self.milestone(name)
+        return None if value is None else month_key(value)
+
+    @classmethod
+    def from_ledger(cls, ledger: CPFLedger) -> "BalanceIndex":
+        """Build the index by replaying a CPFLedger."""
+        months, balances = ledger.replay()
+        columns = ledger.to_arrays()
+        payout_rows = (columns['event'] == EventType.PAYOUT) & (columns['account'] == ACCOUNT_CODES['ra'])
+        payouts = np.zeros(len(months))
+        if payout_rows.any():
+            rows = np.searchsorted(months, columns['month'][payout_rows])
+            np.add.at(payouts, rows, -columns['amount'][payout_rows] / 100)
+        transfers = columns['month'][columns['event'] == EventType.AGE_55_TRANSFER]
+        milestones = {'age_55_transfer': int(transfers[0])} if len(transfers) else None
+        return cls(months, balances / 100, payouts=payouts, milestones=milestones)
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection, table: str = 'cpf_data') -> "BalanceIndex":
+        """Build the index from the month rows stored by the simulation in one query."""
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT date_key, age, oa_balance, sa_balance, ma_balance, ra_balance,
+                   loan_balance, excess_balance, cpf_payout
+            FROM {table}
+            ORDER BY date_key;
+        """)
+        rows = cur.fetchall()
+        months = [month_index(row[0]) for row in rows]
+        ages = [row[1] for row in rows]
+        balances = np.array([row[2:8] for row in rows], dtype=np.float64).reshape(len(rows), len(ACCOUNTS))
+        payouts = [row[8] for row in rows]
+        return cls(months, balances, payouts=payouts, ages=ages)
+
+
+class ResultStore:
+    """
+    Collection of BalanceIndex objects keyed by run id.
+    Every per-run lookup keeps the cost of the underlying index.
+    """
+
+    def __init__(self):
+        self._runs: dict[str, BalanceIndex] = {}
+
+    def __len__(self):
+        return len(self._runs)
+
+    def __contains__(self, run_id):
+        return run_id in self._runs
+
+    def add(self, run_id, index: BalanceIndex) -> None:
+        self._runs[run_id] = index
+
+    def get(self, run_id) -> BalanceIndex:
+        if run_id not in self._runs:
+            raise KeyError(f"Unknown run: {run_id}")
+        return self._runs[run_id]
+
+    def balances_at(self, run_id, when) -> dict[str, float]:
+        return self.get(run_id).balances_at(when)
+
+    def milestone(self, run_id, name: str):
+        return self.get(run_id).milestone(name)
+
+    def milestones(self, name: str) -> dict:
+        """Return one milestone for every stored run."""
+        return {run_id: index.milestone(name) for run_id, index in self._runs.items()}
+
+
+if __name__ == "__main__":
+    # Example usage: query the rows written by cpf_run_simulation_v8
+    with sqlite3.connect(DATABASE_NAME) as conn:
+        index = BalanceIndex.from_db(conn)
+    print(f"Months indexed: {len(index)}")
+    for name in MILESTONES:
+        print(f"{name}: {index.milestone_key(name)}")
+    print(f"Balances at 2030-01: {index.balances_at('2030-01')}")
@@ -0,0 +1,143 @@
+## cpf_reconciliation_v1.py
+import os
+
+import numpy as np
+
+from cpf_ledger_v1 import ACCOUNTS, ACCOUNT_CODES
+from cpf_money_v1 import MONEY_DTYPE, to_cents_array
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+CHUNK_SIZE = 100_000
+
+LOG_COLUMNS = ['transaction_reference', 'account', 'type', 'amount']
+REPORT_COLUMNS = ['REF', 'ACCOUNT', 'INFLOW', 'OUTFLOW']
+REPORT_BALANCE_COLUMNS = {'oa': 'OA', 'sa': 'SA', 'ma': 'MA', 'ra': 'RA', 'loan': 'LOANS', 'excess': 'EXCESS'}
+FLOW_TYPES = ['inflow', 'outflow']
+
+
+def iter_chunks(source, columns: list, chunksize: int = CHUNK_SIZE):
+    """
+    Yield DataFrame chunks holding `columns` from a CSV path, a DataFrame,
+    a dict of columnar arrays, or an iterable of DataFrames.
+    """
+    import pandas as pd  # deferred: importing this module must not load pandas
+    if isinstance(source, (str, os.PathLike)):
+        yield from pd.read_csv(source, usecols=columns, chunksize=chunksize)
+    elif isinstance(source, pd.DataFrame):
+        yield source[columns]
+    elif isinstance(source, dict):
+        yield pd.DataFrame({column: source[column] for column in columns})
+    else:
+        for chunk in source:
+            yield chunk[columns]
+
+
+class ReconciliationResult:
+    """Outcome of reconciling a transaction journal against a balance report."""
+
+    def __init__(self, mismatches: "pd.DataFrame", balances: "pd.DataFrame", journal_rows: int, report_rows: int):
+        self.mismatches = mismatches
+        self.balances = balances
+        self.journal_rows = journal_rows
+        self.report_rows = report_rows
+
+    @property
+    def ok(self) -> bool:
+        return self.mismatches.empty and not self.balances['difference'].any()
+
+    def __repr__(self):
+        return (f"ReconciliationResult(journal_rows={self.journal_rows}, report_rows={self.report_rows}, "
+                f"mismatches={len(self.mismatches)}, ok={self.ok})")
+
+
+def _load_journal(log_source, chunksize: int):
+    """
+    Stream the journal into compact reference/account/cents arrays and per-account totals.
+    """
+    references, accounts, amounts = [], [], []
+    totals = np.zeros(len(ACCOUNTS), dtype=MONEY_DTYPE)
+    for chunk in iter_chunks(log_source, LOG_COLUMNS, chunksize):
+        chunk = chunk[chunk['type'].isin(FLOW_TYPES)]
+        codes = chunk['account'].map(ACCOUNT_CODES)
+        valid = codes.notna().to_numpy()
+        codes = codes.to_numpy()[valid].astype(np.int8)
+        cents = to_cents_array(chunk['amount'].to_numpy()[valid])
+        np.add.at(totals, codes, cents)
+        references.append(chunk['transaction_reference'].to_numpy(dtype=np.int64)[valid])
+        accounts.append(codes)
+        amounts.append(cents)
+
+    if not references:
+        return np.empty(0, np.int64), np.empty(0, np.int8), np.empty(0, MONEY_DTYPE), totals
+    references = np.concatenate(references)
+    accounts = np.concatenate(accounts)
+    amounts = np.concatenate(amounts)
+    order = np.argsort(references, kind='stable')
+    return references[order], accounts[order], amounts[order], totals
+
+
+def reconcile(log_source, report_source, chunksize: int = CHUNK_SIZE) -> ReconciliationResult:
+    """
+    Validate the transaction journal against the built report using integer-cent arithmetic.
+    Both inputs are streamed chunk by chunk; every report row is matched to its journal entry
+    by transaction reference and account, and the per-account journal sums are checked
+    against the closing balances of the report.
+    """
+    import pandas as pd
+    log_refs, log_accounts, log_cents, journal_totals = _load_journal(log_source, chunksize)
+
+    mismatch_frames = []
+    report_rows = 0
+    closing = None
+    for chunk in iter_chunks(report_source, REPORT_COLUMNS + list(REPORT_BALANCE_COLUMNS.values()), chunksize):
+        if chunk.empty:
+            continue
+        closing = chunk.iloc[-1]
+        codes = chunk['ACCOUNT'].map(ACCOUNT_CODES)
+        valid = codes.notna().to_numpy()
+        chunk = chunk[valid]
+        report_rows += len(chunk)
+        refs = chunk['REF'].to_numpy(dtype=np.int64)
+        codes = codes.to_numpy()[valid].astype(np.int8)
+        report_cents = to_cents_array(chunk['INFLOW'].to_numpy()) + to_cents_array(chunk['OUTFLOW'].to_numpy())
+
+        # Locate each report row in the sorted journal
+        if len(log_refs):
+            pos = np.minimum(np.searchsorted(log_refs, refs), len(log_refs) - 1)
+            found = (log_refs[pos] == refs) & (log_accounts[pos] == codes)
+            journal_cents = np.where(found, log_cents[pos], 0)
+        else:
+            found = np.zeros(len(refs), dtype=bool)
+            journal_cents = np.zeros(len(refs), dtype=MONEY_DTYPE)
+        differs = ~found | (np.abs(journal_cents) != np.abs(report_cents))
+        report_differs = differs & (report_cents != 0)
+        if report_differs.any():
+            mismatch_frames.append(pd.DataFrame({
+                'transaction_reference': refs[report_differs],
+                'account': [ACCOUNTS[code] for code in codes[report_differs]],
+                'type': np.where(report_cents[report_differs] >= 0, 'inflow', 'outflow'),
+                'amount_log': np.where(found[report_differs], journal_cents[report_differs] / 100, np.nan),
+                'amount_report': report_cents[report_differs] / 100,
+                'difference': (np.abs(journal_cents[report_differs]) - np.abs(report_cents[report_differs])) / 100,
+            }))
+
+    mismatches = pd.concat(mismatch_frames, ignore_index=True) if mismatch_frames else pd.DataFrame(
+        columns=['transaction_reference', 'account', 'type', 'amount_log', 'amount_report', 'difference'])
+
+    report_totals = np.zeros(len(ACCOUNTS), dtype=MONEY_DTYPE)
+    if closing is not None:
+        report_totals = to_cents_array([closing[REPORT_BALANCE_COLUMNS[account]] for account in ACCOUNTS])
+    balances = pd.DataFrame({
+        'account': ACCOUNTS,
+        'journal_balance': journal_totals / 100,
+        'report_balance': report_totals / 100,
+        'difference': (journal_totals - report_totals) / 100,
+    })
+    return ReconciliationResult(mismatches, balances, journal_rows=len(log_refs), report_rows=report_rows)
+
+
+if __name__ == "__main__":
+    # Example usage
+    result = reconcile(os.path.join(SRC_DIR, 'cpf_log_file.csv'), os.path.join(SRC_DIR, 'cpf_report.csv'))
+    print(result)
+    print(result.balances)
@@ -0,0 +1,130 @@
+## cpf_reference_allocator_v1.py
+"""
+Globally unique transaction references for parallel and batch runs.
+
+A single CPFAccount numbers its journal entries from 100000000, so two members (or two runs)
+produce the same references. Here every member gets its own block of the int64 reference space,
+computed from the run id and the member's position in the batch:
+
+    reference = run_id << 44 | member << 20 | sequence
+
+Workers derive their block arithmetically, so nothing is locked or shared while a simulation
+posts entries; merged journals stay joinable and every reference decodes back to its run and
+member. Run ids start at 1, so encoded references never collide with the single-run default.
+Without an explicit run id, new_run_id() takes the next id from the cpf_runs table of the
+simulation database, so runs started at the same time (or in separate processes) never share one.
+
+    allocator = ReferenceAllocator(run_id=7)
+    cpf.use_reference_block(allocator.block(member=42))
+"""
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+
+RUN_BITS = 19
+MEMBER_BITS = 24
+SEQUENCE_BITS = 20  # 1,048,575 entries per member and run
+MEMBER_SHIFT = SEQUENCE_BITS
+RUN_SHIFT = SEQUENCE_BITS + MEMBER_BITS
+MAX_RUN = (1 << RUN_BITS) - 1
+MAX_MEMBER = (1 << MEMBER_BITS) - 1
+BLOCK_SIZE = 1 << SEQUENCE_BITS
+LEGACY_START_REFERENCE = 100000000  # CPFAccount default, below every encoded block
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+DATABASE_NAME = os.path.join(SRC_DIR, 'cpf_simulation.db')  # Full path to the database file
+
+
+def encode_reference(run_id: int, member: int, sequence: int = 0) -> int:
+    """Reference number of `sequence` inside the block of (run_id, member)."""
+    if not 1 <= run_id <= MAX_RUN:
+        raise ValueError(f"run_id must be between 1 and {MAX_RUN}, got {run_id}")
+    if not 0 <= member <= MAX_MEMBER:
+        raise ValueError(f"member must be between 0 and {MAX_MEMBER}, got {member}")
+    if not 0 <= sequence < BLOCK_SIZE:
+        raise ValueError(f"sequence must be between 0 and {BLOCK_SIZE - 1}, got {sequence}")
+    return run_id << RUN_SHIFT | member << MEMBER_SHIFT | sequence
+
+
+def decode_reference(reference: int) -> tuple[int, int, int]:
+    """(run_id, member, sequence) of an encoded reference; run_id is 0 for single-run references."""
+    reference = int(reference)
+    return (reference >> RUN_SHIFT,
+            (reference >> MEMBER_SHIFT) & MAX_MEMBER,
+            reference & (BLOCK_SIZE - 1))
+
+
+def decode_references(references):
+    """Vectorised decode_reference over a NumPy int64 array: (run_ids, members, sequences)."""
+    return (references >> RUN_SHIFT,
+            (references >> MEMBER_SHIFT) & MAX_MEMBER,
+            references & (BLOCK_SIZE - 1))
+
+
+def new_run_id(database: str = DATABASE_NAME) -> int:
+    """
+    Next unused run id, claimed in the cpf_runs table. SQLite serialises the inserts, so
+    concurrent runs get distinct ids, and AUTOINCREMENT never hands out an id twice.
+    """
+    conn = sqlite3.connect(database, timeout=30)
+    try:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cpf_runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started TEXT NOT NULL
+                );
+            """)
+            run_id = conn.execute("INSERT INTO cpf_runs (started) VALUES (?);",
+                                  (datetime.now().isoformat(timespec='seconds'),)).lastrowid
+    finally:
+        conn.close()
+    if run_id > MAX_RUN:
+        raise ValueError(f"All {MAX_RUN} run ids in {database} are used; pass an explicit run_id")
+    return run_id
+
+
+@dataclass(frozen=True)
+class ReferenceBlock:
+    """Contiguous references owned by one member of one run: start + 1 .. start + BLOCK_SIZE - 1."""
+    run_id: int
+    member: int
+    start: int
+
+    @property
+    def end(self) -> int:
+        return self.start + BLOCK_SIZE
+
+    def __contains__(self, reference: int) -> bool:
+        return self.start < reference < self.end
+
+
+class ReferenceAllocator:
+    """
+    Hands out one reference block per member of a run. Blocks are pure functions of
+    (run_id, member), so a worker can build its own without talking to the parent.
+    """
+
+    def __init__(self, run_id: int = None):
+        self.run_id = run_id if run_id is not None else new_run_id()
+        encode_reference(self.run_id, 0)  # validate
+
+    def block(self, member: int) -> ReferenceBlock:
+        return ReferenceBlock(self.run_id, member, encode_reference(self.run_id, member))
+
+    def owner(self, reference: int) -> int:
+        """Member the reference belongs to; ValueError if it was not issued by this run."""
+        run_id, member, _ = decode_reference(reference)
+        if run_id != self.run_id:
+            raise ValueError(f"Reference {reference} belongs to run {run_id}, not {self.run_id}")
+        return member
+
+
+if __name__ == "__main__":
+    # Example usage
+    allocator = ReferenceAllocator(run_id=7)
+    for member in (0, 1, 42):
+        block = allocator.block(member)
+        first = block.start + 1
+        print(f"member {member:>3}: references {first} .. {block.end - 1}  decode({first}) = {decode_reference(first)}")
@@ -0,0 +1,256 @@
+## cpf_renderers_v1.py
+"""
+Output layer for simulation results.
+The month loop only appends numbers to a SimulationResult; all formatting happens once,
+in bulk, after the run, by one of the renderers below:
+
+    quiet   - no output
+    summary - run header and the final balances
+    table   - the full month-by-month console table
+    html    - the full table written to simulation_output.html
+"""
+import hashlib
+import html
+import json
+import os
+import sys
+
+import numpy as np
+
+from cpf_month_index_v1 import MONTH_DTYPE, month_key
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+SIMULATION_OUTPUT_PATH = os.path.join(SRC_DIR, 'simulation_output.html')  # HTML output path inside src folder
+RESULT_FILE_PATH = os.path.join(SRC_DIR, 'cpf_result.npz')  # Saved result of the last run inside src folder
+
+VIOLET = "\033[35m"
+RESET = "\033[0m"  # Reset color to default
+WIDTH = 150
+BALANCE_COLUMNS = ('oa', 'sa', 'ma', 'ra', 'loan', 'excess', 'payout')
+
+
+class SimulationResult:
+    """
+    Month rows of one simulation run, stored column-wise and keyed by integer month index.
+    Rows flagged as `transfer` are the age-55 retirement account formation rows.
+    The 'YYYY-MM' date_keys are only formatted when a renderer or export asks for them.
+    """
+
+    def __init__(self, header: dict = None):
+        self.header = header or {}
+        self.loaded_initial_balances = False
+        self.stop_message = None
+        self.ledger = None  # CPFLedger of the run, if one was attached
+        self.months: list[int] = []
+        self.ages: list[int] = []
+        self.transfer: list[bool] = []
+        self.columns: dict[str, list[float]] = {name: [] for name in BALANCE_COLUMNS}
+
+    def __len__(self):
+        return len(self.months)
+
+    @property
+    def date_keys(self) -> list[str]:
+        """'YYYY-MM' per row, with the transfer rows suffixed '-cpf'."""
+        return [f"{month_key(month)}-cpf" if transfer else month_key(month)
+                for month, transfer in zip(self.months, self.transfer)]
+
+    def add_row(self, month: int, age: int, oa: float, sa: float, ma: float, ra: float,
+                loan: float, excess: float, payout: float, transfer: bool = False) -> None:
+        self.months.append(month)
+        self.ages.append(age)
+        self.transfer.append(transfer)
+        columns = self.columns
+        columns['oa'].append(oa)
+        columns['sa'].append(sa)
+        columns['ma'].append(ma)
+        columns['ra'].append(ra)
+        columns['loan'].append(loan)
+        columns['excess'].append(excess)
+        columns['payout'].append(payout)
+
+    def add_rows(self, months: list[int], ages: list[int], oa: float, sa: float, ma: float, ra: float,
+                 loan: float, excess: float, payout: float) -> None:
+        """Append a run of months that all carry the same balances."""
+        n = len(months)
+        self.months.extend(months)
+        self.ages.extend(ages)
+        self.transfer.extend([False] * n)
+        for name, value in zip(BALANCE_COLUMNS, (oa, sa, ma, ra, loan, excess, payout)):
+            self.columns[name].extend([value] * n)
+
+    def extend(self, other: "SimulationResult") -> None:
+        """Append all rows of another result, e.g. imported history ahead of a projection."""
+        self.months.extend(other.months)
+        self.ages.extend(other.ages)
+        self.transfer.extend(other.transfer)
+        for name in BALANCE_COLUMNS:
+            self.columns[name].extend(other.columns[name])
+
+    def as_arrays(self) -> dict[str, np.ndarray]:
+        """Return the result columns as NumPy arrays."""
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in self.columns.items()}
+        arrays['month'] = np.asarray(self.months, dtype=MONTH_DTYPE)
+        arrays['date_key'] = np.asarray(self.date_keys)
+        arrays['age'] = np.asarray(self.ages, dtype=np.int64)
+        arrays['transfer'] = np.asarray(self.transfer, dtype=bool)
+        return arrays
+
+    def _row_arrays(self) -> dict[str, np.ndarray]:
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in self.columns.items()}
+        arrays['month'] = np.asarray(self.months, dtype=MONTH_DTYPE)
+        arrays['age'] = np.asarray(self.ages, dtype=np.int64)
+        arrays['transfer'] = np.asarray(self.transfer, dtype=bool)
+        return arrays
+
+    def digest(self) -> str:
+        """SHA-256 of the rows, e.g. to key cached exports of this result."""
+        sha = hashlib.sha256()
+        for name, values in sorted(self._row_arrays().items()):
+            sha.update(name.encode('utf-8'))
+            sha.update(np.ascontiguousarray(values).tobytes())
+        return sha.hexdigest()
+
+    def save(self, filename: str = RESULT_FILE_PATH) -> None:
+        """Save the rows, header and stop message to a compressed .npz file."""
+        meta = {'header': self.header, 'stop_message': self.stop_message,
+                'loaded_initial_balances': self.loaded_initial_balances}
+        np.savez_compressed(filename, meta=np.asarray(json.dumps(meta, default=str)), **self._row_arrays())
+
+    @classmethod
+    def load(cls, filename: str = RESULT_FILE_PATH) -> "SimulationResult":
+        """Load a result saved with `save` (header dates come back as strings)."""
+        with np.load(filename) as data:
+            meta = json.loads(str(data['meta']))
+            result = cls(meta['header'])
+            result.stop_message = meta['stop_message']
+            result.loaded_initial_balances = meta['loaded_initial_balances']
+            result.months = data['month'].tolist()
+            result.ages = data['age'].tolist()
+            result.transfer = data['transfer'].tolist()
+            result.columns = {name: data[name].tolist() for name in BALANCE_COLUMNS}
+        return result
+
+    def final_row(self):
+        """Return the last regular month row as a dict, or None for an empty run."""
+        for i in range(len(self) - 1, -1, -1):
+            if not self.transfer[i]:
+                return {'date_key': month_key(self.months[i]), 'month': self.months[i], 'age': self.ages[i],
+                        **{name: values[i] for name, values in self.columns.items()}}
+        return None
+
+
+def header_lines(result: SimulationResult, color: bool = True) -> list[str]:
+    violet, reset = (VIOLET, RESET) if color else ('', '')
+    h = result.header
+    return [
+        f"{violet}{'Simulation of CPF Data':^150}{reset}",
+        f"{violet}====================================={reset}",
+        f"{violet}== Start Date: {h.get('start_date')}{reset}",
+        f"{violet}== End Date: {h.get('end_date')}{reset}",
+        f"{violet}== Birth Date: {h.get('birth_date')}{reset}",
+        f"{violet}== Age: {h.get('age')}{reset}",
+        f"{violet}== Retirement Amount: {h.get('retirement_amount')}{reset}",
+        f"{violet}== OA Balance Amount: {h.get('oa_balance', 0.0)}{reset}",
+        f"{violet}== SA Balance Amount: {h.get('sa_balance', 0.0)}{reset}",
+        f"{violet}== MA Balance Amount: {h.get('ma_balance', 0.0)}{reset}",
+        f"{violet}== Loan Balance Amount: {h.get('loan_balance', 0.0)}{reset}",
+        f"{violet}======================================{reset}",
+        f"{violet}{'-' * WIDTH}{reset}",
+    ]
+
+
+def table_lines(result: SimulationResult) -> list[str]:
+    """Format every month row in one pass."""
+    lines = [
+        f"{'Month and Year':<15}{'Age':<5}{'OA Balance':<15}{'SA Balance':<15}{'MA Balance':<15}{'RA Balance':<15}{'Loan Amount':<12}{'Excess Cash':<12}{'CPF Payout':<12}",
+        "-" * WIDTH,
+    ]
+    if result.loaded_initial_balances:
+        lines.append("Loading initial balances from config...")
+    c = result.columns
+    for date_key, age, transfer, oa, sa, ma, ra, loan, excess, payout in zip(
+        result.date_keys, result.ages, result.transfer,
+        c['oa'], c['sa'], c['ma'], c['ra'], c['loan'], c['excess'], c['payout']
+    ):
+        if transfer:
+            lines.append(f"{date_key:<15}{age:<4}"
+                         f"{oa:<15,.2f}{sa:<15,.2f}"
+                         f"={ma:<14,.2f}+{ra:<14,.2f}"
+                         f"{loan:<13,.2f}{excess:<12,.2f}"
+                         f"{payout:<12,.2f}")
+        else:
+            lines.append(f"{date_key:<15}{age:<5}"
+                         f"{oa:<15,.2f}{sa:<15,.2f}"
+                         f"{ma:<15,.2f}{ra:<15,.2f}"
+                         f"{loan:<12,.2f}{excess:<12,.2f}"
+                         f"{payout:<12,.2f}")
+    if result.stop_message:
+        lines.append(result.stop_message)
+    return lines
+
+
+class QuietRenderer:
+    """Produces no output."""
+
+    def render(self, result: SimulationResult) -> None:
+        return None
+
+
+class SummaryRenderer:
+    """Prints the run header and the final balances only."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def render(self, result: SimulationResult) -> None:
+        lines = header_lines(result)
+        final = result.final_row()
+        if final is not None:
+            lines.append(f"Months simulated: {len(result)}")
+            lines.append(f"Final month: {final['date_key']} (age {final['age']})")
+            for name in BALANCE_COLUMNS:
+                lines.append(f"{name.upper():<8}{final[name]:>15,.2f}")
+        if result.stop_message:
+            lines.append(result.stop_message)
+        self.stream.write("\n".join(lines) + "\n")
+
+
+class TableRenderer:
+    """Prints the full month-by-month table in a single write."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def render(self, result: SimulationResult) -> None:
+        self.stream.write("\n".join(header_lines(result) + table_lines(result)) + "\n")
+
+
+class HTMLRenderer:
+    """Writes the full table to an HTML file."""
+
+    def __init__(self, filename: str = SIMULATION_OUTPUT_PATH):
+        self.filename = filename
+
+    def render(self, result: SimulationResult) -> str:
+        header = "\n".join(html.escape(line) for line in header_lines(result, color=False))
+        body = html.escape("\n".join(table_lines(result)))
+        with open(self.filename, 'w') as f:
+            f.write(f'<pre><span style="color: violet">{header}</span>\n{body}</pre>')
+        print(f"Simulation output saved to {self.filename}")
+        return self.filename
+
+
+RENDERERS = {
+    'quiet': QuietRenderer,
+    'summary': SummaryRenderer,
+    'table': TableRenderer,
+    'html': HTMLRenderer,
+}
+
+
+def get_renderer(name: str = 'table'):
+    """Return a renderer instance by name."""
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown output mode: {name}. Use one of {', '.join(RENDERERS)}.")
+    return RENDERERS[name]()
@@ -0,0 +1,80 @@
+## cpf_retirement_transfer_v1.py
+"""
+Retirement account formation at age 55.
+
+In the member's birth month at 55 the OA and SA balances close out: the outstanding loan is
+settled from them, the chosen retirement sum is set aside in the RA, and whatever is left
+goes to the excess account. The MA is untouched.
+
+    form_retirement_account(oa, sa, loan, retirement_sum)    one member, returns a RetirementTransfer
+    form_retirement_accounts(oa, sa, loan, retirement_sum)   a batch of members as NumPy arrays
+    apply_transfer(cpf, transfer)                            posts the transfer to a CPFAccount
+"""
+import numpy as np
+
+from cpf_ledger_v1 import EventType
+from cpf_messages_v1 import Message
+
+TRANSFER_AGE = 55
+TRANSFER_ACCOUNTS = ('oa', 'sa', 'loan', 'ra', 'excess')
+
+
+def is_transfer_month(age: int, current_date, birth_date) -> bool:
+    """True in the month the retirement account is formed: the birth month at age 55."""
+    return age == TRANSFER_AGE and current_date.month == birth_date.month
+
+
+def form_retirement_accounts(oa, sa, loan, retirement_sum) -> dict:
+    """
+    Balance changes of the RA formation for a batch of members.
+    Returns a dict of arrays keyed by account: OA, SA and a positive loan are closed out,
+    RA receives the retirement sum and excess receives OA + SA - loan - retirement sum.
+    """
+    oa = np.atleast_1d(np.asarray(oa, dtype=np.float64))
+    sa = np.atleast_1d(np.asarray(sa, dtype=np.float64))
+    loan = np.atleast_1d(np.asarray(loan, dtype=np.float64))
+    retirement_sum = np.broadcast_to(np.asarray(retirement_sum, dtype=np.float64), oa.shape)
+    return {
+        'oa': -oa,
+        'sa': -sa,
+        'loan': np.where(loan > 0, -loan, 0.0),
+        'ra': retirement_sum.copy(),
+        'excess': oa + sa - loan - retirement_sum,
+    }
+
+
+class RetirementTransfer:
+    """Balance changes of one member's RA formation."""
+
+    def __init__(self, oa: float, sa: float, loan: float, ra: float, excess: float):
+        self.oa = oa
+        self.sa = sa
+        self.loan = loan
+        self.ra = ra
+        self.excess = excess
+
+    def items(self):
+        """(account, change) pairs in posting order."""
+        return [(account, getattr(self, account)) for account in TRANSFER_ACCOUNTS]
+
+    def __repr__(self):
+        return "RetirementTransfer(" + ", ".join(f"{account}={amount:,.2f}" for account, amount in self.items()) + ")"
+
+
+def form_retirement_account(oa: float, sa: float, loan: float, retirement_sum: float) -> RetirementTransfer:
+    """Balance changes of the RA formation for one member."""
+    changes = form_retirement_accounts(oa, sa, loan, retirement_sum)
+    return RetirementTransfer(**{account: float(changes[account][0]) for account in TRANSFER_ACCOUNTS})
+
+
+def apply_transfer(cpf, transfer: RetirementTransfer, message=Message.AGE_55_TRANSFER) -> None:
+    """Post the transfer to a CPFAccount as AGE_55_TRANSFER events."""
+    for account, amount in transfer.items():
+        cpf.record_inflow(account=account, amount=amount, message=message, event=EventType.AGE_55_TRANSFER)
+
+
+if __name__ == "__main__":
+    # Example usage
+    print(form_retirement_account(oa=120_000.0, sa=150_000.0, loan=80_000.0, retirement_sum=106_500))
+    batch = form_retirement_accounts([120_000.0, 60_000.0], [150_000.0, 90_000.0], [80_000.0, 0.0], 213_000)
+    print({account: changes.tolist() for account, changes in batch.items()})
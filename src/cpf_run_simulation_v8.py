@@ -1,7 +1,22 @@
 from cpf_config_loader_v10 import ConfigLoader
 from cpf_program_v11 import CPFAccount
-from tqdm import tqdm  # For the progress bar
 from cpf_date_generator_v3 import DateGenerator
+from cpf_month_index_v1 import calendar_month as calendar_month_of, month_end, month_key
+from cpf_scheduler_v1 import EventSchedule, allocation_postings
+from cpf_ledger_v1 import CPFLedger, EventType
+from cpf_messages_v1 import Message
+from cpf_query_index_v1 import BalanceIndex
+from cpf_loan_v1 import LoanSchedule
+from cpf_policy_registry_v1 import PolicyRegistry
+from cpf_salary_schedule_v1 import ContributionSchedule
+from cpf_retirement_transfer_v1 import apply_transfer, form_retirement_account, is_transfer_month
+from cpf_interest_v1 import ACCOUNTS as INTEREST_ACCOUNTS, InterestAccrual, InterestPolicy, monthly_interest
+from cpf_annual_step_v1 import simulate_annual
+from cpf_renderers_v1 import RENDERERS, SimulationResult, get_renderer
+from cpf_progress_v1 import ProgressReporter, StatusFileSink
+import cpf_instrumentation_v1 as instrumentation
+import argparse
+from contextlib import nullcontext
 import os
 import sqlite3
 import json
@@ -15,15 +30,11 @@ DATABASE_NAME = os.path.join(SRC_DIR, 'cpf_simulation.db')  # Full path to the d
 DATE_KEYS = ['start_date', 'end_date', 'birth_date']
 DATE_FORMAT = "%Y-%m-%d"
 
-# Load the configuration file
-config_loader = ConfigLoader(CONFIG_FILENAME)
-
 def create_connection():
     """Creates a database connection to the SQLite database."""
     conn = None
     try:
         conn = sqlite3.connect(DATABASE_NAME)
-        print(sqlite3.version)
     except sqlite3.Error as e:
         print(e)
     return conn
@@ -57,6 +68,18 @@ def loan_computation_first_three_years(cpf):
     payment_key = 'year_1_2' if cpf.age < 24 else 'year_3'
     float(loan_payments.getdata(payment_key, 0.0)) if payment_key in loan_payments else 0.0
 
+def month_message(age: int, calendar_month: int, ra_balance: float) -> str:
+    """Message stored with a month row in the database."""
+    if age == 55:
+        return "Age 55 - Special case for CPF payout"
+    if ra_balance == 0.0 and age >= 55:
+        return f"Age {age} - RA balance is zero"
+    if age == 67:
+        return f"Age {age} - CPF payout"
+    if calendar_month == 12:
+        return f"End of year {age} - CPF Interest"
+    return f"Age {age} - Regular CPF calculation"
+
 def compute_age(start_date : datetime.date, birth_date : datetime.date) -> int:
     """
     Compute the age based on the start date and birth date.
@@ -69,7 +92,22 @@ def compute_age(start_date : datetime.date, birth_date : datetime.date) -> int:
     return  base_age
                 
                 
-def main(dicct: dict[str, dict[str, dict[str, float]]] = None):
+def main(dicct: dict[str, dict[str, dict[str, float]]] = None, output: str = 'table', progress: ProgressReporter = None,
+         config: ConfigLoader = None, headless: bool = False, reference_block=None, resolution: str = 'monthly',
+         contributions: ContributionSchedule = None, history=None):
+    """
+    Run the simulation for one member.
+    headless=True runs from the given in-memory config without the log writer process, the database,
+    the date list and ledger files, or the progress status file; the result (with its ledger) is returned.
+    reference_block (cpf_reference_allocator_v1) makes this member's references unique across a batch.
+    resolution='annual' returns only the year-end rows (cpf_annual_step_v1), without a journal or database.
+    contributions is a precomputed ContributionSchedule (cpf_salary_schedule_v1); by default it is built
+    from the config's salary_schedule, and without one the allocation amounts of the config are posted.
+    history is an imported HistoryImport (cpf_history_import_v1): the projection starts the month after
+    the last actual month from its closing balances, and its rows and ledger come first in the result.
+    """
+    if not headless:
+        instrumentation.reset()
     # Step 1: Load the configuration
     oa_bal = 0.0
     sa_bal = 0.0
@@ -77,7 +115,11 @@ def main(dicct: dict[str, dict[str, dict[str, float]]] = None):
     ra_bal = 0.0
     excess_bal = 0.0
     loan_bal = 0.0
-    config_loader = ConfigLoader('cpf_config.json')
+    with instrumentation.span('config_load'):
+        config_loader = config if config is not None else ConfigLoader('cpf_config.json')
+        if history is not None:
+            # continue from the month after the actual history, without re-simulating it
+            config_loader = history.projection_config(config_loader)
     start_date = config_loader.getdata('start_date', {})
     end_date = config_loader.getdata('end_date', {})
     birth_date = config_loader.getdata('birth_date', {})
@@ -88,54 +130,71 @@ def main(dicct: dict[str, dict[str, dict[str, float]]] = None):
     if not all([start_date, end_date, birth_date]):
         raise ValueError("Missing required date values in the configuration file. Please check 'start_date', 'end_date', and 'birth_date'.")
 
+    if resolution == 'annual':
+        # Year-end balances only: each calendar year is advanced in one step
+        with instrumentation.span('annual_run'):
+            result = simulate_annual(config_loader, dicct, contributions)
+        if not headless:
+            with instrumentation.span('result_save'):
+                result.save()
+        with instrumentation.span('render'):
+            get_renderer(output).render(result)
+        return result
+
     # Step 2: Generate the date dictionary
-    dategen = DateGenerator(start_date=start_date, end_date=end_date, birth_date=birth_date)
-    date_dict = dategen.generate_date_dict()
-    dategen.save_file(dategen.date_list, format='csv')  # Save the date_dict to file after generation
-   # print(f"Generated date_dict with {len(date_dict)} entries.")
-    if not date_dict:
-        print("Error: date_dict is empty. Loop will not run.")
+    with instrumentation.span('date_generation'):
+        dategen = DateGenerator(start_date=start_date, end_date=end_date, birth_date=birth_date)
+        # integer month indices and ages; dates are only formatted when written out
+        calendar = dategen.generate_calendar()
+        if not headless:
+            dategen.save_file(dategen.date_list, format='csv')  # Save the month list to file after generation
+    if not len(calendar):
+        print("Error: the month calendar is empty. Loop will not run.")
         return  # Exit if empty
 
+    # Member-level progress; publishes at most a couple of updates per second
+    own_progress = progress is None
+    if own_progress:
+        progress = ProgressReporter(total_members=1, total_months=len(calendar), sinks=[] if headless else [StatusFileSink()])
+
     is_initial = True
-    is_display_special_july = False
     # Step 4: Calculate CPF per month using CPFAccount
-    with CPFAccount(config_loader) as cpf:
+    with CPFAccount(config_loader, log_to_file=not headless) as cpf:
+        cpf.ledger = CPFLedger()
+        if reference_block is not None:
+            cpf.use_reference_block(reference_block)
+        if history is not None:
+            cpf.ledger = history.ledger
+            cpf.resume_references(history.months, history.postings)
         # this method will update the cpf_config.json with the amounts needed in allocation.
         cpf.start_date = cpf.convert_date_strings(key='start_date', date_str=start_date)
         cpf.end_date = cpf.convert_date_strings(key='end_date', date_str=end_date)
         cpf.birth_date = cpf.convert_date_strings(key='birth_date', date_str=birth_date)
         cpf.current_date =  cpf.start_date
         cpf.age = compute_age(cpf.start_date, cpf.birth_date)
-        cpf.date_key = cpf.current_date.strftime('%Y-%m')
+        cpf.date_key = cpf.month
         
         #step 1 before iteration starts.
-        cpf.compute_and_add_allocation()
-        #print headers
-        # Violet color ANSI escape code
-        violet = "\033[35m"
-        reset = "\033[0m"  # Reset color to default
-
-        print(f"{violet}{'Simulation of CPF Data':^150}{reset}")
-        print(f"{violet}====================================={reset}")
-        print(f"{violet}== Start Date: {cpf.start_date}{reset}")
-        print(f"{violet}== End Date: {cpf.end_date}{reset}")
-        print(f"{violet}== Birth Date: {cpf.birth_date}{reset}")
-        print(f"{violet}== Age: {cpf.age}{reset}")
-        print(f"{violet}== Retirement Amount: {retirement_amount}{reset}")
-        print(f"{violet}== OA Balance Amount: {oa_bal}{reset}")
-        print(f"{violet}== SA Balance Amount: {sa_bal}{reset}")
-        print(f"{violet}== MA Balance Amount: {ma_bal}{reset}")
-        print(f"{violet}== Loan Balance Amount: {loan_bal}{reset}")
-        print(f"{violet}======================================{reset}")
-        print(f"{violet}{'-' * 150}{reset}")
-        #step 2 print the headers
-        print(f"{'Month and Year':<15}{'Age':<5}{'OA Balance':<15}{'SA Balance':<15}{'MA Balance':<15}{'RA Balance':<15}{'Loan Amount':<12}{'Excess Cash':<12}{'CPF Payout':<12}")
-        print("-" * 150)
+        with instrumentation.span('allocation'):
+            cpf.compute_and_add_allocation()
+        # Collect the month rows; they are formatted once by the renderer after the run
+        result = SimulationResult(header={
+            'start_date': cpf.start_date,
+            'end_date': cpf.end_date,
+            'birth_date': cpf.birth_date,
+            'age': cpf.age,
+            'retirement_amount': retirement_amount,
+            'oa_balance': oa_bal,
+            'sa_balance': sa_bal,
+            'ma_balance': ma_bal,
+            'loan_balance': loan_bal,
+        })
+        if history is not None:
+            result.extend(history.result)
 
         #step 3 determine if inital balance is needed.
         if is_initial:
-            print("Loading initial balances from config...")
+            result.loaded_initial_balances = True
             # Use property setters to ensure logging                                                                                                            
             #step 4 set the initial balances
            
@@ -145,240 +204,193 @@ def main(dicct: dict[str, dict[str, dict[str, float]]] = None):
             initra_balance = float(cpf.config.getdata('ra_balance', 0.0))
             initexcess_balance = float(cpf.config.getdata('excess_balance', 0.0))
             initloan_balance = float(cpf.config.getdata('loan_balance', 0.0))
-            #record the updates
+            #record the updates; an imported history's ledger already holds these balances
+            ledger = cpf.ledger
+            if history is not None:
+                cpf.ledger = None
             for account, new_balance in zip(['oa', 'sa', 'ma', 'ra', 'excess', 'loan'], [initoa_balance, initsa_balance, initma_balance, initra_balance, initexcess_balance, initloan_balance]):
-                cpf.record_inflow(account=account, amount=new_balance, message=f"Initial Balance of {account}")
+                cpf.record_inflow(account=account, amount=new_balance, message=Message.INITIAL_BALANCE, event=EventType.INITIAL_BALANCE)
+            cpf.ledger = ledger
             is_initial = False
             
-       #  get loan payments from config
-        loan_paymenty1 = float(cpf.config.getdata(['loan_payments','year_1_2'], 0.0))         
-        loan_paymenty3 = float(cpf.config.getdata(['loan_payments','year_3'], 0.0))
-        loan_paymenty4 = float(cpf.config.getdata(['loan_payments','year_4_beyond'], 0.0))     
+       #  precompute the loan schedule; the month loop only indexes into it
+        loan_schedule = LoanSchedule.from_config(cpf.config, principal=cpf._loan_balance)
+        #  interest rates are read once; interest for all accounts is computed in one vectorized call
+        interest_policy = InterestPolicy.from_config(cpf.config)
+        interest_accrual = InterestAccrual(interest_policy) if interest_policy.convention == 'monthly_accrual' else None
+        #  policy tables (allocation amounts, retirement sums, payouts) are compiled once per policy version
+        policies = PolicyRegistry.from_config(cpf.config)
+        policy_versions = [policies.versions[i] for i in policies.index(calendar.months).tolist()]
+        payouts_due = policies.payouts(calendar.months, calendar.ages, payout_type)
+        #  salary path contributions, compiled for every month before the loop
+        if contributions is None:
+            contributions = ContributionSchedule.from_config(cpf.config, calendar, policies, cpf.birth_date)
        
        
        #  calculate the allocations outside the loop                                                                                 
         year = 1
+        # months in which nothing can happen are advanced over in one step
+        schedule = EventSchedule.build(calendar, policies, dicct, loan_schedule, interest_policy, cpf.birth_date, contributions)
         # CPF allocation logic
-        with create_connection() as conn:
-            create_table(conn)
+        with (nullcontext() if headless else create_connection()) as conn, instrumentation.span('month_loop'):
+            if conn is not None:
+                create_table(conn)
             ###################################################################################
             # LOOP STARTS HERE
             ###################################################################################
-            #print(date_dict)
-            for date_key, date_info in tqdm(date_dict.items(), desc="Processing CPF Data", unit="month", colour="blue"):
+            months, ages = calendar.months.tolist(), calendar.ages.tolist()
+            for start, stop, active in schedule.steps():
+                if not active:
+                    # A run of quiet months: no event can move a balance, so their rows are added in one step
+                    quiet = stop - start
+                    progress.tick(quiet)
+                    references = cpf.add_db_references(quiet)
+                    year += quiet
+                    cpf.date_key = months[stop - 1]
+                    cpf.current_date = month_end(months[stop - 1])
+                    cpf.age = ages[stop - 1]
+                    cpf.payout = 0.0  # quiet months are before the payout age
+                    oa_bal, sa_bal, ma_bal = cpf._oa_balance, cpf._sa_balance, cpf._ma_balance
+                    ra_bal, loan_bal, excess_bal, payout = cpf._ra_balance, cpf._loan_balance, cpf._excess_balance, cpf.payout
+                    result.add_rows(months[start:stop], ages[start:stop], oa_bal, sa_bal, ma_bal, ra_bal, loan_bal, excess_bal, payout)
+                    cpf.message = month_message(cpf.age, calendar_month_of(cpf.date_key), ra_bal)
+                    if conn is not None:
+                        with instrumentation.span('db_insert'):
+                            cpf.insert_rows(conn, [
+                                (month_key(month), reference, age, float(oa_bal), float(sa_bal), float(ma_bal), float(ra_bal),
+                                 float(loan_bal), float(excess_bal), float(payout), month_message(age, calendar_month_of(month), ra_bal))
+                                for month, age, reference in zip(months[start:stop], ages[start:stop], references)
+                            ])
+                        instrumentation.count('rows_inserted', quiet)
+                    instrumentation.count('quiet_months', quiet)
+                    continue
+                month, age = months[start], ages[start]
+                progress.tick()
                 #stop when cpf._ra_balance == 0.0
                 
                 
                 
                 # add counter
                 cpf.dbreference = cpf.add_db_reference()
-                cpf.date_key = date_key
-                cpf.current_date = date_dict[date_key]['period_end']
-                cpf.age = compute_age(cpf.current_date, cpf.birth_date)
+                cpf.date_key = month
+                cpf.current_date = month_end(month)
+                cpf.age = age
+                calendar_month = cpf.current_date.month
               
                 #cpf.current_date = date_info['period_end']
                 
                 # loan payments
                 
-                if year == 1 and cpf._loan_balance > 0:
-                    cpf.record_outflow(account='oa',   amount=loan_paymenty1, message=f"Loan payment from OA Account at year 1 age {cpf.age}")
-                    cpf.record_outflow(account='loan', amount=loan_paymenty1, message=f"Loan payment from OA Account at year 1 age {cpf.age}")
-                elif year == 2 and cpf._loan_balance > 0:
-                    cpf.record_outflow(account='oa',   amount=loan_paymenty1, message=f"Loan payment from OA Account at year 2 age {cpf.age}")
-                    cpf.record_outflow(account='loan', amount=loan_paymenty1, message=f"Loan payment from OA Account at year 2 age {cpf.age}")
-                elif year == 3 and cpf._loan_balance > 0:
-                    cpf.record_outflow(account='oa',   amount=loan_paymenty3, message=f"Loan payment from OA Account at year 3 age {cpf.age}")
-                    cpf.record_outflow(account='loan', amount=loan_paymenty3, message=f"Loan payment from OA Account at year 3 age {cpf.age}")
-                elif year >= 4 and cpf._loan_balance > 0:
-                   
-                    if cpf._loan_balance > 0:
-                        loan_payment = min(loan_paymenty4, cpf._loan_balance)
-                        cpf.record_outflow(account='oa', amount=loan_payment, message=f"Loan payment from OA Account at year 4, age {cpf.age}")
-                        cpf.record_outflow(account='loan', amount=loan_payment, message=f"Loan payment from OA Account at year 4, age {cpf.age}")
-                    elif cpf._loan_balance < 3000:
-                        loan_payment = min(loan_paymenty4, cpf._loan_balance)
-                    else:
-                        cpf.loan_balance = 0.0
+                loan_payment = loan_schedule.payment_at(year - 1)
+                if loan_payment > 0 and cpf._loan_balance > 0:
+                    # the OA pays the instalment; only the principal part reduces the loan
+                    loan_principal = min(loan_schedule.principal_at(year - 1), cpf._loan_balance)
+                    cpf.record_outflow(account='oa',   amount=loan_payment,   message=Message.LOAN_PAYMENT, event=EventType.LOAN_PAYMENT, param=year)
+                    cpf.record_outflow(account='loan', amount=loan_principal, message=Message.LOAN_PAYMENT, event=EventType.LOAN_PAYMENT, param=year)
                 year += 1
                 # Increment the year counter           
-                if cpf.age < 55:    
-                    cpf.record_inflow(account='oa', amount=(dicct['allocation_below_55']['oa']['amount']).__round__(2), message=f"Allocation for OA at age {cpf.age}")
-                    cpf.record_inflow(account='sa', amount=(dicct['allocation_below_55']['sa']['amount']).__round__(2), message=f"Allocation for SA at age {cpf.age}")
-                    cpf.record_inflow(account='ma', amount=(dicct['allocation_below_55']['ma']['amount']).__round__(2), message=f"Allocation for MA at age {cpf.age}")
-
-                elif cpf.age == 55 and cpf.current_date.month == cpf.birth_date.month :
-                          
-                    cpf.record_inflow(account='oa', amount=(dicct['allocation_below_55']['oa']['amount']).__round__(2), message=f"Allocation for OA at age {cpf.age}")
-                    cpf.record_inflow(account='sa', amount=(dicct['allocation_below_55']['sa']['amount']).__round__(2), message=f"Allocation for SA at age {cpf.age}")
-                    cpf.record_inflow(account='ma', amount=(dicct['allocation_below_55']['ma']['amount']).__round__(2), message=f"Allocation for MA at age {cpf.age}")
-                else:
-                    if 55 <= cpf.age < 60  and cpf.current_date.month >=8 :                              
-                        age_key = '56_to_60'
-                    if 60 <= cpf.age < 65:
-                        age_key = '61_to_65'
-                    if 65 <= cpf.age < 70:
-                        age_key = '66_to_70'
-                    else:
-                        age_key = 'above_70'
-
-                    # Get the allocation amounts from the config
-                    for account in ['oa', 'ma', 'ra']:
-                        #if cpf.current_date.month == 7 and cpf.age == 55 and account  == 'ra':
-                        #    account = 'sa'
-                        #elif cpf.current_date.month == 8 and cpf.age == 55 and account  == 'sa':
-                        #    account = 'ra'
-                        #else: 
-                        #    account = account
-                        allocation_amount = cpf.config.getdata(['allocation_above_55',account,age_key,'amount'],0 ) # dicct.get('allocation_above_55',{}).get(account,{}).get(age_key,{}).get('amount', 0.0))
-                        cpf.record_inflow(account=account, amount=allocation_amount.__round__(2), message=f"Allocation for {account} at age {cpf.age}")
+                postings = (contributions.postings(start) if contributions is not None else
+                            allocation_postings(policy_versions[start], dicct, cpf.age, calendar_month, cpf.birth_date.month))
+                for account, amount, message in postings:
+                    cpf.record_inflow(account=account, amount=amount, message=message, event=EventType.ALLOCATION)
                                                          
+                # Accrue interest every month, or take one month of interest in December
+                if interest_accrual is not None:
+                    interest_accrual.accrue(cpf._oa_balance, cpf._sa_balance, cpf._ma_balance, cpf._ra_balance, cpf.age)
                 # Apply interest at the end of the year
-                if cpf.current_date.month == 12:
-                    
-                    account_balance = 0.0
-                    oa_interest = 0.0
-                    sa_interest = 0.0
-                    ma_interest = 0.0
-                    ra_interest = 0.0
-                    oa_extra_interest = 0.0
-                    sa_extra_interest = 0.0
-                    ma_extra_interest = 0.0
-                    ra_extra_interest = 0.0                
-
-                    for account in ['oa', 'sa', 'ma', 'ra']:
-                        cpf.message = f"Applying interest for {account} at age {cpf.age}"
-                        account_balance = getattr(cpf, f'_{account}_balance', 0.0)
-                        if account_balance > 0:
-                            if account == 'oa':
-                                #account: str, age: int, amount: float):
-                                oa_interest = round(cpf.calculate_interest_on_cpf(account=account,  amount=account_balance),2)
-                            elif account == 'sa':
-                                sa_interest = round(cpf.calculate_interest_on_cpf(account=account,  amount=account_balance),2)
-                            elif account == 'ma':
-                                ma_interest = cpf.calculate_interest_on_cpf(account=account,  amount=account_balance).__round__(2)
-                            elif account == 'ra':
-                                ra_interest = cpf.calculate_interest_on_cpf(account=account,  amount=account_balance).__round__(2)
-                            # Record the interest inflow                                                       
-                    oa_extra_interest, sa_extra_interest, ma_extra_interest, ra_extra_interest = cpf.calculate_extra_interest()
-                    cpf.record_inflow(account='oa', amount=oa_interest, message=f"Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='sa', amount=sa_interest, message=f"Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='ma', amount=ma_interest, message=f"Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='ra', amount=ra_interest, message=f"Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='oa', amount=oa_extra_interest.__round__(2), message=f"Extra Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='sa', amount=sa_extra_interest.__round__(2), message=f"Extra Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='ma', amount=ma_extra_interest.__round__(2), message=f"Extra Interest for {account} at age {cpf.age}")
-                    cpf.record_inflow(account='ra', amount=ra_extra_interest.__round__(2), message=f"Extra Interest for {account} at age {cpf.age}")                                                                                                
-
-                # CPF payout calculation
+                if calendar_month == 12:
+                    cpf.message = f"Applying interest at age {cpf.age}"
+                    if interest_accrual is not None:
+                        base, extra = interest_accrual.credit()
+                    else:
+                        base, extra = monthly_interest(cpf._oa_balance, cpf._sa_balance, cpf._ma_balance, cpf._ra_balance, cpf.age, interest_policy)
+                    for account in INTEREST_ACCOUNTS:
+                        cpf.record_inflow(account=account, amount=float(base[account][0]), message=Message.INTEREST, event=EventType.INTEREST)
+                    for account in INTEREST_ACCOUNTS:
+                        cpf.record_inflow(account=account, amount=float(extra[account][0]), message=Message.EXTRA_INTEREST, event=EventType.EXTRA_INTEREST)
+
+                # CPF payout calculation, at the payout of the month's policy version
                 
-                if hasattr(cpf, 'calculate_cpf_payout'):
-                    cpf.payout = cpf.calculate_cpf_payout(payout_type) 
-                    if isinstance(cpf.payout, (int, float)):
-                        cpf.payout = max(min(cpf.payout, cpf._ra_balance),0.00)
-                        setattr(cpf, 'payout', cpf.payout)
-                        if cpf._ra_balance > 0:
-                            cpf.record_outflow(account='ra',   amount=cpf.payout, message=f"CPF payout at age {cpf.age}")
-                            cpf.record_inflow(account='excess',amount=cpf.payout, message=f"CPF payout at age {cpf.age}")
-                        else:
-                            cpf.payout = 0.0
+                cpf.payout = payouts_due[start]
+                if isinstance(cpf.payout, (int, float)):
+                    cpf.payout = max(min(cpf.payout, cpf._ra_balance),0.00)
+                    setattr(cpf, 'payout', cpf.payout)
+                    if cpf._ra_balance > 0:
+                        cpf.record_outflow(account='ra',   amount=cpf.payout, message=Message.PAYOUT, event=EventType.PAYOUT)
+                        cpf.record_inflow(account='excess',amount=cpf.payout, message=Message.PAYOUT, event=EventType.PAYOUT)
+                    else:
+                        cpf.payout = 0.0
                        
                 if cpf._ra_balance == 0.0 and cpf.age > 55:
-                    print(f"Stopping simulation at age {cpf.age} as RA balance is zero.")
+                    result.stop_message = f"Stopping simulation at age {cpf.age} as RA balance is zero."
                     break
 
 
                 # Display balances including July 2029
-                cpf.date_key = date_key
-                oa_bal = getattr(cpf, '_oa_balance', 0.0).__round__(2)
-                sa_bal = getattr(cpf, '_sa_balance', 0.0).__round__(2)
-                ma_bal = getattr(cpf, '_ma_balance', 0.0).__round__(2)
-                ra_bal = getattr(cpf, '_ra_balance', 0.0).__round__(2)
-                loan_bal = getattr(cpf, '_loan_balance', 0.0).__round__(2)
-                excess_bal = getattr(cpf, '_excess_balance', 0.0).__round__(2)
-                payout = getattr(cpf, 'payout', 0.0).__round__(2)
+                cpf.date_key = month
+                oa_bal = getattr(cpf, '_oa_balance', 0.0)
+                sa_bal = getattr(cpf, '_sa_balance', 0.0)
+                ma_bal = getattr(cpf, '_ma_balance', 0.0)
+                ra_bal = getattr(cpf, '_ra_balance', 0.0)
+                loan_bal = getattr(cpf, '_loan_balance', 0.0)
+                excess_bal = getattr(cpf, '_excess_balance', 0.0)
+                payout = getattr(cpf, 'payout', 0.0)
                # display_ra = f"{'closed':<15}" if cpf._sa_balance == 0.0 else f'{float(sa_bal):<15,.2f}'
-                print(f"{date_key:<15}{cpf.age:<5}"
-                      f"{float(oa_bal):<15,.2f}{float(sa_bal):<15,.2f}"
-                      f"{float(ma_bal):<15,.2f}{float(ra_bal):<15,.2f}"
-                      f"{float(loan_bal):<12,.2f}{float(excess_bal):<12,.2f}"
-                      f"{float(cpf.payout):<12,.2f}")
+                result.add_row(month, cpf.age, oa_bal, sa_bal, ma_bal, ra_bal, loan_bal, excess_bal, payout)
                 
                 
                 
 
-                if cpf.age == 55 and cpf.current_date.month == cpf.birth_date.month :
-                    is_display_special_july = True
-                    orig_oa_bal = oa_bal
-                    orig_sa_bal = sa_bal
-                    orig_ma_bal = ma_bal
-                    orig_loan_bal = loan_bal
-                    orig_cpf_payout = payout
-                
-                                          
-                if is_display_special_july:    
-                    # Special printing for age 55 and month 7
-                    display_date_key = f"{date_key}-cpf"
-                    display_oa_bal = -orig_oa_bal
-                    display_sa_bal = -orig_sa_bal
-                    display_ma_bal = orig_ma_bal
-                    display_loan_bal = -orig_loan_bal if loan_bal > 0 else 0.0             
-                    display_ra_bal =  retirement_amount
-                    display_excess_bal = (orig_oa_bal + orig_sa_bal - orig_loan_bal - retirement_amount)
-                    display_cpf_payout = orig_cpf_payout
-                    ##                                   
-                    print(f"{display_date_key:<15}{cpf.age:<4}"
-                          f"{float(display_oa_bal):<15,.2f}{display_sa_bal:<15,.2f}"
-                          f"={float(display_ma_bal):<14,.2f}+{float(display_ra_bal):<14,.2f}"
-                          f"{float(display_loan_bal):<13,.2f}{float(display_excess_bal):<12,.2f}"
-                          f"{float(display_cpf_payout):<12,.2f}")
-
-                    cpf.record_inflow(account= 'oa',  amount= display_oa_bal,  message= f"transfer_cpf_age={cpf.age}")
-                    cpf.record_inflow(account= 'sa',  amount= display_sa_bal,  message= f"transfer_cpf_age={cpf.age}")
-                    cpf.record_inflow(account= 'loan',amount= display_loan_bal,message= f"transfer_cpf_age={cpf.age}")
-                    cpf.record_inflow(account= 'ra',  amount= display_ra_bal,  message= f"transfer_cpf_age={cpf.age}")
-                    cpf.record_inflow(account= 'excess',amount= display_excess_bal,message= f"transfer_cpf_age={cpf.age}")
-                    is_display_special_july = False   
+                # Age-55 retirement account formation, once per member
+                if is_transfer_month(cpf.age, cpf.current_date, cpf.birth_date):
+                    transfer = form_retirement_account(oa=oa_bal, sa=sa_bal, loan=loan_bal, retirement_sum=policy_versions[start].retirement_sum(payout_type))
+                    result.add_row(month, cpf.age, transfer.oa, transfer.sa, ma_bal,
+                                   transfer.ra, transfer.loan, transfer.excess, payout, transfer=True)
+                    apply_transfer(cpf, transfer)
                 # Insert data into the database for every iteration
-                if cpf.age == 55 :
-                    cpf.message = f"Age 55 - Special case for CPF payout"
-                elif cpf._ra_balance == 0.0 and cpf.age >= 55:
-                    cpf.message = f"Age {cpf.age} - RA balance is zero"
-                elif  cpf.age == 67:
-                    cpf.message = f"Age {cpf.age} - CPF payout"
-                elif cpf.current_date.month == 12:
-                    cpf.message = f"End of year {cpf.age} - CPF Interest"
-                else :
-                    cpf.message = f"Age {cpf.age} - Regular CPF calculation" 
-                if not is_display_special_july:
-                    cpf.insert_data(conn, str(date_key),int(cpf.dbreference) ,int(cpf.age), float(oa_bal), float(sa_bal), float(ma_bal), float(ra_bal), float(loan_bal), float(excess_bal), float(payout),str(cpf.message))
-                    a=0
+                cpf.message = month_message(cpf.age, calendar_month, cpf._ra_balance)
+                # the age-55 row keeps the balances from before the transfer
+                if conn is not None:
+                    with instrumentation.span('db_insert'):
+                        cpf.insert_data(conn, month_key(month),int(cpf.dbreference) ,int(cpf.age), float(oa_bal), float(sa_bal), float(ma_bal), float(ra_bal), float(loan_bal), float(excess_bal), float(payout),str(cpf.message))
+                    instrumentation.count('rows_inserted')
+        result.ledger = cpf.ledger
+        if not headless:
+            with instrumentation.span('ledger_save'):
+                cpf.ledger.save()
+            with instrumentation.span('result_save'):
+                result.save()  # the exports are built from the saved result
+
+    progress.member_done()
+    if own_progress:
+        progress.finish()
+
+    # Format the whole run in one pass, outside the month loop
+    with instrumentation.span('render'):
+        get_renderer(output).render(result)
+    return result
             # Pass birth_date as a string
            # display_data_from_db()  # Remove the argument
     #this transforms the logs from json to csv.
 
 def display_data_from_db():
-    """Displays CPF data from the database for monthly data between 2025-05 and 2061-12."""
+    """Builds a point-in-time BalanceIndex over the CPF data stored in the database."""
     conn = create_connection()
-    cur = conn.cursor()
-
-    # Define the date range for monthly data
-    start_date = "2025-05-01"
-    end_date = "2061-12-31"
-
-    # Query the database for all monthly data within the specified range
-    sql = f"""
-        SELECT date_key, dbreference, age, oa_balance, sa_balance, ma_balance, ra_balance, loan_balance, excess_balance, cpf_payout, message
-        FROM cpf_data
-        WHERE date_key BETWEEN '{start_date}' AND '{end_date}'
-        ORDER BY date_key;  -- Ensure all months are retrieved
-    """
-
-    cur.execute(sql)
-    cur.fetchall()
-
+    index = BalanceIndex.from_db(conn)
     conn.close()
+    return index
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the CPF simulation.")
+    parser.add_argument('--output', choices=list(RENDERERS), default='table', help="How to render the results")
+    parser.add_argument('--profile', action='store_true', help="Record per-stage timings (or set CPF_PROFILE=1)")
+    parser.add_argument('--resolution', choices=['monthly', 'annual'], default='monthly',
+                        help="Report every month, or only year-end balances (faster)")
+    parser.add_argument('--history', help="CSV of actual contributions and transactions to import before projecting")
+    args = parser.parse_args()
+    # Per-stage timings: pass --profile or set CPF_PROFILE=1
+    if args.profile:
+        instrumentation.enable()
     # Load the configuration file
     config_loader = ConfigLoader(CONFIG_FILENAME)
     # Load the configuration data
@@ -402,7 +414,17 @@ if __name__ == "__main__":
     }
     
     # Call the main function with the allocation data
-    main(allocation_data)
+    history = None
+    if args.history:
+        from cpf_history_import_v1 import import_history
+        conn = create_connection()
+        try:
+            history = import_history(args.history, config_loader, conn=conn)
+        finally:
+            conn.close()
+        print(f"Imported {history.postings} postings over {history.months} months from {args.history}")
+    main(allocation_data, output=args.output, resolution=args.resolution, history=history)
+    instrumentation.write_report()
 
 
 
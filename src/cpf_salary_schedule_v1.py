@@ -0,0 +1,199 @@
+## cpf_salary_schedule_v1.py
+"""
+Month-by-month salary and contribution schedule, compiled before the month loop.
+
+A member's salary path is described in the config next to the scalar "salary" (the starting
+monthly wage):
+
+    "salary_schedule": {
+        "growth_rate": 3.0,                      # percent a year, applied every January
+        "history": {"2027-01": 8200},            # explicit monthly wage from that month on
+        "breaks": [["2031-01", "2031-12"]],      # career breaks (inclusive), no wage
+        "bonus_months": {"12": 1.0},             # bonus in December of one month's wage
+        "retirement_age": 65                     # no wage from this age on
+    }
+
+The path is turned into per-month arrays, and the contributions are computed for the whole
+calendar at once with the policy version in force each month (cpf_policy_registry_v1):
+
+    ordinary wage   capped at the salary cap
+    bonus           capped at the additional wage ceiling less the year's capped ordinary wages
+    total           rate x capped wage, rounded to the dollar; the employee share is rounded down
+    allocation      total x the age bracket's split; after the age-55 RA formation the SA share goes to RA
+
+The month loop only posts ContributionSchedule.allocation[i]. contribution_schedules() builds
+the schedules of a whole batch of members in one vectorised pass.
+Members without a "salary_schedule" keep the allocation amounts of the config.
+"""
+from datetime import date
+
+import numpy as np
+
+from cpf_messages_v1 import Message
+from cpf_month_index_v1 import MonthCalendar, month_index
+from cpf_money_v1 import to_cents_array
+from cpf_policy_registry_v1 import PolicyRegistry, SPLIT_ACCOUNTS, contribution_brackets
+from cpf_retirement_transfer_v1 import TRANSFER_AGE
+
+
+def salary_path(months: np.ndarray, salary: float, path: dict, ages: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+    """(monthly ordinary wage, bonus) arrays of one member over `months` (ages: for the retirement age)."""
+    months = np.asarray(months, dtype=np.int64)
+    growth = 1 + float(path.get('growth_rate', 0.0)) / 100
+
+    # Anchors: (month, wage) pairs the wage grows from; the starting salary unless history covers the start
+    history = sorted((month_index(month), float(wage)) for month, wage in (path.get('history') or {}).items())
+    if not len(months):
+        return np.zeros(0), np.zeros(0)
+    if not history or history[0][0] > months[0]:
+        history.insert(0, (int(months[0]), float(salary)))
+    anchor_months = np.asarray([month for month, _ in history], dtype=np.int64)
+    anchor_wages = np.asarray([wage for _, wage in history])
+    anchor = np.searchsorted(anchor_months, months, side='right') - 1
+    years = months // 12 - anchor_months[anchor] // 12
+    wages = anchor_wages[anchor] * growth ** years
+
+    for start, end in path.get('breaks') or []:
+        wages[(months >= month_index(start)) & (months <= month_index(end))] = 0.0
+    if path.get('retirement_age') is not None and ages is not None:
+        wages[np.asarray(ages) >= int(path['retirement_age'])] = 0.0
+
+    bonus_months = np.zeros(13)
+    for calendar_month, multiple in (path.get('bonus_months') or {}).items():
+        bonus_months[int(calendar_month)] = float(multiple)
+    bonuses = wages * bonus_months[months % 12 + 1]
+    return wages, bonuses
+
+
+def compute_contributions(months, ages, wages, bonuses, after_transfer, registry: PolicyRegistry, members=None) -> dict:
+    """
+    Contributions and allocations for flat month arrays of one or many members (one pass).
+    `members` numbers the member of each element (months ascending within a member); the
+    additional wage ceiling applies per member and calendar year.
+    """
+    months = np.asarray(months, dtype=np.int64)
+    ages = np.clip(np.asarray(ages, dtype=np.int64), 0, registry.table('employee_rate').shape[1] - 1)
+    members = np.zeros(len(months), dtype=np.int64) if members is None else np.asarray(members, dtype=np.int64)
+    versions = registry.index(months)
+
+    ordinary = np.minimum(wages, registry.table('salary_cap')[versions])
+
+    # Additional wage ceiling per (member, year): groups are contiguous runs of the same key
+    keys = members * 100_000 + months // 12
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    group = np.cumsum(np.r_[True, keys[1:] != keys[:-1]]) - 1 if len(keys) else np.zeros(0, dtype=np.int64)
+    year_ordinary = np.add.reduceat(ordinary, first) if len(keys) else np.zeros(0)
+    ceiling = np.maximum(registry.table('additional_wage_ceiling')[versions] - year_ordinary[group], 0.0)
+    paid_before = np.cumsum(bonuses) - bonuses
+    paid_before -= paid_before[first][group]
+    additional = np.clip(ceiling - paid_before, 0.0, bonuses)
+
+    capped = ordinary + additional
+    employee_rate = registry.table('employee_rate')[versions, ages]
+    employer_rate = registry.table('employer_rate')[versions, ages]
+    total = np.floor(capped * (employee_rate + employer_rate) + 0.5)
+    employee = np.floor(capped * employee_rate)
+    employer = total - employee
+
+    splits = registry.table('allocation_splits')[versions, contribution_brackets(ages)]
+    allocation = to_cents_array(total[:, None] * splits) / 100
+    sa, ra = SPLIT_ACCOUNTS.index('sa'), SPLIT_ACCOUNTS.index('ra')
+    allocation[after_transfer, ra] += allocation[after_transfer, sa]
+    allocation[after_transfer, sa] = 0.0
+    return {'wage': wages + bonuses, 'capped_wage': capped, 'employee': employee, 'employer': employer,
+            'allocation': allocation}
+
+
+class ContributionSchedule:
+    """Per-month wage, contributions and allocations (columns SPLIT_ACCOUNTS) of one member."""
+
+    def __init__(self, months, wage, capped_wage, employee, employer, allocation, above_55):
+        self.months = months
+        self.wage = wage
+        self.capped_wage = capped_wage
+        self.employee = employee
+        self.employer = employer
+        self.allocation = allocation
+        self.above_55 = above_55  # months after the RA formation (allocation messages)
+
+    @classmethod
+    def from_config(cls, config, calendar: MonthCalendar, registry: PolicyRegistry, birth_date: date):
+        """The member's schedule, or None if the config has no salary_schedule."""
+        schedules = contribution_schedules([config], [calendar], [registry], [birth_date])
+        return schedules[0]
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    @property
+    def total(self) -> np.ndarray:
+        return self.employee + self.employer
+
+    def posts(self) -> np.ndarray:
+        """Months with an allocation to post."""
+        return np.any(np.abs(self.allocation) >= 1e-9, axis=1)
+
+    def postings(self, i: int) -> list:
+        """(account, amount, message) allocation inflows of month i, like scheduler.allocation_postings."""
+        message = Message.ALLOCATION_ABOVE_55 if self.above_55[i] else Message.ALLOCATION
+        return [(account, float(amount), message) for account, amount in zip(SPLIT_ACCOUNTS, self.allocation[i].tolist())
+                if amount]
+
+
+def contribution_schedules(configs, calendars=None, registries=None, birth_dates=None) -> list:
+    """
+    ContributionSchedules of many members (None for members without a salary_schedule).
+    Members sharing a policy registry (the usual case: one base config) are computed in one pass.
+    """
+    schedules = [None] * len(configs)
+    by_registry = {}
+    for k, config in enumerate(configs):
+        if config.getdata('salary_schedule') is None:
+            continue
+        if birth_dates is None or calendars is None or registries is None:
+            birth_date = date.fromisoformat(config.getdata('birth_date'))
+            calendar = MonthCalendar.from_dates(date.fromisoformat(config.getdata('start_date')),
+                                                date.fromisoformat(config.getdata('end_date')), birth_date)
+            registry = PolicyRegistry.from_config(config)
+        else:
+            birth_date, calendar, registry = birth_dates[k], calendars[k], registries[k]
+        by_registry.setdefault(id(registry), (registry, []))[1].append((k, config, calendar, birth_date))
+
+    for registry, members in by_registry.values():
+        paths = [salary_path(calendar.months, float(config.getdata('salary', 0.0) or 0.0),
+                             config.getdata('salary_schedule') or {}, calendar.ages) for _, config, calendar, _ in members]
+        lengths = [len(calendar) for _, _, calendar, _ in members]
+        months = np.concatenate([calendar.months for _, _, calendar, _ in members]).astype(np.int64)
+        transfer = [month_index(birth_date) + TRANSFER_AGE * 12 for _, _, _, birth_date in members]
+        after_transfer = months > np.repeat(transfer, lengths)
+        columns = compute_contributions(
+            months,
+            np.concatenate([calendar.ages for _, _, calendar, _ in members]),
+            np.concatenate([wages for wages, _ in paths]),
+            np.concatenate([bonuses for _, bonuses in paths]),
+            after_transfer,
+            registry,
+            np.repeat(np.arange(len(members)), lengths),
+        )
+        bounds = np.cumsum([0] + lengths)
+        for j, (k, _, calendar, _) in enumerate(members):
+            part = slice(bounds[j], bounds[j + 1])
+            schedules[k] = ContributionSchedule(calendar.months, *(columns[name][part] for name in
+                                                ('wage', 'capped_wage', 'employee', 'employer', 'allocation')),
+                                                after_transfer[part])
+    return schedules
+
+
+if __name__ == "__main__":
+    # Example usage: 3% yearly raises, a year's career break and a December bonus
+    import json
+    from cpf_config_loader_v10 import ConfigLoader
+    from cpf_month_index_v1 import month_key
+
+    data = json.load(open(ConfigLoader('cpf_config.json').path))
+    data['salary_schedule'] = {'growth_rate': 3.0, 'breaks': [['2027-01', '2027-12']], 'bonus_months': {'12': 2.0}}
+    schedule = contribution_schedules([ConfigLoader.from_dict(data)])[0]
+    for i in range(0, 40, 4):
+        print(f"{month_key(int(schedule.months[i]))}  wage {schedule.wage[i]:>10,.2f}  capped {schedule.capped_wage[i]:>9,.2f}  "
+              f"employee {schedule.employee[i]:>7,.0f}  employer {schedule.employer[i]:>7,.0f}  "
+              f"allocation {schedule.allocation[i].tolist()}")
@@ -0,0 +1,159 @@
+## cpf_scheduler_v1.py
+"""
+Event-month scheduler for the simulation loop.
+
+Before the month loop, every month of the calendar is tagged with the events that can happen in
+it: a non-zero allocation, a loan instalment, the December interest posting (or monthly accrual),
+the age-55 transfer, payouts from the payout age, and birthdays (the stop condition depends on the
+age). Months with no tag cannot move a balance, so the driver advances over each run of them in
+one step and appends their rows in bulk:
+
+    schedule = EventSchedule.build(calendar, registry, allocation, loan_schedule, interest_policy, birth_date)
+    for start, stop, active in schedule.steps():
+        ...
+
+The tags are a superset: an active month still runs the normal month body, which decides from
+the live balances whether e.g. a loan instalment is actually due.
+"""
+from enum import IntFlag
+
+import numpy as np
+
+from cpf_messages_v1 import Message
+from cpf_retirement_transfer_v1 import TRANSFER_AGE
+
+
+class MonthEvent(IntFlag):
+    """Reasons a month has to be simulated individually."""
+    NONE = 0
+    FIRST = 1
+    ALLOCATION = 2
+    LOAN_PAYMENT = 4
+    INTEREST = 8
+    TRANSFER = 16
+    PAYOUT = 32
+    BIRTHDAY = 64
+
+
+def allocation_postings(policy, allocation: dict, age: int, calendar_month: int, birth_month: int) -> list:
+    """
+    The monthly allocation inflows for a member of `age` in `calendar_month`, as
+    (account, amount, message) triples. Shared by the month loop and the scheduler.
+    The amounts come from the month's PolicyVersion (cpf_policy_registry_v1); below 55 the
+    base version uses `allocation`.
+    """
+    if age < TRANSFER_AGE or (age == TRANSFER_AGE and calendar_month == birth_month):
+        return [(account, policy.below_55_amount(account, allocation), Message.ALLOCATION) for account in ('oa', 'sa', 'ma')]
+    # Only the last bracket test decides the key; 56_to_60 and 61_to_65 are always overwritten
+    if 55 <= age < 60 and calendar_month >= 8:
+        age_key = '56_to_60'
+    if 60 <= age < 65:
+        age_key = '61_to_65'
+    if 65 <= age < 70:
+        age_key = '66_to_70'
+    else:
+        age_key = 'above_70'
+    return [(account, policy.above_55_amount(account, age_key), Message.ALLOCATION_ABOVE_55)
+            for account in ('oa', 'ma', 'ra')]
+
+
+def _posts(amount) -> bool:
+    # record_inflow skips these, so they are not events
+    return isinstance(amount, (int, float)) and abs(amount) >= 1e-9
+
+
+class EventSchedule:
+    """Per-month MonthEvent tags of one member's calendar."""
+
+    def __init__(self, months: np.ndarray, ages: np.ndarray, events: np.ndarray):
+        self.months = months
+        self.ages = ages
+        self.events = events
+
+    @classmethod
+    def build(cls, calendar, registry, allocation: dict, loan_schedule, interest_policy, birth_date,
+              contributions=None) -> "EventSchedule":
+        """contributions: the member's ContributionSchedule (cpf_salary_schedule_v1), if allocations come from one."""
+        months, ages = calendar.months, calendar.ages
+        n = len(months)
+        versions = registry.index(months)
+        calendar_months = months % 12 + 1
+        events = np.zeros(n, dtype=np.int16)
+        if n:
+            events[0] |= MonthEvent.FIRST
+        events[1:][ages[1:] != ages[:-1]] |= MonthEvent.BIRTHDAY
+
+        if contributions is not None:
+            events[contributions.posts()] |= MonthEvent.ALLOCATION
+        else:
+            # Allocation amounts only depend on (policy version, age, calendar month): evaluate each once
+            posting = {}
+            for i, key in enumerate(zip(versions.tolist(), ages.tolist(), calendar_months.tolist())):
+                if key not in posting:
+                    version, age, month = key
+                    posting[key] = any(_posts(amount) for _, amount, _ in
+                                       allocation_postings(registry.versions[version], allocation, age, month, birth_date.month))
+                if posting[key]:
+                    events[i] |= MonthEvent.ALLOCATION
+
+        # The driver's loan counter advances once per month, so month i pays instalment i
+        payments = np.asarray(loan_schedule.payment, dtype=np.int64)
+        due = np.zeros(n, dtype=bool)
+        due[:min(n, len(payments))] = payments[:n] > 0
+        events[due] |= MonthEvent.LOAN_PAYMENT
+
+        if interest_policy.convention == 'monthly_accrual':
+            events |= MonthEvent.INTEREST  # interest accrues every month
+        else:
+            events[calendar_months == 12] |= MonthEvent.INTEREST
+        events[(ages == TRANSFER_AGE) & (calendar_months == birth_date.month)] |= MonthEvent.TRANSFER
+        events[ages >= registry.payout_ages(months)] |= MonthEvent.PAYOUT
+        return cls(months, ages, events)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def active(self) -> np.ndarray:
+        return self.events != MonthEvent.NONE
+
+    def quiet_months(self) -> int:
+        return int(np.count_nonzero(~self.active))
+
+    def steps(self):
+        """
+        Yield (start, stop, active): each active month on its own, each run of quiet months as one step.
+        """
+        active = self.active
+        n = len(active)
+        # boundaries where the active flag changes
+        changes = np.flatnonzero(active[1:] != active[:-1]) + 1
+        bounds = [0, *changes.tolist(), n] if n else []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if active[start]:
+                for i in range(start, stop):
+                    yield i, i + 1, True
+            else:
+                yield start, stop, False
+
+
+if __name__ == "__main__":
+    # Example usage
+    from datetime import date
+    from cpf_config_loader_v10 import ConfigLoader
+    from cpf_interest_v1 import InterestPolicy
+    from cpf_loan_v1 import LoanSchedule
+    from cpf_month_index_v1 import MonthCalendar, month_key
+    from cpf_policy_registry_v1 import PolicyRegistry
+
+    config = ConfigLoader('cpf_config.json')
+    zero = {'allocation_below_55': {account: {'allocation': 0.0, 'amount': 0.0} for account in ('oa', 'sa', 'ma')}}
+    birth_date = date.fromisoformat(config.getdata('birth_date'))
+    calendar = MonthCalendar.from_dates(date.fromisoformat(config.getdata('start_date')),
+                                        date.fromisoformat(config.getdata('end_date')), birth_date)
+    schedule = EventSchedule.build(calendar, PolicyRegistry.from_config(config), zero, LoanSchedule.from_config(config, 0.0),
+                                   InterestPolicy.from_config(config), birth_date)
+    print(f"{len(schedule)} months, {schedule.quiet_months()} quiet")
+    for start, stop, active in schedule.steps():
+        if not active:
+            print(f"  quiet {month_key(int(schedule.months[start]))} .. {month_key(int(schedule.months[stop - 1]))}")
@@ -0,0 +1,255 @@
+## cpf_shared_buffers_v1.py
+"""
+Shared-memory result buffers for multi-process batch runs.
+
+The parent allocates one multiprocessing.shared_memory block per result column, laid out as NumPy
+arrays with one slice per member. Workers attach by name, run a member headless and write its
+month rows (balances in cents) and ledger events straight into their slice. The only thing sent
+back to the parent is a small completion message:
+
+    (slot, status, rows, events, seconds)
+
+so there is no per-row pickling between processes. Each slot numbers its ledger references inside
+its own block of the run (cpf_reference_allocator_v1), so the merged events stay joinable.
+
+    python cpf_shared_buffers_v1.py --members 8 --processes 4
+"""
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from cpf_money_v1 import MONEY_DTYPE, to_cents_array
+from cpf_month_index_v1 import month_index
+from cpf_progress_v1 import ProgressReporter, StreamSink
+from cpf_reference_allocator_v1 import ReferenceAllocator
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))  # Path to the src directory
+CONFIG_FILENAME = os.path.join(SRC_DIR, 'cpf_config.json')  # Full path to the config file
+
+BALANCE_COLUMNS = ('oa', 'sa', 'ma', 'ra', 'loan', 'excess', 'payout')
+EVENTS_PER_MONTH = 24  # event capacity per simulated month
+STATUS_OK = 'ok'
+STATUS_OVERFLOW = 'overflow'
+STATUS_FAILED = 'failed'
+
+
+def buffer_layout(members: int, months: int, max_events: int) -> dict:
+    """dtype and shape of every shared array."""
+    return {
+        'rows': (np.int32, (members,)),
+        'month': (np.int32, (members, months)),
+        'age': (np.int16, (members, months)),
+        'transfer': (np.bool_, (members, months)),
+        'balances': (MONEY_DTYPE, (members, months, len(BALANCE_COLUMNS))),
+        'event_count': (np.int32, (members,)),
+        'event_month': (np.int32, (members, max_events)),
+        'event_account': (np.int8, (members, max_events)),
+        'event_type': (np.int8, (members, max_events)),
+        'event_amount': (MONEY_DTYPE, (members, max_events)),
+        'event_reference': (np.int64, (members, max_events)),
+    }
+
+
+class SharedResultBuffers:
+    """
+    NumPy views over shared-memory blocks holding the results of a batch run.
+    Create them in the parent with create(), pass spec() to the workers and attach() there.
+    """
+
+    def __init__(self, spec: dict, blocks: dict, owner: bool):
+        self._spec = spec
+        self._blocks = blocks
+        self._owner = owner
+        self.arrays = {}
+        layout = buffer_layout(spec['members'], spec['months'], spec['max_events'])
+        for name, (dtype, shape) in layout.items():
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+
+    @classmethod
+    def create(cls, members: int, months: int, max_events: int = None, run_id: int = None) -> "SharedResultBuffers":
+        max_events = max_events or months * EVENTS_PER_MONTH
+        run_id = ReferenceAllocator(run_id).run_id
+        spec = {'members': members, 'months': months, 'max_events': max_events, 'run_id': run_id, 'names': {}}
+        blocks = {}
+        for name, (dtype, shape) in buffer_layout(members, months, max_events).items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+            spec['names'][name] = blocks[name].name
+        buffers = cls(spec, blocks, owner=True)
+        for array in buffers.arrays.values():
+            array.fill(0)
+        return buffers
+
+    @classmethod
+    def attach(cls, spec: dict) -> "SharedResultBuffers":
+        blocks = {name: shared_memory.SharedMemory(name=block_name) for name, block_name in spec['names'].items()}
+        return cls(spec, blocks, owner=False)
+
+    def spec(self) -> dict:
+        """Small picklable description of the buffers, enough for a worker to attach."""
+        return self._spec
+
+    @property
+    def members(self) -> int:
+        return self._spec['members']
+
+    @property
+    def allocator(self) -> ReferenceAllocator:
+        return ReferenceAllocator(self._spec['run_id'])
+
+    def write_member(self, slot: int, result) -> tuple[str, int, int]:
+        """
+        Copy one member's SimulationResult and ledger into its slice.
+        Returns (status, rows, events); rows or events beyond the capacity are dropped and reported.
+        """
+        a = self.arrays
+        columns = result.as_arrays()
+        rows = len(result)
+        months = self._spec['months']
+        status = STATUS_OK if rows <= months else STATUS_OVERFLOW
+        rows = min(rows, months)
+        a['rows'][slot] = rows
+        a['month'][slot, :rows] = result.months[:rows]
+        a['age'][slot, :rows] = columns['age'][:rows]
+        a['transfer'][slot, :rows] = columns['transfer'][:rows]
+        a['balances'][slot, :rows] = to_cents_array(np.column_stack([columns[name][:rows] for name in BALANCE_COLUMNS]))
+
+        events = 0
+        if result.ledger is not None:
+            ledger = result.ledger.to_arrays()
+            events = len(ledger['amount'])
+            if events > self._spec['max_events']:
+                status = STATUS_OVERFLOW
+                events = self._spec['max_events']
+            a['event_month'][slot, :events] = ledger['month'][:events]
+            a['event_account'][slot, :events] = ledger['account'][:events]
+            a['event_type'][slot, :events] = ledger['event'][:events]
+            a['event_amount'][slot, :events] = ledger['amount'][:events]
+            a['event_reference'][slot, :events] = ledger['reference'][:events]
+        a['event_count'][slot] = events
+        return status, rows, events
+
+    def member_balances(self, slot: int) -> dict:
+        """One member's month rows as dollar arrays (copies, safe to keep after close())."""
+        a = self.arrays
+        rows = int(a['rows'][slot])
+        balances = a['balances'][slot, :rows] / 100
+        out = {name: balances[:, i].copy() for i, name in enumerate(BALANCE_COLUMNS)}
+        out['month'] = a['month'][slot, :rows].copy()
+        out['age'] = a['age'][slot, :rows].copy()
+        out['transfer'] = a['transfer'][slot, :rows].copy()
+        return out
+
+    def member_events(self, slot: int) -> dict:
+        """One member's ledger events (copies)."""
+        a = self.arrays
+        events = int(a['event_count'][slot])
+        return {
+            'month': a['event_month'][slot, :events].copy(),
+            'account': a['event_account'][slot, :events].copy(),
+            'event': a['event_type'][slot, :events].copy(),
+            'amount': a['event_amount'][slot, :events].copy(),
+            'reference': a['event_reference'][slot, :events].copy(),
+        }
+
+    def final_balances(self) -> np.ndarray:
+        """Last regular month row of every member, shape (members, columns), in cents."""
+        a = self.arrays
+        out = np.zeros((self.members, len(BALANCE_COLUMNS)), dtype=MONEY_DTYPE)
+        for slot in range(self.members):
+            rows = int(a['rows'][slot])
+            regular = np.flatnonzero(~a['transfer'][slot, :rows])
+            if len(regular):
+                out[slot] = a['balances'][slot, regular[-1]]
+        return out
+
+    def close(self) -> None:
+        """Detach from the blocks; the creator also frees them."""
+        self.arrays = {}
+        for block in self._blocks.values():
+            block.close()
+            if self._owner:
+                block.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def months_between(start_date: str, end_date: str) -> int:
+    """Number of monthly periods from start_date to end_date, inclusive."""
+    return month_index(end_date) - month_index(start_date) + 1
+
+
+def simulate_member(spec: dict, slot: int, member_config: dict, allocation: dict) -> tuple:
+    """Worker: run one member headless, write it into the shared buffers, return a completion message."""
+    from cpf_config_loader_v10 import ConfigLoader
+    import cpf_run_simulation_v8
+
+    started = time.perf_counter()
+    buffers = SharedResultBuffers.attach(spec)
+    try:
+        result = cpf_run_simulation_v8.main(allocation, output='quiet', config=ConfigLoader.from_dict(member_config),
+                                            headless=True, reference_block=buffers.allocator.block(slot))
+        status, rows, events = buffers.write_member(slot, result)
+    except Exception as e:
+        return slot, f"{STATUS_FAILED}: {e}", 0, 0, time.perf_counter() - started
+    finally:
+        buffers.close()
+    return slot, status, rows, events, time.perf_counter() - started
+
+
+def _simulate_member_args(args):
+    return simulate_member(*args)
+
+
+def run_batch(base_config: dict, members: list[dict], allocation: dict, processes: int = None,
+              buffers: SharedResultBuffers = None, progress: ProgressReporter = None, run_id: int = None):
+    """
+    Simulate every member (config overrides merged over base_config) across a process pool.
+    Returns the buffers (caller closes them) and the list of completion messages.
+    """
+    months = max(months_between(str({**base_config, **m}['start_date']), str({**base_config, **m}['end_date']))
+                 for m in members)
+    # the age-55 transfer adds one display row
+    buffers = buffers or SharedResultBuffers.create(len(members), months + 1, run_id=run_id)
+    spec = buffers.spec()
+    tasks = [(spec, slot, {**base_config, **member}, allocation) for slot, member in enumerate(members)]
+    completions = []
+    with Pool(processes=processes) as pool:
+        for completion in pool.imap_unordered(_simulate_member_args, tasks):
+            completions.append(completion)
+            if progress is not None:
+                progress.merge(members=1, months=completion[2])
+    if progress is not None:
+        progress.finish()
+    completions.sort()
+    return buffers, completions
+
+
+if __name__ == "__main__":
+    # Example usage
+    from cpf_fixtures_v1 import ALLOCATION_DATA, synthetic_members
+
+    parser = argparse.ArgumentParser(description="Run a batch of members into shared-memory buffers.")
+    parser.add_argument('--members', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(CONFIG_FILENAME, 'r') as f:
+        base = json.load(f)
+    progress = ProgressReporter(total_members=args.members, sinks=[StreamSink()])
+    buffers, completions = run_batch(base, synthetic_members(args.members), ALLOCATION_DATA, args.processes,
+                                     progress=progress)
+    with buffers:
+        for (slot, status, rows, events, seconds), final in zip(completions, buffers.final_balances()):
+            balances = "  ".join(f"{name.upper()} {cents / 100:>13,.2f}" for name, cents in zip(BALANCE_COLUMNS, final))
+            print(f"member {slot:>4} {status:<8} rows {rows:>4} events {events:>5} {seconds:>6.2f}s  {balances}")
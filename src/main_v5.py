@@ -2,9 +2,15 @@ import streamlit as st
 import subprocess
 import json
 from cpf_config_loader_v10 import ConfigLoader
+import cpf_instrumentation_v1 as instrumentation
+from cpf_progress_v1 import clear_status, read_status
+from cpf_payout_v1 import compare_retirement_sums
+from cpf_export_v1 import FORMATS, ExportCache, load_result
 import os
 from datetime import datetime, date
 import sys
+import tempfile
+import time
 import webbrowser
 
 PATH = os.path.dirname(os.path.abspath(__file__))  # Dynamically determine the src directory
@@ -19,6 +25,7 @@ st.title("🧾 CPF Simulation Configurator")
 
 # Load the configuration
 config = ConfigLoader(CONFIG_FILENAME)
+export_cache = ExportCache()
 #
 # Display the flat dictionary in the Streamlit app
 st.subheader("🔧 Edit Parameters")
@@ -35,6 +42,10 @@ for key, value in config.data.items():
 
 
 
+# Per-stage timings are collected by the scripts when CPF_PROFILE is set
+profile_runs = st.checkbox("⏱ Profile runs", value=False)
+run_env = {**os.environ, instrumentation.ENV_VAR: "1"} if profile_runs else None
+
 # Save the updated configuration
 col1, col2, col3, col4, col5, col6  = st.columns(6)
 
@@ -84,16 +95,31 @@ with col2:
     if st.button("Run Simulation"):
         # Run the simulation script
         try:
-            result = subprocess.run(
-                [python_executable, os.path.join(PATH, "cpf_run_simulation_v8.py")],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            # Save the simulation output to a temporary file
+            # The status file of an earlier run must not show up as this run's progress
+            clear_status()
+            # Output goes to a file, not a pipe nobody reads while polling (a full pipe blocks the child)
+            with tempfile.TemporaryFile(mode="w+") as stderr_file:
+                process = subprocess.Popen(
+                    [python_executable, os.path.join(PATH, "cpf_run_simulation_v8.py"), "--output", "html"],
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr_file,
+                    text=True,
+                    env=run_env
+                )
+                # Follow the status file the simulation publishes while it runs
+                progress_bar = st.progress(0.0, text="Starting simulation...")
+                while process.poll() is None:
+                    status = read_status()
+                    if status and status.get("total_months"):
+                        done = status["months_done"] / status["total_months"]
+                        progress_bar.progress(min(done, 1.0), text=f"{status['months_done']:,} months, {status['months_per_sec']:,.0f} months/s")
+                    time.sleep(0.25)
+                progress_bar.progress(1.0, text="Simulation finished")
+                if process.returncode != 0:
+                    stderr_file.seek(0)
+                    raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr_file.read())
+            # The simulation renders its own HTML output after the run
             simulation_output_path = os.path.join(SRC_DIR, "simulation_output.html")
-            with open(simulation_output_path, "w") as f:
-                f.write(f"<pre>{result.stdout}</pre>")
 
             # Open the simulation output in a new browser tab
             webbrowser.open_new_tab(f"file://{simulation_output_path}")
@@ -114,7 +140,8 @@ with col3:
                 [python_executable, os.path.join(PATH, "cpf_build_reports_v1.py")],
                 check=True,
                 capture_output=True,
-                text=True
+                text=True,
+                env=run_env
             )
             st.success("CSV Report generated successfully!")
             st.code(result.stdout)
@@ -130,7 +157,8 @@ with col4:
                 [python_executable, os.path.join(PATH, "cpf_analysis_v1.py")],
                 check=True,
                 capture_output=True,
-                text=True
+                text=True,
+                env=run_env
             )
             st.success("Analysis completed successfully!")
             st.code(result.stdout)
@@ -139,28 +167,33 @@ with col4:
             st.code(e.stderr or str(e))
         
 with col5:
-    import dicttoxml
-    import pandas as pd
-
-    # Read the contents of cpf_report.csv
-    report_file_path = os.path.join(SRC_DIR, "cpf_report.csv")
+    # Exports of the last simulation result are streamed to a cache file only when requested,
+    # and reused until the result changes
+    export_format = st.selectbox("Export format", list(FORMATS), key="export_format")
+    result_file_path = os.path.join(SRC_DIR, "cpf_result.npz")
     try:
-        report_df = pd.read_csv(report_file_path)
-        # Convert the DataFrame to a dictionary
-        report_dict = report_df.to_dict(orient="records")
-        # Convert the dictionary to XML
-        xml_data = dicttoxml.dicttoxml(report_dict, custom_root="CPFReport", attr_type=False)
-        # Provide the XML data for download
-        st.download_button(
-            label="Download XML",
-            data=xml_data,
-            file_name="cpf_report.xml",
-            mime="application/xml",
-        )
+        simulation_result = load_result(result_file_path)
+        export_path = export_cache.cached(simulation_result, export_format)
+        if export_path is None and st.button(f"Prepare {export_format.upper()}"):
+            with st.spinner(f"Generating {export_format.upper()}..."):
+                export_path = export_cache.export(simulation_result, export_format)
+        if export_path is not None:
+            with open(export_path, "rb") as export_file:
+                st.download_button(
+                    label=f"Download {export_format.upper()}",
+                    data=export_file,
+                    file_name=f"cpf_report.{FORMATS[export_format]['extension']}",
+                    mime=FORMATS[export_format]["mime"],
+                )
     except FileNotFoundError:
-        st.error(f"File not found: {report_file_path}")
+        st.error(f"File not found: {result_file_path}")
     except Exception as e:
-        st.error(f"An error occurred while generating the XML: {e}")
+        st.error(f"An error occurred while generating the export: {e}")
+
+# Payout phase per retirement sum, from annual-resolution engine runs (no monthly loop)
+with st.expander("📉 Payout projection (BRS / FRS / ERS)"):
+    st.table([{"retirement sum": name.upper(), **projection}
+              for name, projection in compare_retirement_sums(config).items()])
 
 with col6:
     if st.button(" EXIT "):
@@ -168,4 +201,10 @@ with col6:
         st.write("Exiting the application...")
         os._exit(0)
 
-
+if profile_runs:
+    timings = instrumentation.load_report()
+    if timings:
+        with st.expander("⏱ Timing breakdown", expanded=True):
+            st.write(f"Total: {timings['total_seconds']:.3f}s")
+            st.table([{"stage": name, **entry} for name, entry in timings["spans"].items()])
+            st.json({"counters": timings["counters"], "gauges": timings["gauges"]})
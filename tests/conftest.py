@@ -0,0 +1,15 @@
+import json
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)  # the modules import each other by bare name
+
+
+@pytest.fixture
+def base_config() -> dict:
+    """A fresh copy of the shipped cpf_config.json."""
+    with open(os.path.join(SRC_DIR, 'cpf_config.json'), 'r') as f:
+        return json.load(f)
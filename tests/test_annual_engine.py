@@ -0,0 +1,38 @@
+import pytest
+
+import cpf_run_simulation_v8
+from cpf_annual_step_v1 import AnnualEngine
+from cpf_config_loader_v10 import ConfigLoader
+from cpf_fixtures_v1 import allocation_data
+from cpf_renderers_v1 import BALANCE_COLUMNS
+
+PROFILES = {
+    'default': {},
+    'young': {'birth_date': '1995-06-15', 'salary': 4500, 'oa_balance': 20_000.0, 'sa_balance': 15_000.0,
+              'ma_balance': 10_000.0, 'loan_balance': 0.0},
+    'loan': {'loan_interest_rate': 2.6, 'loan_tenor_years': 10, 'loan_balance': 180_000.0},
+    'old': {'birth_date': '1962-03-20', 'oa_balance': 90_000.0, 'sa_balance': 120_000.0, 'loan_balance': 0.0},
+    'accrual': {'interest_convention': 'monthly_accrual'},
+    'salary_schedule': {'salary': 6000, 'salary_schedule': {'growth_rate': 3.0, 'breaks': [['2030-01', '2030-06']],
+                                                            'bonus_months': {'12': 1.5}}},
+}
+
+
+def rows(result, indices):
+    return [(result.months[i], result.ages[i], *(result.columns[name][i] for name in BALANCE_COLUMNS))
+            for i in indices]
+
+
+@pytest.mark.parametrize('profile', list(PROFILES))
+def test_annual_rows_match_monthly_december_rows(base_config, profile):
+    config = {**base_config, **PROFILES[profile]}
+    monthly = cpf_run_simulation_v8.main(allocation_data(), output='quiet', config=ConfigLoader.from_dict(config),
+                                         headless=True)
+    annual = AnnualEngine(ConfigLoader.from_dict(config), allocation_data()).run()
+
+    # every December row of the month loop, plus its last row (age-55 transfer rows excluded)
+    regular = [i for i in range(len(monthly)) if not monthly.transfer[i]]
+    expected = [i for n, i in enumerate(regular) if monthly.months[i] % 12 == 11 or n == len(regular) - 1]
+    assert len(annual) == len(expected)
+    assert rows(annual, range(len(annual))) == rows(monthly, expected)
+    assert annual.stop_message == monthly.stop_message
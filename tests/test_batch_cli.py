@@ -0,0 +1,44 @@
+import csv
+import json
+import os
+
+import cpf_batch_cli_v1
+from cpf_batch_cli_v1 import SUMMARY_FILENAME
+
+MEMBERS = [
+    {'member_id': 'm0', 'salary': 5000, 'birth_date': '1970-01-10'},
+    {'member_id': 'm1', 'salary': 5300, 'birth_date': '1971-02-10'},
+    {'member_id': 'm2', 'salary': 4000, 'birth_date': '1985-07-01'},
+]
+
+
+def write_members(path, members):
+    with open(path, 'w') as f:
+        for member in members:
+            f.write(json.dumps(member) + '\n')
+    return str(path)
+
+
+def run(tmp_path, members):
+    input_file = write_members(tmp_path / 'members.jsonl', members)
+    out = tmp_path / 'out'
+    code = cpf_batch_cli_v1.main([input_file, '--out', str(out), '--processes', '2', '--chunk-size', '2',
+                                  '--run-id', '1', '--quiet'])
+    with open(os.path.join(out, SUMMARY_FILENAME), newline='') as f:
+        return code, {row['member_id']: row for row in csv.DictReader(f)}
+
+
+def test_batch_succeeds_with_exit_code_zero(tmp_path):
+    code, summary = run(tmp_path, MEMBERS)
+    assert code == 0
+    assert set(summary) == {'m0', 'm1', 'm2'}
+    assert all(row['status'] == 'ok' and int(row['months']) > 0 for row in summary.values())
+
+
+def test_failed_member_is_reported_and_sets_exit_code(tmp_path):
+    members = MEMBERS[:2] + [{'member_id': 'bad', 'birth_date': 'not-a-date'}] + MEMBERS[2:]
+    code, summary = run(tmp_path, members)
+    assert code == 1
+    assert summary['bad']['status'].startswith('failed: ')
+    assert summary['bad']['months'] == ''
+    assert [summary[member]['status'] for member in ('m0', 'm1', 'm2')] == ['ok'] * 3
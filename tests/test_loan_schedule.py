@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from cpf_loan_v1 import LoanSchedule
+from cpf_money_v1 import to_cents
+
+
+def brute_force_balances(principal, annual_rate, tenor_months, rate_resets=None, prepayments=None):
+    """Closing balance of every month, paying the level annuity and recomputing it at each event."""
+    rate_resets = rate_resets or {}
+    prepayments = prepayments or {}
+    balance = float(principal)
+    rate = annual_rate / 100 / 12
+    payment = None
+    balances = []
+    for month in range(tenor_months):
+        if month in rate_resets:
+            rate = rate_resets[month] / 100 / 12
+            payment = None
+        if month > 0 and month in prepayments:
+            balance -= min(prepayments[month], balance)
+            payment = None
+        if payment is None:
+            remaining = tenor_months - month
+            payment = balance / remaining if rate == 0 else balance * rate / (1 - (1 + rate) ** -remaining)
+        balance = max(balance * (1 + rate) - payment, 0.0)
+        balances.append(balance)
+    return balances
+
+
+@pytest.mark.parametrize('principal, annual_rate, tenor_months, rate_resets, prepayments', [
+    (250_000.0, 2.6, 300, None, None),
+    (120_000.0, 0.0, 120, None, None),
+    (300_000.0, 3.1, 240, {60: 4.2, 120: 2.9}, None),
+    (200_000.0, 2.6, 180, None, {24: 30_000.0, 100: 10_000.0}),
+    (180_000.0, 2.6, 200, {36: 3.5}, {36: 20_000.0}),
+])
+def test_amortizing_matches_brute_force(principal, annual_rate, tenor_months, rate_resets, prepayments):
+    schedule = LoanSchedule.amortizing(principal, annual_rate, tenor_months, rate_resets, prepayments)
+    expected = brute_force_balances(principal, annual_rate, tenor_months, rate_resets, prepayments)
+
+    assert len(schedule) == tenor_months
+    assert np.abs(schedule.balance[:-1] / 100 - np.array(expected[:-1])).max() <= 0.01
+    assert schedule.balance[-1] == 0
+    assert schedule.payoff_month() == tenor_months - 1
+    assert int(schedule.principal.sum()) == to_cents(principal)
+    assert np.array_equal(schedule.payment, schedule.principal + schedule.interest)
+    assert int(schedule.payment.sum() - schedule.interest.sum()) == to_cents(principal)
+
+
+def test_amortizing_level_payment():
+    schedule = LoanSchedule.amortizing(100_000.0, 2.6, 120)
+    rate = 2.6 / 100 / 12
+    level = 100_000.0 * rate / (1 - (1 + rate) ** -120)
+    assert np.abs(schedule.payment[:-1] / 100 - level).max() <= 0.02
+    assert np.abs(schedule.interest[0] / 100 - 100_000.0 * rate) <= 0.005
+
+
+@pytest.mark.parametrize('principal, payments', [
+    (10_000.0, [1_000.0] * 24),
+    (10_000.0, [0.0] * 12 + [1_500.0] * 12),
+    (2_500.5, [1_000.0, 1_000.0, 1_000.0, 1_000.0]),
+    (50_000.0, [1_000.0] * 12),
+    (0.0, [1_000.0] * 12),
+])
+def test_fixed_payments_matches_brute_force(principal, payments):
+    schedule = LoanSchedule.fixed_payments(principal, payments)
+    balance = to_cents(principal)
+    expected = []
+    for payment in payments:
+        if balance <= 0:
+            break
+        paid = min(to_cents(payment), balance)
+        balance -= paid
+        expected.append(paid)
+        if balance == 0:
+            break
+
+    assert schedule.payment.tolist() == expected
+    assert schedule.balance.tolist() == (to_cents(principal) - np.cumsum(expected, dtype=np.int64)).tolist()
+    assert not schedule.interest.any()
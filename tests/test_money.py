@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from cpf_money_v1 import apply_rate, round_money, to_cents, to_cents_array, to_dollars
+
+
+@pytest.mark.parametrize('amount, cents', [
+    (0.125, 13),
+    (-0.125, -13),
+    (0.004, 0),
+    (-0.004, 0),
+    (1702.2146, 170221),
+    (443.8298, 44383),
+    (5, 500),
+    (np.int64(-7), -700),
+])
+def test_to_cents_rounds_half_away_from_zero(amount, cents):
+    assert to_cents(amount) == cents
+
+
+def test_to_cents_array_matches_scalar():
+    rng = np.random.default_rng(20250501)
+    values = np.concatenate([rng.uniform(-1e6, 1e6, 1_000).round(3), [0.125, -0.125, 0.005, -0.005, 0.0]])
+    assert to_cents_array(values).dtype == np.int64
+    assert to_cents_array(values).tolist() == [to_cents(value) for value in values]
+
+
+def test_sums_are_exact_in_cents():
+    assert sum(to_cents(0.1) for _ in range(10)) == to_cents(1.0)
+    assert to_dollars(to_cents(0.1) * 3) == 0.3
+    assert round_money(2.675 + 0.0001) == 2.68
+
+
+def test_apply_rate_rounds_to_whole_cents():
+    assert apply_rate(to_cents(20_000), 0.01 / 12) == 1667
+    assert apply_rate(np.array([2_000_000, 4_000_000]), 0.04 / 12).tolist() == [6667, 13333]